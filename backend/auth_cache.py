@@ -0,0 +1,91 @@
+"""Bearer token -> user cache for ``get_current_user``.
+
+Decoding the JWT and loading the user happens once per token; later requests
+with the same token are a dictionary hit. Entries expire after ``ttl``
+seconds (or at the token's ``exp`` claim, whichever is sooner) and the least
+recently used entry is dropped once ``maxsize`` is reached.
+
+``on_write`` is registered as a repository write listener and drops every
+token of a user whose row is updated (disabled, role change, ...). Other
+worker processes only see such a change once their entry expires, so ``ttl``
+bounds the staleness across workers.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class TokenCache:
+    """Bounded LRU of token -> (expires_at, user_id, user) with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, str, Dict[str, Any]]]' = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.monotonic():
+            self._discard(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, token: str, user_id: str, user: Dict[str, Any], exp: Optional[float] = None):
+        """Cache ``user`` for ``token``; ``exp`` is the token's own expiry as a unix timestamp"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, time.monotonic() + exp - time.time())
+        self._discard(token)
+        self._entries[token] = (expires_at, user_id, user)
+        self._tokens_by_user.setdefault(user_id, set()).add(token)
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[1])
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[1]]
+
+    def invalidate_user(self, user_id: str):
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._discard(token)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def on_write(self, op: str, collection: str, entity_id: Optional[str], payload: Dict[str, Any]):
+        if collection == 'users' and op == 'update':
+            self.invalidate_user(entity_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
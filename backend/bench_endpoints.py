@@ -0,0 +1,339 @@
+"""In-process micro-benchmarks for the hot API routes.
+
+Usage: python bench_endpoints.py [--scales 1k,100k,1M] [--requests 200] [--output results.json]
+                                 [--baseline bench_baseline.json] [--save-baseline bench_baseline.json]
+
+For every scale (number of services) a synthetic dataset from
+``generate_dataset`` is loaded into a fresh repository of the active
+``STORAGE_BACKEND`` and each route is called straight through the ASGI app:
+no sockets, no HTTP client. Per route it reports p50/p95/p99 latency,
+median process CPU time per request, sequential throughput and the peak memory allocated while serving one request
+(tracemalloc, measured in a separate, shorter pass because tracing slows
+everything down). Finally a bill run over every account is scheduled, then
+an incremental one, and the engine's throughput is reported in accounts
+per second.
+
+Results are written as JSON. ``--baseline`` compares against an earlier run
+and marks p50/p95 regressions beyond ``--threshold``; ``--fail-on-regression``
+turns them into exit code 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server  # noqa: E402
+from generate_dataset import DatasetGenerator  # noqa: E402
+from repository import COLLECTIONS, create_repository  # noqa: E402
+from seed_data import build_dummy_data  # noqa: E402
+
+# (name, method, path, json body); the login route is dominated by bcrypt by design
+ROUTES = (
+    ('login', 'POST', '/api/auth/login', {'email': 'admin0@gen.example.com', 'password': 'password'}),
+    ('services', 'GET', '/api/services', None),
+    ('services_page', 'GET', '/api/services?limit=50', None),
+    # Sparse fieldset without relations, and relations sent once in a side table
+    ('services_sparse', 'GET', '/api/services?fields=id,service_name,plan_id,status&expand=', None),
+    ('services_included', 'GET', '/api/services?included=true', None),
+    # The full listing streamed as NDJSON: peak memory should not grow with the scale
+    ('services_ndjson', 'GET', '/api/services', None),
+    ('plans', 'GET', '/api/plans', None),
+    # Revalidation with the ETag of the previous response: a bodyless 304
+    ('plans_not_modified', 'GET', '/api/plans', None),
+    ('subscriptions_self', 'GET', '/api/subscriptions/self', None),
+    ('subscriptions_users', 'GET', '/api/subscriptions/users', None),
+    ('billing_accounts', 'GET', '/api/billing/accounts', None),
+    ('profile_info', 'GET', '/api/users/me/profile-info', None),
+)
+SCALE_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SCALE_SUFFIXES:
+        return int(float(text[:-1]) * SCALE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def scale_label(services: int) -> str:
+    if services >= 1000000 and services % 1000000 == 0:
+        return f"{services // 1000000}M"
+    if services >= 1000 and services % 1000 == 0:
+        return f"{services // 1000}k"
+    return str(services)
+
+
+async def call(app, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+               body: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes, Dict[str, str]]:
+    """Send one request through the ASGI app and return (status, body, headers)
+
+    Only the first body message is kept (the whole body of a plain response);
+    streamed bodies are counted but not held on to.
+    """
+    raw_body = json.dumps(body).encode() if body is not None else b''
+    path, _, query = path.partition('?')
+    raw_headers = [(b'host', b'bench')]
+    if body is not None:
+        raw_headers.append((b'content-type', b'application/json'))
+        raw_headers.append((b'content-length', str(len(raw_body)).encode()))
+    for key, value in (headers or {}).items():
+        raw_headers.append((key.lower().encode(), value.encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': raw_headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('bench', 80),
+    }
+    sent = False
+    status = 0
+    response_headers = {}
+    chunks = []
+    size = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': raw_body, 'more_body': False}
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status, size
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            response_headers.update((key.decode(), value.decode()) for key, value in message.get('headers', []))
+        elif message['type'] == 'http.response.body':
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            # Plain responses send their whole body in the first message
+            if not chunks:
+                chunks.append(chunk)
+
+    await app(scope, receive, send)
+    response_headers.setdefault('content-length', str(size))
+    return status, b''.join(chunks), response_headers
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def bench_route(app, method, path, headers, body, requests: int, max_seconds: float,
+                      alloc_requests: int, expect: int = 200) -> Dict[str, Any]:
+    status, payload, response_headers = await call(app, method, path, headers, body)  # warm-up
+    if status != expect:
+        raise RuntimeError(f"{method} {path} returned {status}: {payload[:200]!r}")
+    latencies = []
+    cpu_times = []
+    started = time.perf_counter()
+    while len(latencies) < requests and (len(latencies) < 3 or time.perf_counter() - started < max_seconds):
+        t0, c0 = time.perf_counter(), time.process_time()
+        await call(app, method, path, headers, body)
+        cpu_times.append(time.process_time() - c0)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    tracemalloc.start()
+    traced_started = time.perf_counter()
+    try:
+        while len(peaks) < alloc_requests and (not peaks or time.perf_counter() - traced_started < max_seconds):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await call(app, method, path, headers, body)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'cpu_ms': round(statistics.median(cpu_times) * 1000, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'alloc_peak_kb': round(statistics.median(peaks) / 1024, 1) if peaks else None,
+        'response_kb': round(int(response_headers['content-length']) / 1024, 1),
+    }
+
+
+async def load_dataset(repo, services: int, batch_size: int = 5000):
+    generator = DatasetGenerator(services)
+    if hasattr(repo, 'restore'):
+        # In-memory store: build all lists, then index once
+        data = {name: await getattr(repo, name).list() for name in COLLECTIONS}
+        for collection, row in generator.rows():
+            data[collection].append(row)
+        data['system_config'] = await repo.get_config()
+        repo.restore(data)
+        return
+    batches: Dict[str, List[Dict[str, Any]]] = {name: [] for name in COLLECTIONS}
+    for collection, row in generator.rows():
+        batches[collection].append(row)
+        if len(batches[collection]) >= batch_size:
+            await getattr(repo, collection).insert_many(batches[collection])
+            batches[collection] = []
+    for collection, batch in batches.items():
+        if batch:
+            await getattr(repo, collection).insert_many(batch)
+
+
+async def bench_scale(services: int, args, workdir: str) -> Dict[str, Any]:
+    backend = os.environ.get('STORAGE_BACKEND', 'memory')
+    label = scale_label(services)
+    if backend == 'sqlite':
+        os.environ['SQLITE_PATH'] = os.path.join(workdir, f'bench-{label}.db')
+    elif backend == 'mongo':
+        os.environ['DB_NAME'] = f"bench_{label}_{int(time.time())}"
+    # Benchmarks never write a WAL for the memory store
+    os.environ.pop('MEMORY_WAL_DIR', None)
+    server.repo = create_repository(backend, {}, seed=build_dummy_data)
+    # The enrichment cache, bill-run engine and progress hub read through the module's repository
+    server.enrichment.repo = server.repo
+    server.bill_run_engine.repo = server.repo
+    server.progress_hub.repo = server.repo
+    server.repo.add_write_listener(server.enrichment.on_write)
+    app = server.app
+    async with server.lifespan(app):
+        while not app.state.ready:
+            await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        await load_dataset(server.repo, services)
+        # restore() bypasses write listeners, so the email filter has not seen the new users
+        await server.email_filter.build(server.repo)
+        print(f"[{label}] loaded {services:,} services into {backend} in {time.perf_counter() - started:.1f}s")
+
+        status, payload, _ = await call(app, 'POST', '/api/auth/login', body=ROUTES[0][3])
+        if status != 200:
+            raise RuntimeError(f"login failed: {payload!r}")
+        headers = {'Authorization': f"Bearer {json.loads(payload)['access_token']}"}
+
+        results = {}
+        for name, method, path, body in ROUTES:
+            requests = args.login_requests if name == 'login' else args.requests
+            route_headers, expect = (None if name == 'login' else headers), 200
+            if name.endswith('_ndjson'):
+                route_headers = {**headers, 'Accept': 'application/x-ndjson'}
+            if name.endswith('_not_modified'):
+                _, _, response_headers = await call(app, method, path, headers, body)
+                route_headers, expect = {**headers, 'If-None-Match': response_headers['etag']}, 304
+            results[name] = await bench_route(
+                app, method, path, route_headers, body,
+                requests, args.max_seconds, args.alloc_requests, expect,
+            )
+            r = results[name]
+            print(f"[{label}] {name:<20} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+                  f"p99 {r['p99_ms']:>9.2f} ms  cpu {r['cpu_ms']:>9.2f} ms  {r['throughput_rps']:>8.1f} req/s  "
+                  f"peak {r['alloc_peak_kb']:>9.1f} KiB  ({r['requests']} req)")
+        # Last, as it adds a billed_accounts row per account
+        bill_run = await bench_bill_run(app, headers, args.max_seconds * 4)
+        print(f"[{label}] bill_run             {bill_run['accounts']:,} accounts in {bill_run['seconds']:.2f} s  "
+              f"{bill_run['accounts_per_second']:>10.1f} accounts/s")
+        # Nothing changed since: every account reuses the run above
+        incremental = await bench_bill_run(app, headers, args.max_seconds * 4, incremental=True)
+        print(f"[{label}] bill_run_incremental {incremental['accounts']:,} accounts in {incremental['seconds']:.2f} s  "
+              f"{incremental['accounts_per_second']:>10.1f} accounts/s")
+    return {'services': services, 'routes': results, 'bill_run': bill_run, 'bill_run_incremental': incremental}
+
+
+async def bench_bill_run(app, headers: Dict[str, str], max_seconds: float, incremental: bool = False) -> Dict[str, Any]:
+    """Schedule a bill run over every account and wait for the engine to finish it"""
+    body = {'bill_cycle_id': 'cycle_001', 'bill_run_name': 'bench', 'bill_date': '2024-01-01T00:00:00Z',
+            'incremental': incremental}
+    status, payload, _ = await call(app, 'POST', '/api/billing/schedules', headers, body)
+    if status != 200:
+        raise RuntimeError(f"bill schedule failed: {payload!r}")
+    schedule_id = json.loads(payload)['schedule_id']
+    deadline = time.perf_counter() + max_seconds
+    while time.perf_counter() < deadline:
+        runs = await server.repo.bill_runs.find(bill_schedule_id=schedule_id)
+        if runs and runs[0].get('status') == 'completed':
+            run = runs[0]
+            return {'accounts': run['bills_generated'], 'seconds': run['duration_seconds'],
+                    'accounts_per_second': run['accounts_per_second']}
+        await asyncio.sleep(0.05)
+    raise RuntimeError("bill run did not complete in time")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the change against ``baseline``; returns the regressions found"""
+    regressions = []
+    for label, scale in results['scales'].items():
+        base_scale = baseline.get('scales', {}).get(label)
+        if not base_scale:
+            continue
+        for name, current in scale['routes'].items():
+            before = base_scale['routes'].get(name)
+            if not before:
+                continue
+            deltas = []
+            for metric in ('p50_ms', 'p95_ms', 'cpu_ms', 'throughput_rps', 'alloc_peak_kb'):
+                if not before.get(metric) or current.get(metric) is None:
+                    continue
+                change = (current[metric] - before[metric]) / before[metric]
+                worse = change < -threshold if metric == 'throughput_rps' else change > threshold
+                if worse and metric in ('p50_ms', 'p95_ms'):
+                    regressions.append(f"{label} {name} {metric} {before[metric]} -> {current[metric]}")
+                deltas.append(f"{metric} {change:+.0%}{' !' if worse else ''}")
+            print(f"[{label}] {name:<20} " + '  '.join(deltas))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1k,100k,1M', help='comma-separated service counts (k/M suffixes)')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--login-requests', type=int, default=20, help='timed requests for the bcrypt-bound login')
+    parser.add_argument('--max-seconds', type=float, default=15.0, help='time cap per route and pass (at least 3 timed requests)')
+    parser.add_argument('--alloc-requests', type=int, default=5, help='traced requests per route for allocations')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--save-baseline', help='also write the results here as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = {
+        'backend': os.environ.get('STORAGE_BACKEND', 'memory'),
+        'python': sys.version.split()[0],
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for text in args.scales.split(','):
+            services = parse_scale(text)
+            results['scales'][scale_label(services)] = asyncio.run(bench_scale(services, args, workdir))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print("❌ Regressions:\n  " + '\n  '.join(regressions))
+            return 1 if args.fail_on_regression else 0
+        print("✅ No regressions beyond the threshold")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,588 @@
+"""Bill-run execution engine.
+
+``create_bill_schedule`` stores a schedule and a pending bill run. A
+``BillRunEngine`` runs in every worker, picks up pending runs whose
+``run_date`` has come and bills their accounts:
+
+1. Claim: ``increment(run, 'claims')`` expecting the run ``pending`` is
+   atomic in every backend and marks it ``processing`` in the same write, so
+   when several workers poll one shared store only one executes the run,
+   and a worker dying right after its claim leaves a processing run that
+   goes stale (below) rather than one no poll picks up again.
+2. Shards: the target accounts (the schedule's ``account_ids``, or every
+   account) are read in keyset pages of ``batch_size``, sorted by id and
+   split into shards of ``shard_size`` consecutive accounts.
+3. Charges: each active service costs its ``custom_price``, else its
+   ``monthly_charges``, else its plan's ``charges``. One pass reads the
+   services (or, for a handful of named accounts, the account_id index) in
+   pages, and the columns of every page are sent off to be priced and split
+   by shard (``rating.charge_services``); every shard's pieces are then
+   summed per account (``rating.rate_shard``). Both run in a process pool
+   of ``workers`` processes, or on a thread with one worker so the event
+   loop keeps serving requests meanwhile.
+4. Bills: as shards are rated, the main process writes their
+   ``billed_accounts`` rows with one ``insert_many`` per ``batch_size``
+   rows and keeps the run's ``bills_generated`` and ``shards`` progress
+   (accounts, bills_generated, status and error of each shard) up to date.
+
+Incremental runs (``incremental`` on the schedule) start from the latest
+completed run of the same bill cycle. Routes that change what an account is
+charged log the account, or the plan, to ``billing_changes`` after their
+write (``record_changes``); every account logged since that run was rated,
+directly or through a service on a logged plan, is dirty. Only the dirty
+accounts and those the prior run did not bill are rated, reading their
+services through the account_id index when they are few; the others are
+billed the prior run's charges. A run keeps ``rated_at``, taken before it
+reads the log and the services, so a change logged later is never lost:
+the next incremental run sees it. Once a run completes, the log entries
+older than the ``rated_at`` of every cycle's latest completed run are
+deleted: incremental runs start from those runs, so no run reads them
+again and the log stays as long as the changes since then.
+
+Only columns cross the process boundary and only the main process talks
+to the repository: it reads the pages, extracts their columns and writes
+the bills, while the per-service work happens in the pool. A shard that
+fails is marked failed while the others go on; the run then keeps an error
+naming how many failed.
+
+Checkpoints: after every committed batch of bills the run's progress is
+stored with ``checkpoint_at``, and during the reads before the first batch
+at least every ``HEARTBEAT_SECONDS``. A run that fails ends ``partial`` if
+bills were committed and ``failed`` otherwise; a processing run without a
+checkpoint for ``stale_after`` seconds (its worker died) is marked the same
+way by the next poll. ``resume`` claims such a run and executes it again,
+skipping every account that already has a bill of the run, so it carries
+on from the last committed batch without billing anyone twice. ``abort``
+fails a run for good. Both bump ``claims``. Checkpoints and status writes
+are conditional on the counter (an ``increment`` by 0 expecting it), and
+the counter is read again before every batch of bills, so a worker whose
+run was claimed again (``ClaimLost``) stops without touching the run or
+billing its accounts: a run finishing right after an abort stays aborted,
+a worker released as stale stops before its next batch, and a second
+resume or stale release of the same run finds nothing to claim. Bill ids
+are ``<run id>:<account id>``, so should a stale worker's batch still land
+after a resume read the run's bills, the resume's batch fails on the
+duplicate ids (the shard fails and the run can be resumed again) rather
+than billing those accounts twice.
+
+A finished run is ``completed`` with ``started_at``, ``completed_at`` and
+``accounts_per_second`` (of its last execution); its schedule goes from
+processing to completed, or to failed with the error kept on the run.
+"""
+import asyncio
+import multiprocessing
+import time
+import uuid
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pagination import row_key
+from repository import PageKey
+from rating import Charges, charge_services, join_ids, rate_shard
+from structured_logging import get_logger
+
+log = get_logger('billing')
+
+SERVICE_FIELDS = ('account_id', 'plan_id', 'custom_price', 'monthly_charges', 'is_active')
+# A processing run whose last checkpoint is older than the engine's
+# stale_after is considered abandoned by its worker; checkpoints are written
+# after every batch of bills and at least every HEARTBEAT_SECONDS before
+HEARTBEAT_SECONDS = 5.0
+# An incremental run looks up the services of its accounts to rate by
+# account_id, instead of scanning every active service, when they are at
+# most batch_size or 1/LOOKUP_FRACTION of the run's accounts
+LOOKUP_FRACTION = 8
+
+
+class ClaimLost(Exception):
+    """The run was aborted or released as stale while this worker executed it"""
+
+
+def as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def bill_id(run_id: str, account_id: str) -> str:
+    """One bill per account and run: a batch written twice fails on the duplicate ids instead of billing twice"""
+    return f'{run_id}:{account_id}'
+
+
+async def pages(collection, batch_size: int, fields: Optional[Iterable[str]] = None,
+                after: Optional[PageKey] = None, **criteria):
+    """Every row of ``collection`` matching ``criteria`` (after ``after``), ``batch_size`` rows at a time"""
+    while True:
+        batch = await collection.page(batch_size, after=after, fields=fields, **criteria)
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        after = row_key(batch[-1])
+
+
+class BillRunEngine:
+    """Executes due pending bill runs of ``repo`` in the background"""
+
+    def __init__(self, repo, batch_size: int = 1000, poll_interval: float = 30.0, due_days: int = 15,
+                 shard_size: int = 5000, workers: int = 1, stale_after: float = 300.0):
+        self.repo = repo
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.due_days = due_days
+        self.shard_size = max(1, shard_size)
+        self.workers = max(1, workers)
+        self.stale_after = max(stale_after, HEARTBEAT_SECONDS * 2)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resumed: Set[asyncio.Task] = set()
+        self.runs_completed = 0
+        self.runs_failed = 0
+        self.runs_resumed = 0
+        self.runs_aborted = 0
+        self.accounts_billed = 0
+        self.changes_pruned = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        if self._task is None and self.poll_interval > 0:
+            # Created here so it belongs to the running event loop
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        # Interrupted runs stay processing until another worker finds them stale
+        for task in [self._task, *self._resumed]:
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._shutdown_pool()
+
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def wake(self):
+        """Look for due runs now instead of at the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def record_changes(self, account_ids: Iterable[str] = (), plan_ids: Iterable[str] = ()):
+        """Log accounts and plans whose charges may have changed, for incremental runs"""
+        now = datetime.now(timezone.utc)
+        rows = [{'id': str(uuid.uuid4()), 'account_id': account_id, 'plan_id': None, 'created_at': now}
+                for account_id in dict.fromkeys(account_ids) if account_id]
+        rows += [{'id': str(uuid.uuid4()), 'account_id': None, 'plan_id': plan_id, 'created_at': now}
+                 for plan_id in dict.fromkeys(plan_ids) if plan_id]
+        if rows:
+            await self.repo.billing_changes.insert_many(rows)
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.run_due()
+            except Exception as e:
+                log.exception('bill_run_poll_failed', error=str(e))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self) -> int:
+        """Execute every pending run whose run_date has passed; returns how many this worker ran"""
+        now = datetime.now(timezone.utc)
+        await self._release_stale(now)
+        executed = 0
+        for run in await self.repo.bill_runs.find(status='pending'):
+            run_date = run.get('run_date')
+            if isinstance(run_date, datetime) and as_utc(run_date) > now:
+                continue
+            claimed = await self.repo.bill_runs.increment(
+                run['id'], 'claims', expect={'status': 'pending'},
+                changes={'status': 'processing', 'started_at': now, 'checkpoint_at': now})
+            if claimed is None:
+                continue
+            await self.execute(claimed)
+            executed += 1
+        return executed
+
+    async def _release_stale(self, now: datetime):
+        """Mark processing runs without a checkpoint for ``stale_after`` seconds failed or partial"""
+        stale_before = now - timedelta(seconds=self.stale_after)
+        for run in await self.repo.bill_runs.find(status='processing'):
+            seen = run.get('checkpoint_at') or run.get('started_at')
+            if not isinstance(seen, datetime) or as_utc(seen) >= stale_before:
+                continue
+            # The claim bump stops the worker should it still be alive
+            claimed = await self.repo.bill_runs.increment(
+                run['id'], 'claims', expect={'status': 'processing', 'claims': run.get('claims')})
+            if claimed is None:
+                continue
+            log.warning('bill_run_stale', bill_run_id=run['id'], checkpoint_at=seen.isoformat())
+            await self._fail(claimed, 'Worker stopped before the run finished')
+
+    async def resume(self, run: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Claim a failed or partial ``run`` and continue it in the background from its checkpoints.
+
+        Returns the claimed run, or None when another resume or abort got to it first.
+        """
+        claimed = await self.repo.bill_runs.increment(
+            run['id'], 'claims', expect={'status': run.get('status'), 'claims': run.get('claims')},
+            changes={'status': 'processing', 'checkpoint_at': datetime.now(timezone.utc)})
+        if claimed is None:
+            return None
+        task = asyncio.create_task(self.execute(claimed, resume=True))
+        self._resumed.add(task)
+        task.add_done_callback(self._resumed.discard)
+        return claimed
+
+    async def abort(self, run: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stop ``run`` for good; a worker executing it stops at its next checkpoint"""
+        claimed = await self.repo.bill_runs.increment(run['id'], 'claims')
+        if claimed is None:
+            return None
+        now = datetime.now(timezone.utc)
+        schedule = await self.repo.bill_schedules.get(run['bill_schedule_id'], fields=('id',)) or {}
+        await self._set_status(claimed, schedule, 'failed', error='Aborted', aborted_at=now)
+        self.runs_aborted += 1
+        log.info('bill_run_aborted', bill_run_id=run['id'])
+        return await self.repo.bill_runs.get(run['id'])
+
+    async def execute(self, run: Dict[str, Any], resume: bool = False):
+        # A copy: the in-memory repository hands out its stored rows, and the
+        # claims this worker holds must not follow later increments
+        run = dict(run)
+        run_id = run['id']
+        started = time.perf_counter()
+        schedule = await self.repo.bill_schedules.get(run['bill_schedule_id']) or {}
+        now = datetime.now(timezone.utc)
+        try:
+            if not await self._set_status(run, schedule, 'processing', checkpoint_at=now, error=None,
+                                          **{'resumed_at' if resume else 'started_at': now}):
+                raise ClaimLost()
+            log.info('bill_run_resumed' if resume else 'bill_run_started', bill_run_id=run_id)
+            billed, written = await self._bill(run, schedule.get('account_ids') or [], resume)
+            seconds = time.perf_counter() - started
+            rate = round(written / seconds, 1) if seconds > 0 else None
+            if not await self._set_status(run, schedule, 'completed', completed_at=datetime.now(timezone.utc),
+                                          total_accounts=billed, duration_seconds=round(seconds, 3),
+                                          accounts_per_second=rate):
+                # Aborted after the last checkpoint
+                raise ClaimLost()
+        except ClaimLost:
+            log.warning('bill_run_claim_lost', bill_run_id=run_id)
+            return
+        except Exception as e:
+            log.exception('bill_run_failed', bill_run_id=run_id, error=str(e))
+            await self._fail(run, str(e), schedule)
+            return
+        self.runs_completed += 1
+        self.runs_resumed += resume
+        self.accounts_billed += written
+        self.last_run = {'bill_run_id': run_id, 'accounts': written, 'seconds': round(seconds, 3),
+                         'accounts_per_second': rate, 'resumed': resume}
+        log.info('bill_run_completed', **self.last_run)
+        try:
+            await self.prune_changes()
+        except Exception as e:
+            # Left for the next completed run to delete
+            log.exception('billing_changes_prune_failed', error=str(e))
+
+    async def prune_changes(self) -> int:
+        """Delete billing_changes no incremental run reads any more; returns how many"""
+        # Incremental runs of a cycle read the log from its latest completed run's rated_at on
+        latest: Dict[str, datetime] = {}
+        for run in await self.repo.bill_runs.find(fields=('bill_cycle_id', 'rated_at'), status='completed'):
+            rated_at = run.get('rated_at')
+            if isinstance(rated_at, datetime):
+                cycle_id = run.get('bill_cycle_id')
+                latest[cycle_id] = max(latest.get(cycle_id, as_utc(rated_at)), as_utc(rated_at))
+        if not latest:
+            return 0
+        before = min(latest.values())
+        pruned = 0
+        async for changes in pages(self.repo.billing_changes, self.batch_size, fields=('created_at',)):
+            old = [change['id'] for change in changes
+                   if not isinstance(change.get('created_at'), datetime) or as_utc(change['created_at']) < before]
+            if old:
+                pruned += await self.repo.billing_changes.delete_many(old)
+            if len(old) < len(changes):
+                # In page order: the rest is newer
+                break
+        if pruned:
+            self.changes_pruned += pruned
+            log.info('billing_changes_pruned', changes=pruned, before=before.isoformat())
+        return pruned
+
+    async def _fail(self, run: Dict[str, Any], error: str, schedule: Optional[Dict[str, Any]] = None):
+        """Partial when some bills were committed (resumable from the checkpoints), failed otherwise"""
+        if schedule is None:
+            schedule = await self.repo.bill_schedules.get(run['bill_schedule_id'], fields=('id',)) or {}
+        current = await self.repo.bill_runs.get(run['id'], fields=('bills_generated',)) or run
+        status = 'partial' if current.get('bills_generated') else 'failed'
+        if await self._set_status(run, schedule, status, error=error):
+            self.runs_failed += 1
+
+    async def _set_status(self, run: Dict[str, Any], schedule: Dict[str, Any], status: str, **fields) -> bool:
+        """Store ``status`` unless ``run`` was claimed again since; returns whether it was stored"""
+        # An increment by 0 expecting the claim: the check and the write are one atomic write
+        updated = await self.repo.bill_runs.increment(run['id'], 'claims', 0, expect={'claims': run.get('claims')},
+                                                      changes={'status': status, **fields})
+        if updated is None:
+            return False
+        if schedule:
+            await self.repo.bill_schedules.update(schedule['id'], {
+                'status': 'failed' if status == 'partial' else status, 'updated_at': datetime.now(timezone.utc)})
+        return True
+
+    async def _bill(self, run: Dict[str, Any], account_ids: List[str], resume: bool = False) -> Tuple[int, int]:
+        """Write the missing billed_accounts rows of ``run``; returns how many it has and how many were written"""
+        last_beat = [time.monotonic()]
+
+        async def beat():
+            # Keeps the run from looking stale through the long reads before the first bill
+            if time.monotonic() - last_beat[0] >= HEARTBEAT_SECONDS:
+                last_beat[0] = time.monotonic()
+                await self._checkpoint(run)
+
+        shards = await self._shards(account_ids, beat)
+        # Bills committed by earlier executions are kept; their accounts are skipped
+        done: Set[str] = set()
+        if resume:
+            async for bills in pages(self.repo.billed_accounts, self.batch_size, fields=('account_id',),
+                                     bill_run_id=run['id']):
+                done.update(bill['account_id'] for bill in bills)
+        # Before the log and the services are read: changes logged after it are left to the next run.
+        # A resumed run keeps the first one; the bills it writes are no older than that
+        rated_at = run.get('rated_at') if resume and isinstance(run.get('rated_at'), datetime) \
+            else datetime.now(timezone.utc)
+        prior, reused = await self._reusable(run, account_ids)
+        # Accounts each shard rates, in shard order
+        to_rate = [[account['id'] for account in accounts if account['id'] not in reused and account['id'] not in done]
+                   for accounts in shards]
+        rated_count = sum(len(ids) for ids in to_rate)
+        total = sum(len(accounts) for accounts in shards)
+        kept = sum(account['id'] in done for accounts in shards for account in accounts)
+        await self._checkpoint(run, rated_at=rated_at, prior_bill_run_id=prior['id'] if prior else None,
+                               accounts_rated=rated_count, accounts_reused=total - kept - rated_count,
+                               bills_kept=kept)
+        plan_charges = {plan['id']: plan.get('charges') or 0.0
+                        for plan in await self.repo.plans.list(fields=('charges',))}
+        boundaries = [accounts[0]['id'] for accounts in shards]
+        lookup = (account_ids or prior or done) and (
+            rated_count <= self.batch_size or rated_count * LOOKUP_FRACTION <= total)
+        charging = []
+        async for services in self._services([account_id for ids in to_rate for account_id in ids] if lookup else None):
+            if services:
+                # Only the columns go to the workers, which price the services and split them by shard
+                charging.append(asyncio.ensure_future(self._run(
+                    charge_services, boundaries, plan_charges,
+                    join_ids([service.get('account_id') for service in services]),
+                    join_ids([service.get('plan_id') for service in services]),
+                    [service.get('custom_price') for service in services],
+                    [service.get('monthly_charges') for service in services],
+                    [service.get('is_active', True) for service in services])))
+            await beat()
+            # Let requests in between batches
+            await asyncio.sleep(0)
+        pieces: List[List[Charges]] = [[] for _ in shards]
+        # In page order, so every account's charges are summed in service order
+        for charged in await asyncio.gather(*charging, return_exceptions=True):
+            if isinstance(charged, BaseException):
+                raise charged
+            for number, piece in charged.items():
+                pieces[number].append(piece)
+        del charging
+
+        progress = []
+        for number, accounts in enumerate(shards):
+            generated = sum(account['id'] in done for account in accounts)
+            progress.append({'shard': number, 'accounts': len(accounts), 'bills_generated': generated,
+                             'status': 'completed' if generated == len(accounts) else 'rating', 'error': None})
+        await self._checkpoint(run, bills_generated=kept, shards=progress)
+        rated = [self._rate(number, to_rate[number], pieces[number])
+                 for number in range(len(shards)) if progress[number]['status'] != 'completed']
+        del pieces
+
+        bill_date = run.get('run_date') or datetime.now(timezone.utc)
+        due_date = bill_date + timedelta(days=self.due_days)
+        billed = kept
+        failed = 0
+        for next_rated in asyncio.as_completed(rated):
+            number, totals = await next_rated
+            shard = progress[number]
+            try:
+                if isinstance(totals, BaseException):
+                    raise totals
+                shard['status'] = 'writing'
+                charges = {account_id: round(total, 2) for account_id, total in zip(to_rate[number], totals)}
+                pending = [account for account in shards[number] if account['id'] not in done]
+                for start in range(0, len(pending), self.batch_size):
+                    batch = pending[start:start + self.batch_size]
+                    # A worker released as stale must not bill alongside the one that resumed the run
+                    await self._check_claim(run)
+                    created_at = datetime.now(timezone.utc)
+                    await self.repo.billed_accounts.insert_many([{
+                        'id': bill_id(run['id'], account['id']),
+                        'bill_run_id': run['id'],
+                        'account_id': account['id'],
+                        'account_name': account.get('name', ''),
+                        'charges': reused[account['id']] if account['id'] in reused else charges[account['id']],
+                        'bill_date': bill_date,
+                        'due_date': due_date,
+                        'status': 'billed',
+                        'created_at': created_at,
+                    } for account in batch])
+                    shard['bills_generated'] += len(batch)
+                    billed += len(batch)
+                    # The checkpoint: a resume skips every account billed up to here
+                    await self._checkpoint(run, bills_generated=billed, shards=progress)
+                    await asyncio.sleep(0)
+                shard['status'] = 'completed'
+            except ClaimLost:
+                raise
+            except Exception as e:
+                failed += 1
+                shard.update(status='failed', error=str(e) or type(e).__name__)
+                log.exception('bill_run_shard_failed', bill_run_id=run['id'], shard=number, error=shard['error'])
+            shards[number] = to_rate[number] = None
+            await self._checkpoint(run, bills_generated=billed, shards=progress)
+        if failed:
+            raise RuntimeError(f'{failed} of {len(progress)} shards failed')
+        return billed, billed - kept
+
+    async def _checkpoint(self, run: Dict[str, Any], **fields):
+        """Store progress of ``run``; raises ClaimLost, writing nothing, once it was aborted or released as stale"""
+        if 'shards' in fields:
+            # Copies: the memory repository keeps the dicts it is given
+            fields['shards'] = [dict(shard) for shard in fields['shards']]
+        updated = await self.repo.bill_runs.increment(run['id'], 'claims', 0, expect={'claims': run.get('claims')},
+                                                      changes={**fields, 'checkpoint_at': datetime.now(timezone.utc)})
+        if updated is None:
+            raise ClaimLost(run['id'])
+
+    async def _check_claim(self, run: Dict[str, Any]):
+        current = await self.repo.bill_runs.get(run['id'], fields=('claims',))
+        if current is None or current.get('claims') != run.get('claims'):
+            raise ClaimLost(run['id'])
+
+    async def _run(self, fn, *args):
+        """``fn(*args)`` in the process pool, or on a thread with one worker so the event loop keeps serving"""
+        if self.workers == 1:
+            return await asyncio.to_thread(fn, *args)
+        if self._pool is None:
+            # spawn: forking a process running an event loop and open connections is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        except BrokenProcessPool:
+            # A dead worker breaks the whole pool; the next run starts a new one
+            self._shutdown_pool()
+            raise
+
+    async def _rate(self, number: int, account_ids: List[str], pieces: List[Charges]):
+        """``(number, totals)`` of one shard, or ``(number, error)`` when rating it failed"""
+        try:
+            totals = await self._run(rate_shard, account_ids, pieces) if pieces else bytes(8 * len(account_ids))
+            return number, array('d', totals)
+        except Exception as e:
+            return number, e
+
+    async def _shards(self, account_ids: List[str], beat) -> List[List[Dict[str, Any]]]:
+        """Target accounts (id and name) in shards of ``shard_size``; unknown ids are skipped"""
+        accounts = []
+        if account_ids:
+            for account_id in dict.fromkeys(account_ids):
+                account = await self.repo.accounts.get(account_id, fields=('name',))
+                if account is not None:
+                    accounts.append(account)
+        else:
+            async for batch in pages(self.repo.accounts, self.batch_size, fields=('name',)):
+                accounts.extend(batch)
+                await beat()
+        # Ranges of account ids, so a worker finds the shard of a service from its account_id alone
+        accounts.sort(key=itemgetter('id'))
+        return [accounts[start:start + self.shard_size] for start in range(0, len(accounts), self.shard_size)]
+
+    async def _reusable(self, run: Dict[str, Any],
+                        account_ids: List[str]) -> Tuple[Optional[Dict[str, Any]], Dict[str, float]]:
+        """The prior run of an incremental ``run`` and its charges of the accounts that stayed clean"""
+        if not run.get('incremental'):
+            return None, {}
+        prior = None
+        for candidate in await self.repo.bill_runs.find(bill_cycle_id=run['bill_cycle_id'], status='completed'):
+            rated_at = candidate.get('rated_at')
+            if isinstance(rated_at, datetime) and (prior is None or as_utc(rated_at) > as_utc(prior['rated_at'])):
+                prior = candidate
+        if prior is None:
+            return None, {}
+        dirty = await self._dirty(as_utc(prior['rated_at']))
+        charges = {}
+        async for bills in self._bills(prior, account_ids):
+            for bill in bills:
+                if bill['account_id'] not in dirty:
+                    charges[bill['account_id']] = bill['charges']
+        return prior, charges
+
+    async def _bills(self, run: Dict[str, Any], account_ids: List[str]):
+        """Account and charges of the bills of ``run``, only of ``account_ids`` if they are few"""
+        fields = ('account_id', 'charges')
+        if account_ids and len(account_ids) <= self.batch_size:
+            for account_id in dict.fromkeys(account_ids):
+                yield await self.repo.billed_accounts.find(fields=fields, account_id=account_id, bill_run_id=run['id'])
+            return
+        async for bills in pages(self.repo.billed_accounts, self.batch_size, fields=fields, bill_run_id=run['id']):
+            yield bills
+
+    async def _dirty(self, since: datetime) -> Set[str]:
+        """Accounts logged to billing_changes since ``since``, directly or through a plan"""
+        accounts: Set[str] = set()
+        plans: Set[str] = set()
+        async for changes in pages(self.repo.billing_changes, self.batch_size, after=(since, '')):
+            for change in changes:
+                if change.get('account_id'):
+                    accounts.add(change['account_id'])
+                if change.get('plan_id'):
+                    plans.add(change['plan_id'])
+        for plan_id in plans:
+            for service in await self.repo.services.find(fields=('account_id', 'is_active'), plan_id=plan_id):
+                if service.get('is_active', True):
+                    accounts.add(service['account_id'])
+        return accounts
+
+    async def _services(self, account_ids: Optional[List[str]]):
+        """Services (SERVICE_FIELDS) of ``account_ids``, or all of them, in batches; the workers drop inactive ones"""
+        if account_ids is not None:
+            for account_id in account_ids:
+                yield await self.repo.services.find(fields=SERVICE_FIELDS, account_id=account_id)
+            return
+        async for services in pages(self.repo.services, self.batch_size, fields=SERVICE_FIELDS):
+            yield services
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'batch_size': self.batch_size,
+            'shard_size': self.shard_size,
+            'workers': self.workers,
+            'poll_interval': self.poll_interval,
+            'stale_after': self.stale_after,
+            'resuming': len(self._resumed),
+            'runs_completed': self.runs_completed,
+            'runs_failed': self.runs_failed,
+            'runs_resumed': self.runs_resumed,
+            'runs_aborted': self.runs_aborted,
+            'accounts_billed': self.accounts_billed,
+            'changes_pruned': self.changes_pruned,
+            'last_run': self.last_run,
+        }
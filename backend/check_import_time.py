@@ -0,0 +1,56 @@
+"""Fail when importing ``server`` takes longer than the cold-start budget.
+
+Usage: python check_import_time.py [--budget-ms 1500] [--runs 3]
+
+Each run imports ``server`` in a fresh interpreter and times only the import
+itself; the best of ``--runs`` is compared with the budget so one noisy run
+does not fail the check. Exits 1 when over budget. ``tests/test_import_time.py``
+enforces the same budget (``IMPORT_BUDGET_MS``) in the test suite.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+DEFAULT_BUDGET_MS = int(os.environ.get('IMPORT_BUDGET_MS', '1500'))
+
+_PROBE = (
+    "import time\n"
+    "started = time.perf_counter()\n"
+    "import server\n"
+    "print((time.perf_counter() - started) * 1000)\n"
+)
+
+
+def measure_import_ms() -> float:
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    timings = [measure_import_ms() for _ in range(args.runs)]
+    best = min(timings)
+    print(f"import server: best {best:.0f} ms of {', '.join(f'{t:.0f}' for t in timings)} "
+          f"(budget {args.budget_ms:.0f} ms)")
+    if best > args.budget_ms:
+        print("❌ Import time over budget")
+        return 1
+    print("✅ Import time within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Bloom filter of known user emails for register and login.
+
+``might_exist`` answering False means no user has that (normalized) email,
+so an unknown-email login or a fresh registration skips the user lookup
+entirely. True means "maybe": the caller confirms through the indexed
+``email_key`` lookup, and a miss there is counted as a false positive.
+
+The filter is built from the users collection during warm-up and kept in
+sync by ``on_write``, registered as a repository write listener. Bloom
+filters cannot forget, so a changed email leaves its old key behind; that
+only costs an extra lookup. Once more keys than ``capacity`` were added the
+false-positive rate climbs; ``rebuild_if_full`` then builds a larger
+filter in the background.
+
+A negative answer is only trustworthy when this process sees every write.
+With a shared backend (``repo.shared``) other workers add users this filter
+never hears about, so it is built non-authoritative and ``might_exist``
+always says True; lookups then rely on the ``email_key`` index alone.
+"""
+import asyncio
+import hashlib
+import math
+from typing import Any, Dict, List, Optional
+
+from repository import normalize_email
+
+
+class BloomFilter:
+    """Fixed-size bit array with ``hashes`` probes per key (double hashing over blake2b)"""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.bits = max(64, int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class EmailFilter:
+    """Negative cache of normalized user emails with lookup counters"""
+
+    def __init__(self, authoritative: bool = True, fp_rate: float = 0.01, min_capacity: int = 1024):
+        self.authoritative = authoritative
+        self.fp_rate = fp_rate
+        self.min_capacity = min_capacity
+        self._bloom: Optional[BloomFilter] = None
+        # Keys written while a build is reading the users collection
+        self._pending: Optional[List[str]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self.builds = 0
+        self.negatives = 0
+        self.maybes = 0
+        self.false_positives = 0
+
+    def rebuild_if_full(self, repo):
+        """Start a background rebuild once more keys than ``capacity`` were added"""
+        if self._bloom is not None and self._pending is None and self._bloom.count > self._bloom.capacity:
+            self._pending = []
+            self._rebuild_task = asyncio.create_task(self._build(repo))
+
+    async def build(self, repo):
+        """(Re)build from every user; room for twice as many keys as exist now"""
+        if not self.authoritative:
+            return
+        self._pending = []
+        await self._build(repo)
+
+    async def _build(self, repo):
+        try:
+            users = await repo.users.list(fields=('email',))
+            bloom = BloomFilter(max(self.min_capacity, 2 * len(users)), self.fp_rate)
+            for user in users:
+                if user.get('email'):
+                    bloom.add(normalize_email(user['email']))
+            for key in self._pending:
+                bloom.add(key)
+        finally:
+            self._pending = None
+        self._bloom = bloom
+        self.builds += 1
+
+    def add(self, email: str):
+        key = normalize_email(email)
+        if self._bloom is not None:
+            self._bloom.add(key)
+        if self._pending is not None:
+            self._pending.append(key)
+
+    def might_exist(self, key: str) -> bool:
+        """False only when no user can have the normalized email ``key``"""
+        if not self.authoritative or self._bloom is None:
+            return True
+        if key in self._bloom:
+            self.maybes += 1
+            return True
+        self.negatives += 1
+        return False
+
+    def false_positive(self):
+        """Record that a "maybe" turned out to be no user"""
+        if self.authoritative and self._bloom is not None:
+            self.false_positives += 1
+
+    def on_write(self, op: str, collection: str, entity_id: Optional[str], payload: Dict[str, Any]):
+        if collection == 'users' and op in ('insert', 'update') and payload.get('email'):
+            self.add(payload['email'])
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            'authoritative': self.authoritative,
+            'keys': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else 0,
+            'bits': bloom.bits if bloom else 0,
+            'hashes': bloom.hashes if bloom else 0,
+            'builds': self.builds,
+            'negatives': self.negatives,
+            'maybes': self.maybes,
+            'false_positives': self.false_positives,
+        }
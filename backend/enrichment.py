@@ -0,0 +1,137 @@
+"""Ready-to-serve views of plans and accounts for the routes embedding them.
+
+Service and subscription responses carry their service's plan (with
+``calculated_deposit``) and account. Building those views costs a
+repository read, a copy and a projection per service; ``EnrichmentCache``
+keeps them by id, so a listing reads and builds each plan and account once
+and later requests reuse them. Views are shared between responses and must
+not be modified.
+
+Invalidation is per row where the write is seen and per collection where it
+is not:
+
+- ``on_write`` (a repository write listener) drops the view of an updated
+  row; config writes drop every plan view, as deposits are derived settings.
+- ``sync``, called once per request before reading views, compares the
+  repository's write counters with the last ones seen. Writes this process
+  already invalidated account for the difference; anything else (another
+  worker writing to a shared store, a store restored from a snapshot) drops
+  that collection's views.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+View = Dict[str, Any]
+
+
+class ViewCache:
+    """Bounded LRU of id -> view of one collection's rows"""
+
+    def __init__(self, collection: str, build: Callable[[Dict[str, Any]], View], maxsize: int = 10000):
+        self.collection = collection
+        self.build = build
+        self.maxsize = maxsize
+        self._views: 'OrderedDict[str, View]' = OrderedDict()
+        # Bumped by every invalidation, so a view built from a row read before it is not kept
+        self._generation = 0
+        # (epoch, version) at the last sync, and writes invalidated through on_write since
+        self.seen: Optional[Tuple[str, int]] = None
+        self.local_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.resets = 0
+
+    async def get(self, collection, entity_id: str) -> Optional[View]:
+        """View of row ``entity_id`` of ``collection``, read and built on a miss"""
+        view = self._views.get(entity_id)
+        if view is not None:
+            self._views.move_to_end(entity_id)
+            self.hits += 1
+            return view
+        self.misses += 1
+        generation = self._generation
+        row = await collection.get(entity_id)
+        if row is None:
+            return None
+        view = self.build(row)
+        if generation == self._generation and self.maxsize > 0:
+            self._views[entity_id] = view
+            while len(self._views) > self.maxsize:
+                self._views.popitem(last=False)
+                self.evictions += 1
+        return view
+
+    def invalidate(self, entity_id: str):
+        self._generation += 1
+        if self._views.pop(entity_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        if self._views:
+            self._views.clear()
+            self.resets += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._views),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'resets': self.resets,
+        }
+
+
+class EnrichmentCache:
+    """Plan and account views for ``repo``, kept in step with its writes"""
+
+    def __init__(self, repo, plan_view: Callable[[Dict[str, Any]], View],
+                 account_view: Callable[[Dict[str, Any]], View], maxsize: int = 10000):
+        self.repo = repo
+        self.caches = {
+            'plans': ViewCache('plans', plan_view, maxsize),
+            'accounts': ViewCache('accounts', account_view, maxsize),
+        }
+
+    async def plan(self, plan_id: str) -> Optional[View]:
+        return await self.caches['plans'].get(self.repo.plans, plan_id)
+
+    async def account(self, account_id: str) -> Optional[View]:
+        return await self.caches['accounts'].get(self.repo.accounts, account_id)
+
+    async def sync(self):
+        """Drop the views of every collection written to behind ``on_write``'s back"""
+        pending = {name: cache.local_writes for name, cache in self.caches.items()}
+        versions = await self.repo.versions(list(self.caches))
+        epoch = self.repo.epoch
+        for name, cache in self.caches.items():
+            # Writes notified before the counters were read are in them, so an
+            # exact match means no write went unseen; writes notified during
+            # the read stay pending for the next sync
+            if cache.seen is not None and cache.seen == (epoch, versions[name] - pending[name]):
+                cache.local_writes -= pending[name]
+            else:
+                if cache.seen is not None:
+                    cache.clear()
+                cache.local_writes = 0
+            cache.seen = (epoch, versions[name])
+
+    def on_write(self, op: str, collection: str, entity_id: Optional[str], payload: Dict[str, Any]):
+        if op == 'config':
+            self.caches['plans'].clear()
+            return
+        cache = self.caches.get(collection)
+        if cache is None:
+            return
+        cache.local_writes += 1
+        if op == 'update':
+            cache.invalidate(entity_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: cache.stats() for name, cache in self.caches.items()}
@@ -0,0 +1,220 @@
+"""Per-route request metrics rendered in the Prometheus text format.
+
+``TimedRoute`` is used as the ``route_class`` of the API router, so timings
+are taken inside routing where the route template (``/api/services/{service_id}``)
+is known; requests that match no route are not counted. Per method and
+template it keeps:
+
+- ``http_requests_total``: requests by status code
+- ``http_requests_in_flight``: requests being handled right now
+- ``http_request_duration_seconds``: time from routing to a finished response
+- ``http_request_phase_seconds``: the same split into ``auth`` (time spent in
+  the authentication dependency, reported through ``record_auth``),
+  ``handler`` (the endpoint function) and ``serialize`` (response validation
+  and rendering after the endpoint returned)
+- ``http_response_size_bytes``: rendered body size (streamed bodies are skipped)
+
+Recording costs a few dictionary and ``bisect`` operations per request.
+Numbers are per worker process; scrape each worker separately.
+"""
+import asyncio
+import bisect
+import contextvars
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PHASES = ('auth', 'handler', 'serialize')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` holds observations <= ``buckets[i]`` (last: +Inf)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, rows = 0, []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            rows.append((bound if bound == '+Inf' else repr(float(bound)), total))
+        return rows
+
+
+class RouteSeries:
+    """Everything recorded for one (method, route template)"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.statuses: Dict[int, int] = {}
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.phases = {phase: Histogram(LATENCY_BUCKETS) for phase in PHASES}
+
+
+class RequestTiming:
+    """Phase timestamps of the request being handled, shared through ``current_timing``"""
+
+    __slots__ = ('auth', 'handler_start', 'handler_end')
+
+    def __init__(self):
+        self.auth: Optional[float] = None
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+
+current_timing: contextvars.ContextVar = contextvars.ContextVar('current_timing', default=None)
+
+
+def record_auth(seconds: float):
+    """Add time spent authenticating the current request"""
+    timing = current_timing.get()
+    if timing is not None:
+        timing.auth = (timing.auth or 0.0) + seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.series: Dict[Tuple[str, str], RouteSeries] = {}
+
+    def route(self, method: str, route: str) -> RouteSeries:
+        series = self.series.get((method, route))
+        if series is None:
+            series = self.series[(method, route)] = RouteSeries()
+        return series
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format"""
+        lines = []
+        items = sorted(self.series.items())
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, hist):
+            for bound, total in hist.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        header('http_requests_total', 'counter', 'Requests handled, by route template and status code')
+        for (method, route), series in items:
+            for code, count in sorted(series.statuses.items()):
+                lines.append(f'http_requests_total{{{_labels(method, route)},status="{code}"}} {count}')
+        header('http_requests_in_flight', 'gauge', 'Requests currently being handled')
+        for (method, route), series in items:
+            lines.append(f"http_requests_in_flight{{{_labels(method, route)}}} {series.in_flight}")
+        header('http_request_duration_seconds', 'histogram', 'Time from routing to a finished response')
+        for (method, route), series in items:
+            histogram('http_request_duration_seconds', _labels(method, route), series.duration)
+        header('http_request_phase_seconds', 'histogram', 'Request time spent in auth, handler and serialize')
+        for (method, route), series in items:
+            for phase, hist in series.phases.items():
+                if hist.count:
+                    histogram('http_request_phase_seconds', f'{_labels(method, route)},phase="{phase}"', hist)
+        header('http_response_size_bytes', 'histogram', 'Rendered response body size')
+        for (method, route), series in items:
+            if series.size.count:
+                histogram('http_response_size_bytes', _labels(method, route), series.size)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method: str, route: str) -> str:
+    return f'method="{method}",route="{_escape(route)}"'
+
+
+registry = MetricsRegistry()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records its requests in ``registry`` under its path template"""
+
+    def get_route_handler(self):
+        self._time_endpoint()
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def timed_handler(request):
+            series = registry.route(request.method, route)
+            timing = RequestTiming()
+            token = current_timing.set(timing)
+            series.in_flight += 1
+            status_code = 500
+            response = None
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            except RequestValidationError:
+                status_code = 422
+                raise
+            finally:
+                finished = time.perf_counter()
+                series.in_flight -= 1
+                current_timing.reset(token)
+                series.statuses[status_code] = series.statuses.get(status_code, 0) + 1
+                series.duration.observe(finished - started)
+                if timing.auth is not None:
+                    series.phases['auth'].observe(timing.auth)
+                if timing.handler_end is not None:
+                    series.phases['handler'].observe(timing.handler_end - timing.handler_start)
+                    if response is not None:
+                        series.phases['serialize'].observe(finished - timing.handler_end)
+                body = getattr(response, 'body', None)
+                if body is not None:
+                    series.size.observe(len(body))
+
+        return timed_handler
+
+    def _time_endpoint(self):
+        """Wrap the endpoint call so handler time is known; keeps it sync or async"""
+        call = self.dependant.call
+        if getattr(call, '_timed', False):
+            return
+        if asyncio.iscoroutinefunction(call):
+            async def timed_call(**values):
+                timing = current_timing.get()
+                if timing is None:
+                    return await call(**values)
+                timing.handler_start = time.perf_counter()
+                try:
+                    return await call(**values)
+                finally:
+                    timing.handler_end = time.perf_counter()
+        else:
+            def timed_call(**values):
+                timing = current_timing.get()
+                if timing is None:
+                    return call(**values)
+                timing.handler_start = time.perf_counter()
+                try:
+                    return call(**values)
+                finally:
+                    timing.handler_end = time.perf_counter()
+        timed_call._timed = True
+        self.dependant.call = timed_call
@@ -0,0 +1,305 @@
+"""MongoDB implementation of the repository interface using motor.
+
+Rows are stored as plain documents keyed by their ``id`` field; Mongo's own
+``_id`` is never returned. Datetimes are stored as ISO strings through
+``prepare_for_mongo`` and turned back into datetimes by ``parse_from_mongo``.
+Secondary indexes end with ``created_at, id`` so ``page`` reads an equality
+match in page order straight from the index. Write counters per collection
+live in the ``versions`` collection and are incremented right after each write.
+
+Set ``MONGO_URL=mongomock://`` to run against an in-process stand-in
+(requires the ``mongomock-motor`` package) instead of a real mongod.
+"""
+import copy
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from pymongo import ASCENDING, ReturnDocument
+
+from repository import COLLECTIONS, DERIVED_FIELDS, FIELD_DEFAULTS, INDEXES, PageKey, WriteListener, derive, notify
+
+CONFIG_DOC_ID = 'system_config'
+EPOCH_DOC_ID = 'epoch'
+
+
+def prepare_for_mongo(data):
+    """Convert datetime objects to ISO strings for MongoDB storage"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, datetime):
+                data[key] = value.isoformat()
+            elif isinstance(value, dict):
+                data[key] = prepare_for_mongo(value)
+            elif isinstance(value, list):
+                data[key] = [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
+    return data
+
+
+def parse_from_mongo(item):
+    """Parse datetime strings from MongoDB back to datetime objects"""
+    if isinstance(item, dict):
+        for key, value in item.items():
+            if isinstance(value, str) and key.endswith(('_at', '_date')):
+                try:
+                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                except:
+                    pass
+            elif isinstance(value, dict):
+                item[key] = parse_from_mongo(value)
+            elif isinstance(value, list):
+                item[key] = [parse_from_mongo(i) if isinstance(i, dict) else i for i in value]
+    return item
+
+
+def _projection(fields: Optional[Sequence[str]]) -> Dict[str, int]:
+    if not fields:
+        return {'_id': 0}
+    projection = {field: 1 for field in fields}
+    projection['id'] = 1
+    projection['_id'] = 0
+    return projection
+
+
+def _pool_options() -> Dict[str, Any]:
+    """Connection pool settings, overridable through the environment"""
+    return {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+        'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000')),
+        'waitQueueTimeoutMS': int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000')),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        'retryWrites': True,
+    }
+
+
+class MongoCollection:
+    """Async collection API backed by a motor collection"""
+
+    def __init__(self, name: str, collection, defaults: Optional[Dict[str, Any]] = None,
+                 listeners: Optional[List[WriteListener]] = None, derived: Optional[Dict[str, Any]] = None,
+                 versions=None):
+        self.name = name
+        self._collection = collection
+        self._versions = versions
+        self._defaults = defaults or {}
+        self._derived = derived or {}
+        self.listeners = listeners if listeners is not None else []
+
+    def _filter(self, criteria: Dict[str, Any]) -> Dict[str, Any]:
+        query = {}
+        clauses = []
+        for field, value in prepare_for_mongo(dict(criteria)).items():
+            if field in self._defaults and self._defaults[field] == value:
+                # Rows without the field count as having the default value
+                clauses.append({'$or': [{field: value}, {field: {'$exists': False}}]})
+            else:
+                query[field] = value
+        if clauses:
+            query['$and'] = clauses
+        return query
+
+    async def get(self, entity_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Return the row or None; ``fields`` limits the returned keys"""
+        doc = await self._collection.find_one({'id': entity_id}, _projection(fields))
+        return parse_from_mongo(doc) if doc else None
+
+    async def list(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        return [parse_from_mongo(doc) async for doc in self._collection.find({}, _projection(fields))]
+
+    async def find(self, fields: Optional[Sequence[str]] = None, **criteria) -> List[Dict[str, Any]]:
+        cursor = self._collection.find(self._filter(criteria), _projection(fields))
+        return [parse_from_mongo(doc) async for doc in cursor]
+
+    async def page(self, limit: int, after: Optional[PageKey] = None, fields: Optional[Sequence[str]] = None,
+                   **criteria) -> List[Dict[str, Any]]:
+        """Up to ``limit`` rows matching ``criteria`` in ``PAGE_ORDER``, starting after the key ``after``"""
+        query = self._filter(criteria)
+        if after is not None:
+            created, row_id = after
+            if created is None:
+                # Rows without created_at sort first (as null)
+                position = {'$or': [{'created_at': None, 'id': {'$gt': row_id}}, {'created_at': {'$ne': None}}]}
+            else:
+                created = created.isoformat()
+                position = {'$or': [{'created_at': {'$gt': created}}, {'created_at': created, 'id': {'$gt': row_id}}]}
+            query = {'$and': [query, position]} if query else position
+        projection = _projection(tuple(fields) + ('created_at',) if fields else None)
+        cursor = self._collection.find(query, projection).sort([('created_at', ASCENDING), ('id', ASCENDING)])
+        return [parse_from_mongo(doc) async for doc in cursor.limit(limit)]
+
+    async def count(self, **criteria) -> int:
+        # Exact even without criteria: routes number new addons and invoices from it
+        return await self._collection.count_documents(self._filter(criteria))
+
+    async def _bump(self, writes: int = 1):
+        if self._versions is not None:
+            await self._versions.update_one({'_id': self.name}, {'$inc': {'version': writes}}, upsert=True)
+
+    async def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        await self._collection.insert_one(prepare_for_mongo(copy.deepcopy(derive(self._derived, row))))
+        await self._bump()
+        notify(self.listeners, 'insert', self.name, row['id'], row)
+        return row
+
+    async def insert_many(self, rows: List[Dict[str, Any]]):
+        if rows:
+            await self._collection.insert_many(
+                [prepare_for_mongo(copy.deepcopy(derive(self._derived, row))) for row in rows], ordered=False,
+            )
+            await self._bump(len(rows))
+            for row in rows:
+                notify(self.listeners, 'insert', self.name, row['id'], row)
+
+    async def delete_many(self, ids: Iterable[str]) -> int:
+        """Remove the rows with these ids; returns how many there were"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return 0
+        result = await self._collection.delete_many({'id': {'$in': ids}})
+        if result.deleted_count:
+            await self._bump(result.deleted_count)
+            for entity_id in ids:
+                notify(self.listeners, 'delete', self.name, entity_id, {})
+        return result.deleted_count
+
+    async def update(self, entity_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply ``changes`` and return the updated row, or None if the id is unknown"""
+        if 'id' in changes and changes['id'] != entity_id:
+            raise ValueError("Primary key cannot be changed")
+        doc = await self._collection.find_one_and_update(
+            {'id': entity_id},
+            {'$set': prepare_for_mongo(copy.deepcopy(derive(self._derived, dict(changes))))},
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return None
+        await self._bump()
+        notify(self.listeners, 'update', self.name, entity_id, changes)
+        return parse_from_mongo(doc)
+
+    async def increment(self, entity_id: str, field: str, amount: int = 1, expect: Optional[Dict[str, Any]] = None,
+                        changes: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically add ``amount`` to a numeric field and apply ``changes``; with ``expect``, only if
+        the row has those field values (None otherwise)"""
+        if changes and 'id' in changes and changes['id'] != entity_id:
+            raise ValueError("Primary key cannot be changed")
+        update = {'$inc': {field: amount}}
+        if changes:
+            update['$set'] = prepare_for_mongo(copy.deepcopy(derive(self._derived, dict(changes))))
+        # With ``expect`` the row is taken as it was and updated here: the
+        # updated one may no longer match the filter (mongomock then finds none)
+        doc = await self._collection.find_one_and_update(
+            {'id': entity_id, **prepare_for_mongo(dict(expect or {}))},
+            update,
+            projection={'_id': 0},
+            return_document=ReturnDocument.BEFORE if expect else ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return None
+        if expect:
+            doc.update(update.get('$set', {}))
+            doc[field] = (doc.get(field) or 0) + amount
+        await self._bump()
+        notify(self.listeners, 'update', self.name, entity_id, {**(changes or {}), field: doc.get(field)})
+        return parse_from_mongo(doc)
+
+    async def ensure_indexes(self, indexes: Sequence[Sequence[str]]):
+        await self._collection.create_index([('id', ASCENDING)], unique=True, name='id_unique')
+        await self._collection.create_index([('created_at', ASCENDING), ('id', ASCENDING)], name='page_order')
+        existing = await self._collection.index_information()
+        for fields in indexes:
+            name = '_'.join(fields)
+            await self._collection.create_index(
+                [(field, ASCENDING) for field in fields] + [('created_at', ASCENDING), ('id', ASCENDING)],
+                name=f"{name}_page",
+            )
+            # Replaced by the page-ordered index above
+            if name in existing:
+                await self._collection.drop_index(name)
+
+    async def backfill(self):
+        """Fill derived fields missing from rows written before they were introduced"""
+        for field in self._derived:
+            async for doc in self._collection.find({field: {'$exists': False}}, {'_id': 0}):
+                derive(self._derived, doc)
+                if field in doc:
+                    await self._collection.update_one({'id': doc['id']}, {'$set': {field: doc[field]}})
+
+
+class MongoRepository:
+    """Repository whose collections live in a MongoDB database"""
+
+    # Other worker processes write to the same database
+    shared = True
+
+    def __init__(self, mongo_url: str, db_name: str, seed: Optional[Callable[[], Dict[str, Any]]] = None):
+        if mongo_url.startswith('mongomock://'):
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                raise RuntimeError("MONGO_URL=mongomock:// requires the mongomock-motor package")
+            self._client = AsyncMongoMockClient()
+        else:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self._client = AsyncIOMotorClient(mongo_url, **_pool_options())
+        self._db = self._client[db_name]
+        self._seed = seed
+        self.epoch: Optional[str] = None
+        self.listeners: List[WriteListener] = []
+        for name in COLLECTIONS:
+            setattr(self, name, MongoCollection(
+                name, self._db[name], FIELD_DEFAULTS.get(name), self.listeners, DERIVED_FIELDS.get(name),
+                self._db.versions,
+            ))
+
+    async def open(self):
+        """Create indexes and load the seed data into an empty database"""
+        # Created once with the database, so every worker reports the same epoch
+        doc = await self._db.config.find_one_and_update(
+            {'_id': EPOCH_DOC_ID},
+            {'$setOnInsert': {'value': os.urandom(6).hex()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.epoch = doc['value']
+        for name in COLLECTIONS:
+            await getattr(self, name).ensure_indexes(INDEXES.get(name, ()))
+            await getattr(self, name).backfill()
+        if self._seed is not None and await self.users.count() == 0:
+            seed = self._seed()
+            for name in COLLECTIONS:
+                await getattr(self, name).insert_many(seed.get(name, []))
+            await self.update_config(seed.get('system_config', {}))
+
+    async def close(self):
+        self._client.close()
+
+    async def checkpoint(self):
+        pass
+
+    def add_write_listener(self, listener: WriteListener):
+        self.listeners.append(listener)
+
+    def remove_write_listener(self, listener: WriteListener):
+        self.listeners.remove(listener)
+
+    async def versions(self, names: Sequence[str]) -> Dict[str, int]:
+        stored = {doc['_id']: doc['version'] async for doc in self._db.versions.find({'_id': {'$in': list(names)}})}
+        return {name: stored.get(name, 0) for name in names}
+
+    async def get_config(self) -> Dict[str, Any]:
+        doc = await self._db.config.find_one({'_id': CONFIG_DOC_ID}, {'_id': 0})
+        return doc or {'deposit_multiplier': 2.0}
+
+    async def update_config(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        doc = await self._db.config.find_one_and_update(
+            {'_id': CONFIG_DOC_ID},
+            {'$set': changes},
+            projection={'_id': 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        notify(self.listeners, 'config', CONFIG_DOC_ID, None, changes)
+        return doc
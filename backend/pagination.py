@@ -0,0 +1,147 @@
+"""Keyset (cursor) pagination for list routes.
+
+A page is read with ``collection.page`` in the repository's ``PAGE_ORDER``
+(created_at, id), starting right after the last row of the previous page, so
+every page costs the same however deep it is and rows written in between
+neither repeat nor shift later pages. The cursor handed to clients is that
+position, JSON-encoded and base64url'd; clients treat it as opaque.
+
+Routes stay backwards compatible: without ``limit`` or ``cursor`` they return
+the whole list as before. With them the body is still a JSON list of at most
+``limit`` items; the position of the next page comes back in the
+``X-Next-Cursor`` header and as a ``Link: <...>; rel="next"`` URL, both
+absent on the last page.
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from starlette.requests import Request
+
+from repository import PageKey
+
+PAGE_DEFAULT_LIMIT = int(os.environ.get('PAGE_DEFAULT_LIMIT', '100'))
+PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', '1000'))
+# Deepest row an offset (``page``) listing walks to before it has to use a cursor
+PAGE_MAX_OFFSET = int(os.environ.get('PAGE_MAX_OFFSET', '10000'))
+# Rows read per repository call while streaming a listing
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '500'))
+
+
+def row_key(row: Dict[str, Any]) -> PageKey:
+    created = row.get('created_at')
+    return (created if isinstance(created, datetime) else None, row['id'])
+
+
+def encode_cursor(key: PageKey) -> str:
+    created, row_id = key
+    text = json.dumps([created.isoformat() if created is not None else None, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    """Position encoded by ``encode_cursor``; raises ValueError for anything else"""
+    try:
+        created, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(row_id, str):
+            raise ValueError("cursor id must be a string")
+        if created is None:
+            return (None, row_id)
+        created = datetime.fromisoformat(created)
+        if created.tzinfo is None:
+            raise ValueError("cursor timestamp must carry a time zone")
+        return (created, row_id)
+    except (binascii.Error, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+
+class PageRequest:
+    """``limit``/``cursor`` query parameters; ``active`` is False for the legacy full list"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT, description="Page size; enables cursor pagination"),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    ):
+        self.active = limit is not None or cursor is not None
+        self.requested_limit = limit
+        self.limit = limit or PAGE_DEFAULT_LIMIT
+        self.after = parse_cursor(cursor)
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[PageKey]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(collection, limit: int, after: Optional[PageKey] = None,
+                   keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                   **criteria) -> Tuple[List[Dict[str, Any]], Optional[PageKey]]:
+    """Up to ``limit`` rows after ``after`` and the position of the next page (None on the last one)
+
+    ``keep`` filters rows the repository criteria cannot express; pages are
+    refilled until ``limit`` rows were kept or the collection is exhausted.
+    """
+    rows: List[Dict[str, Any]] = []
+    while len(rows) <= limit:
+        # One extra row tells whether another page follows
+        want = limit + 1 - len(rows)
+        size = want if keep is None else max(want, limit)
+        batch = await collection.page(size, after=after, **criteria)
+        rows.extend(batch if keep is None else filter(keep, batch))
+        if len(batch) < size:
+            break
+        after = row_key(batch[-1])
+    if len(rows) > limit:
+        return rows[:limit], row_key(rows[limit - 1])
+    return rows, None
+
+
+async def iter_batches(collection, paging: PageRequest, keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                       batch_size: int = STREAM_BATCH_SIZE, **criteria) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Every row from ``paging``'s cursor on (at most ``limit``, if one was given), in page-sized batches"""
+    after, remaining = paging.after, paging.requested_limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        batch = await collection.page(size, after=after, **criteria)
+        if not batch:
+            return
+        exhausted = len(batch) < size
+        after = row_key(batch[-1])
+        if keep is not None:
+            batch = [row for row in batch if keep(row)]
+        if remaining is not None:
+            batch = batch[:remaining]
+            remaining -= len(batch)
+        if batch:
+            yield batch
+        if exhausted:
+            return
+
+
+async def fetch_list(collection, paging: PageRequest, request: Request,
+                     keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                     **criteria) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Rows for a list route and the headers to send: one page, or the whole list when not paging"""
+    if not paging.active:
+        rows = await collection.find(**criteria) if criteria else await collection.list()
+        return (rows if keep is None else [row for row in rows if keep(row)]), {}
+    rows, next_key = await paginate(collection, paging.limit, paging.after, keep=keep, **criteria)
+    return rows, page_headers(request, next_key)
+
+
+def page_headers(request: Request, next_key: Optional[PageKey]) -> Dict[str, str]:
+    """``X-Next-Cursor`` and ``Link`` headers pointing at the next page, if any"""
+    if next_key is None:
+        return {}
+    cursor = encode_cursor(next_key)
+    url = request.url.remove_query_params('page').include_query_params(cursor=cursor)
+    return {'X-Next-Cursor': cursor, 'Link': f'<{url}>; rel="next"'}
@@ -0,0 +1,74 @@
+"""Bounded thread pool for bcrypt hashing and verification.
+
+bcrypt releases the GIL while it works, so a few threads run checks in
+parallel without blocking the event loop. At most ``workers + max_queue``
+jobs are admitted at once; beyond that ``run`` raises ``PoolSaturated``
+immediately, so a login burst turns into fast rejections instead of a queue
+that starves every other route. Time spent waiting for a worker is recorded
+per job.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already holds as many jobs as it admits"""
+
+
+class PasswordPool:
+    """Runs CPU-heavy password work on a size-limited thread pool with admission control"""
+
+    def __init__(self, workers: int = 4, max_queue: int = 32, samples: int = 1024):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._in_flight = 0
+        self._queue_times = deque(maxlen=samples)
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated()
+        self._in_flight += 1
+        submitted = time.perf_counter()
+
+        def job():
+            return time.perf_counter() - submitted, fn(*args)
+
+        try:
+            queue_time, result = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._in_flight -= 1
+        self.completed += 1
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        self._queue_times.append(queue_time)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        recent = sorted(self._queue_times)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p / 100 * len(recent)))] * 1000, 3) if recent else 0.0
+
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'queued': max(0, self._in_flight - self.workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_time_avg_ms': round(self.queue_time_total / self.completed * 1000, 3) if self.completed else 0.0,
+            'queue_time_p95_ms': pct(95),
+            'queue_time_max_ms': round(self.queue_time_max * 1000, 3),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
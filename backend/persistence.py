@@ -0,0 +1,336 @@
+"""Write-ahead log and background snapshots for the in-memory repository.
+
+Every insert, update, delete and config change is appended to the current log
+segment as one framed record (length, crc32, pickled payload). Records are
+buffered and a flusher thread writes and fsyncs them every
+``fsync_interval_ms``, so concurrent writes share one fsync; a crash can lose
+at most that window of acknowledged writes.
+
+A snapshot first rotates the log to a new segment, then copies the row lists
+on the event loop (the rows themselves are shared) and pickles them on a
+worker thread. Rows can still change while they are written, so the snapshot
+is fuzzy: it holds every write logged before the rotation and possibly some
+after it. Replaying the log from the rotation point settles that, because
+update records carry resulting field values and replaying an insert of an
+existing id overwrites it. Once a snapshot is on disk, older segments and
+snapshots are deleted.
+
+On startup the newest snapshot is loaded and the segments from its rotation
+point on are replayed, stopping at the first torn or corrupt record. A fresh
+directory gets its base snapshot before the first segment is opened, so a
+directory without any snapshot is always treated as fresh and seeded.
+"""
+import asyncio
+import io
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from structured_logging import get_logger
+
+_FRAME = struct.Struct('<II')  # payload length, crc32
+_SNAPSHOT_CHUNK = 50000
+
+log = get_logger('persistence')
+
+
+def _plain(value):
+    return value
+
+
+class _Pickler(pickle.Pickler):
+    """Stores enum members as their values so files do not depend on server classes"""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, Enum):
+            return _plain, (obj.value,)
+        return NotImplemented
+
+
+def _dumps(obj) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buffer.getvalue()
+
+
+def _fsync_dir(directory: Path):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def segment_path(directory: Path, number: int) -> Path:
+    return directory / f'wal-{number:08d}.log'
+
+
+def snapshot_path(directory: Path, number: int) -> Path:
+    return directory / f'snapshot-{number:08d}.pkl'
+
+
+def _numbered(directory: Path, pattern: str) -> List[Tuple[int, Path]]:
+    return sorted((int(path.stem.split('-')[1]), path) for path in directory.glob(pattern))
+
+
+def read_segment(path: Path) -> Iterator[tuple]:
+    """Yield the records of one segment, stopping at a torn or corrupt tail"""
+    data = memoryview(path.read_bytes())
+    pos = 0
+    while pos < len(data):
+        if pos + _FRAME.size > len(data):
+            log.warning('wal_torn_record', segment=path.name, offset=pos)
+            return
+        length, crc = _FRAME.unpack_from(data, pos)
+        start, end = pos + _FRAME.size, pos + _FRAME.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            log.warning('wal_torn_record', segment=path.name, offset=pos)
+            return
+        yield pickle.loads(data[start:end])
+        pos = end
+
+
+class WriteAheadLog:
+    """Segmented append-only log with batched fsync on a background thread"""
+
+    def __init__(self, directory: Path, segment: int, fsync_interval_ms: int = 20):
+        self._directory = directory
+        self._segment = segment
+        self._interval = fsync_interval_ms / 1000
+        # Encoded frames, plus ints marking "switch to this segment"
+        self._buffer: List[Any] = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._file = open(segment_path(directory, segment), 'ab')
+        _fsync_dir(directory)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='wal-flusher', daemon=True)
+        # Records appended since the last rotation
+        self.records = 0
+
+    def start(self):
+        self._thread.start()
+
+    def append(self, op: str, collection: str, entity_id: Optional[str], payload: Dict[str, Any]):
+        """Encode the record now and queue it for the next flush"""
+        data = _dumps((op, collection, entity_id, payload))
+        frame = _FRAME.pack(len(data), zlib.crc32(data)) + data
+        with self._lock:
+            self._buffer.append(frame)
+            self.records += 1
+
+    def rotate(self) -> int:
+        """Send records appended from now on to a new segment; returns its number"""
+        with self._lock:
+            self._segment += 1
+            self._buffer.append(self._segment)
+            self.records = 0
+            return self._segment
+
+    def flush(self):
+        """Write and fsync everything queued so far"""
+        with self._io_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+            # pending[start:] is not on disk yet
+            start = 0
+            try:
+                for index, item in enumerate(pending):
+                    if isinstance(item, int):
+                        self._write(pending[start:index])
+                        start = index
+                        self._file.close()
+                        self._file = open(segment_path(self._directory, item), 'ab')
+                        _fsync_dir(self._directory)
+                        start = index + 1
+                self._write(pending[start:])
+            except OSError:
+                # Retry next time, segment switches included, ahead of later appends:
+                # these writes were acknowledged and must land in their own segment
+                with self._lock:
+                    self._buffer[:0] = pending[start:]
+                raise
+
+    def _write(self, frames: List[bytes]):
+        if not frames:
+            return
+        position = self._file.tell()
+        try:
+            self._file.write(b''.join(frames))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            # Drop the partial write so the segment stays readable
+            try:
+                self._file.truncate(position)
+                self._file.seek(position)
+            except OSError:
+                pass
+            raise
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.flush()
+            except OSError as e:
+                log.error('wal_flush_failed', error=str(e))
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+class Persistence:
+    """Recovery, logging and snapshot scheduling for an ``InMemoryRepository``"""
+
+    def __init__(self, directory: str, fsync_interval_ms: int = 20, snapshot_interval_s: float = 300,
+                 snapshot_min_records: int = 100000):
+        self._directory = Path(directory)
+        self._fsync_interval_ms = fsync_interval_ms
+        self._snapshot_interval = snapshot_interval_s
+        self._snapshot_min_records = snapshot_min_records
+        self._repo = None
+        self._recovered = False
+        self._segment = 1
+        self._replayed = 0
+        self._wal: Optional[WriteAheadLog] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def recover(self, repo) -> bool:
+        """Restore ``repo`` from disk; returns False if there was nothing to restore"""
+        self._repo = repo
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._recovered, self._segment, self._replayed = await asyncio.to_thread(self._recover, repo)
+        return self._recovered
+
+    async def start(self, repo):
+        """Log every write of ``repo`` from now on and start snapshotting"""
+        if not self._recovered:
+            # Fresh directory: the seeded state becomes the base snapshot. It is on disk before
+            # the first segment, so a crash in between leaves a directory that still looks fresh
+            await asyncio.to_thread(self._write_snapshot, self._segment, repo.snapshot_state())
+        self._wal = WriteAheadLog(self._directory, self._segment, self._fsync_interval_ms)
+        # A long replayed tail makes the next snapshot due right away
+        self._wal.records = self._replayed
+        repo.add_write_listener(self._wal.append)
+        self._wal.start()
+        self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._wal is not None:
+            self._repo.remove_write_listener(self._wal.append)
+            await asyncio.to_thread(self._wal.close)
+
+    def _recover(self, repo) -> Tuple[bool, int, int]:
+        """Load the newest snapshot and replay the log after it
+
+        Returns whether anything was on disk, the segment number to log into
+        next and the number of replayed records.
+        """
+        started = time.perf_counter()
+        for path in self._directory.glob('*.tmp'):
+            path.unlink()
+        snapshots = _numbered(self._directory, 'snapshot-*.pkl')
+        segments = _numbered(self._directory, 'wal-*.log')
+        if not snapshots:
+            # Every store starts from a base snapshot; segments without one hold no
+            # state to replay onto, so the directory is fresh and gets seeded
+            for _, path in segments:
+                log.warning('wal_segment_without_snapshot', segment=path.name)
+                path.unlink()
+            return False, 1, 0
+        base, path = snapshots[-1]
+        repo.restore(self._read_snapshot(path))
+        replayed = 0
+        for number, path in segments:
+            if number < base:
+                continue
+            for op, collection, entity_id, payload in read_segment(path):
+                repo.apply(op, collection, entity_id, payload)
+                replayed += 1
+        log.info('wal_recovered', snapshot=base, replayed=replayed, seconds=round(time.perf_counter() - started, 3))
+        next_segment = max([base] + [number for number, _ in segments]) + 1
+        return True, next_segment, replayed
+
+    def _read_snapshot(self, path: Path) -> Dict[str, Any]:
+        state: Dict[str, Any] = {}
+        with open(path, 'rb') as f:
+            pickle.load(f)  # header
+            while True:
+                chunk = pickle.load(f)
+                if chunk is None:
+                    return state
+                name, value = chunk
+                if name == 'system_config':
+                    state[name] = value
+                else:
+                    state.setdefault(name, []).extend(value)
+
+    def _write_snapshot(self, segment: int, state: Dict[str, Any]):
+        """Write ``state`` as the snapshot replayed from ``segment``, then prune older files"""
+        final = snapshot_path(self._directory, segment)
+        temp = final.with_suffix('.tmp')
+        with open(temp, 'wb') as f:
+            pickler = _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            def dump(obj):
+                # Each object is read back by its own pickle.load, so nothing may refer to earlier ones
+                pickler.dump(obj)
+                pickler.clear_memo()
+
+            dump({'segment': segment, 'created_at': time.time()})
+            for name, rows in state.items():
+                if name == 'system_config':
+                    dump((name, rows))
+                    continue
+                for start in range(0, len(rows), _SNAPSHOT_CHUNK):
+                    # dict() copies each row atomically while the event loop keeps writing
+                    dump((name, [dict(row) for row in rows[start:start + _SNAPSHOT_CHUNK]]))
+            dump(None)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, final)
+        _fsync_dir(self._directory)
+        for number, path in _numbered(self._directory, 'snapshot-*.pkl'):
+            if number < segment:
+                path.unlink()
+        for number, path in _numbered(self._directory, 'wal-*.log'):
+            if number < segment:
+                path.unlink()
+
+    async def snapshot(self):
+        """Rotate the log and write a snapshot in the background"""
+        # Rotation and the row copy happen without yielding, so no write falls between them
+        segment = self._wal.rotate()
+        state = self._repo.snapshot_state()
+        started = time.perf_counter()
+        await asyncio.to_thread(self._write_snapshot, segment, state)
+        log.info('snapshot_written', segment=segment, seconds=round(time.perf_counter() - started, 3))
+
+    async def _snapshot_loop(self):
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(1)
+            records = self._wal.records
+            if records >= self._snapshot_min_records or \
+                    (records and time.monotonic() - last >= self._snapshot_interval):
+                try:
+                    await self.snapshot()
+                except OSError as e:
+                    log.error('snapshot_failed', error=str(e))
+                last = time.monotonic()
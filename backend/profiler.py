@@ -0,0 +1,92 @@
+"""Statistical sampling profiler for a running worker.
+
+A background thread wakes up every ``interval`` seconds, takes the current
+stack of the watched threads from ``sys._current_frames()`` and counts it.
+Results come out as collapsed stacks (``outer;inner;leaf count`` per line),
+the input format of flamegraph.pl and speedscope. Each sample costs one
+stack walk while holding the GIL, so the overhead stays around a percent
+at the default 5 ms interval; nothing is instrumented.
+
+Without ``match`` only the event loop thread is sampled and idle time shows
+up as the selector's ``select`` frame. With ``match`` (code objects of route
+endpoints) every thread is sampled but only stacks passing through one of
+those functions are kept, which profiles a single handler.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken in this process"""
+
+
+_active_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples thread stacks on a timer thread into a Counter of collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005, match: Optional[Iterable] = None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.match = frozenset(match) if match else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.kept = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+
+    def start(self):
+        if not _active_lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self.started_at
+        _active_lock.release()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            self.samples += 1
+            if self.match is None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self._record(frame)
+                continue
+            for thread_id, frame in frames.items():
+                if thread_id != me:
+                    self._record(frame)
+            del frames
+
+    def _record(self, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if self.match is not None and self.match.isdisjoint(codes):
+            return
+        self.stacks[';'.join(_frame_label(code) for code in reversed(codes))] += 1
+        self.kept += 1
+
+    def collapsed(self) -> str:
+        """``frame;frame;frame count`` lines, heaviest stack first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
@@ -0,0 +1,242 @@
+"""Live bill-run progress for Server-Sent Events streams.
+
+Dashboards watching a bill run used to poll ``/api/billing/runs``. The SSE
+routes instead subscribe to a ``ProgressHub``, which reads the watched runs
+once per ``tick`` and fans the changes out to every subscriber:
+
+- Progress comes from the run document the engine checkpoints (see
+  ``billing``), not from the engine, so runs executed by any worker sharing
+  the store are seen.
+- A tick first compares the ``bill_runs`` write counter with the one seen
+  last and reads nothing when it has not moved. Otherwise it reads each
+  watched run once (``get``) and each watched bill cycle once (``find``),
+  however many streams watch them.
+- A run's ``progress_view`` (status, bills generated and approved, failed
+  shards, error, rate and ETA) is compared with the one published last and
+  only the changed fields are queued, with ``id``. A subscriber that has not
+  drained the previous tick gets them merged into what is queued, so a slow
+  client gets at most one delta per run, never a backlog.
+
+A new subscriber gets the full view of its runs at the next tick; streams
+opened between two ticks share its reads. The tick loop runs only while
+someone is subscribed.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from billing import as_utc
+from rendering import dumps
+from structured_logging import get_logger
+
+log = get_logger('progress')
+
+# A single-run stream ends after the run reaches one of these
+FINISHED = ('completed', 'failed', 'partial')
+VIEW_FIELDS = ('id', 'bill_cycle_id', 'status', 'total_accounts', 'bills_generated', 'bills_approved',
+               'bills_kept', 'accounts_rated', 'accounts_reused', 'shards', 'error', 'accounts_per_second',
+               'started_at', 'resumed_at', 'checkpoint_at')
+
+
+def progress_view(run: Dict[str, Any]) -> Dict[str, Any]:
+    """What a dashboard shows of ``run``; rate and ETA are estimated from its checkpoints while it runs"""
+    shards = run.get('shards') or []
+    generated = run.get('bills_generated') or 0
+    if run.get('accounts_rated') is not None:
+        total = (run.get('bills_kept') or 0) + run['accounts_rated'] + (run.get('accounts_reused') or 0)
+    else:
+        total = run.get('total_accounts') or 0
+    rate = eta = None
+    if run.get('status') == 'completed':
+        rate = run.get('accounts_per_second')
+    elif run.get('status') == 'processing':
+        started = [as_utc(value) for value in (run.get('started_at'), run.get('resumed_at'))
+                   if isinstance(value, datetime)]
+        checkpoint = run.get('checkpoint_at')
+        written = generated - (run.get('bills_kept') or 0)
+        if started and isinstance(checkpoint, datetime) and written > 0:
+            seconds = (as_utc(checkpoint) - max(started)).total_seconds()
+            if seconds > 0:
+                rate = round(written / seconds, 1)
+                eta = round(max(total - generated, 0) / rate, 1)
+    return {
+        'id': run['id'],
+        'bill_cycle_id': run.get('bill_cycle_id'),
+        'status': run.get('status'),
+        'total_accounts': total,
+        'bills_generated': generated,
+        'bills_approved': run.get('bills_approved') or 0,
+        'accounts_rated': run.get('accounts_rated'),
+        'accounts_reused': run.get('accounts_reused'),
+        'shards': len(shards),
+        'shards_completed': sum(shard.get('status') == 'completed' for shard in shards),
+        'shards_failed': sum(shard.get('status') == 'failed' for shard in shards),
+        'error': run.get('error'),
+        'accounts_per_second': rate,
+        'eta_seconds': eta,
+    }
+
+
+class Subscription:
+    """Deltas queued for one stream: one dict per run, merged until the stream takes them"""
+
+    def __init__(self, run_id: Optional[str] = None, cycle_id: Optional[str] = None):
+        self.run_id = run_id
+        self.cycle_id = cycle_id
+        # Until the first tick after subscribing, which queues the full views
+        self.fresh = True
+        self.finished = False
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def watches(self, view: Dict[str, Any]) -> bool:
+        return view['id'] == self.run_id or (self.cycle_id is not None and view['bill_cycle_id'] == self.cycle_id)
+
+    def push(self, delta: Dict[str, Any]):
+        queued = self.pending.get(delta['id'])
+        if queued is None:
+            self.pending[delta['id']] = dict(delta)
+        else:
+            queued.update(delta)
+        if self.run_id is not None and delta.get('status') in FINISHED:
+            self.finished = True
+        self._ready.set()
+
+    async def next(self, timeout: float) -> List[Dict[str, Any]]:
+        """Deltas queued since the last call, waiting up to ``timeout`` seconds for one; [] if none came"""
+        if not self.pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        deltas = list(self.pending.values())
+        self.pending = {}
+        return deltas
+
+
+class ProgressHub:
+    """Publishes progress of the bill runs and cycles subscribers watch, once per ``tick`` seconds"""
+
+    def __init__(self, repo, tick: float = 1.0, keepalive: float = 15.0, retry: float = 3.0):
+        self.repo = repo
+        self.tick = max(tick, 0.05)
+        self.keepalive = keepalive
+        self.retry = retry
+        self._subscribers: Set[Subscription] = set()
+        # Last view published per watched run, and (epoch, bill_runs version) it was read at
+        self._views: Dict[str, Dict[str, Any]] = {}
+        self._seen: Optional[Tuple[Optional[str], int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.idle_ticks = 0
+        self.reads = 0
+        self.deltas = 0
+        self.streams_opened = 0
+
+    def subscribe(self, run_id: Optional[str] = None, cycle_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(run_id, cycle_id)
+        self._subscribers.add(subscription)
+        self.streams_opened += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while self._subscribers:
+            try:
+                await self.publish()
+            except Exception as e:
+                log.exception('progress_tick_failed', error=str(e))
+            await asyncio.sleep(self.tick)
+        self._views.clear()
+        self._seen = None
+
+    async def publish(self):
+        """One tick: read the watched runs if any was written to and queue what changed"""
+        self.ticks += 1
+        subscribers = list(self._subscribers)
+        seen = (self.repo.epoch, (await self.repo.versions(['bill_runs']))['bill_runs'])
+        changed = seen != self._seen
+        # Only new subscribers need reads when no run was written to
+        readers = subscribers if changed else [s for s in subscribers if s.fresh]
+        if not readers:
+            self.idle_ticks += 1
+            return
+        views = await self._read({s.run_id for s in readers if s.run_id is not None},
+                                 {s.cycle_id for s in readers if s.cycle_id is not None})
+        self._seen = seen
+        for view in views:
+            last = self._views.get(view['id'])
+            delta = {key: value for key, value in view.items() if last is None or last.get(key) != value}
+            self._views[view['id']] = view
+            if delta:
+                delta['id'] = view['id']
+            for subscription in readers:
+                if subscription.watches(view):
+                    if subscription.fresh:
+                        subscription.push(view)
+                    elif delta:
+                        subscription.push(delta)
+                        self.deltas += 1
+        for subscription in readers:
+            subscription.fresh = False
+        if changed:
+            # Runs no stream watches any more
+            self._views = {run_id: view for run_id, view in self._views.items()
+                           if any(s.watches(view) for s in subscribers)}
+
+    async def _read(self, run_ids: Set[str], cycle_ids: Set[str]) -> List[Dict[str, Any]]:
+        runs: Dict[str, Dict[str, Any]] = {}
+        for cycle_id in cycle_ids:
+            self.reads += 1
+            for run in await self.repo.bill_runs.find(fields=VIEW_FIELDS, bill_cycle_id=cycle_id):
+                runs[run['id']] = run
+        for run_id in run_ids - set(runs):
+            self.reads += 1
+            run = await self.repo.bill_runs.get(run_id, fields=VIEW_FIELDS)
+            if run is not None:
+                runs[run_id] = run
+        return [progress_view(run) for run in runs.values()]
+
+    async def events(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """The ``text/event-stream`` body of ``subscription``; a single-run stream ends with an ``end`` event"""
+        try:
+            yield f'retry: {int(self.retry * 1000)}\n\n'.encode()
+            while True:
+                deltas = await subscription.next(self.keepalive)
+                if not deltas:
+                    # Keeps proxies from timing the connection out
+                    yield b': keepalive\n\n'
+                    continue
+                yield b''.join(b'event: progress\ndata: ' + dumps(delta) + b'\n\n' for delta in deltas)
+                if subscription.finished:
+                    yield b'event: end\ndata: {}\n\n'
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'tick': self.tick,
+            'subscribers': len(self._subscribers),
+            'watched_runs': len(self._views),
+            'streams_opened': self.streams_opened,
+            'ticks': self.ticks,
+            'idle_ticks': self.idle_ticks,
+            'reads': self.reads,
+            'deltas': self.deltas,
+        }
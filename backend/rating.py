@@ -0,0 +1,69 @@
+"""Rating of bill-run services and shards, run in worker processes.
+
+Rating is split in two steps so the per-service work happens in the
+workers, not in the process reading the repository:
+
+- ``charge_services`` takes one page of services as columns (account id,
+  plan id, custom price, monthly charges and is_active), drops the inactive
+  services, prices the others (``custom_price``, else ``monthly_charges``,
+  else the plan's charges) and splits them by shard. Shards are ranges of
+  account ids; ``boundaries`` holds the first account id of every shard.
+- ``rate_shard`` takes the account ids a shard rates and the pieces every
+  page produced for that shard, and sums the charges per account in service
+  order. Services of accounts the shard does not rate are ignored.
+
+Pickling is what the main process pays per service, so id columns travel
+as one string joined with ``SEPARATOR`` (a missing id as '') and amounts
+as ``array('d')`` bytes. This module only imports what rating needs, so
+spawned workers start quickly.
+"""
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+SEPARATOR = '\0'
+# Account ids (joined) of one shard's services and what each costs, as ``array('d')`` bytes
+Charges = Tuple[str, bytes]
+
+
+def join_ids(ids: Sequence[Optional[str]]) -> str:
+    return SEPARATOR.join([value or '' for value in ids])
+
+
+def charge_services(boundaries: Sequence[str], plan_charges: Dict[str, float], account_ids: str, plan_ids: str,
+                    custom_prices: Sequence[Any], monthly_charges: Sequence[Any],
+                    active: Sequence[Any]) -> Dict[int, Charges]:
+    """Charges of the active services of one page, by shard number"""
+    split: Dict[int, Tuple[List[str], array]] = {}
+    for account_id, plan_id, custom, monthly, is_active in zip(
+            account_ids.split(SEPARATOR), plan_ids.split(SEPARATOR), custom_prices, monthly_charges, active):
+        # Equality, like the repository's is_active=True criterion
+        if is_active != True:  # noqa: E712
+            continue
+        number = bisect_right(boundaries, account_id) - 1
+        if number < 0 or not account_id:
+            continue
+        if custom is not None:
+            amount = float(custom)
+        elif monthly is not None:
+            amount = float(monthly)
+        else:
+            amount = float(plan_charges.get(plan_id, 0.0))
+        piece = split.get(number)
+        if piece is None:
+            piece = split[number] = ([], array('d'))
+        piece[0].append(account_id)
+        piece[1].append(amount)
+    return {number: (SEPARATOR.join(ids), amounts.tobytes()) for number, (ids, amounts) in split.items()}
+
+
+def rate_shard(account_ids: Sequence[str], pieces: Sequence[Charges]) -> bytes:
+    """Total charge per account of ``account_ids``, as ``array('d')`` bytes"""
+    position = {account_id: index for index, account_id in enumerate(account_ids)}
+    totals = array('d', bytes(8 * len(account_ids)))
+    for ids, charges in pieces:
+        for account_id, amount in zip(ids.split(SEPARATOR), array('d', charges)):
+            index = position.get(account_id)
+            if index is not None:
+                totals[index] += amount
+    return totals.tobytes()
@@ -0,0 +1,226 @@
+"""Fast JSON rendering for records the API itself stored.
+
+Returning ``ServiceResponse(**row)`` from a handler with a ``response_model``
+validates every row (and its nested plan and account) once in the handler and
+again while FastAPI serializes the response. Rows read from the repository
+were validated when they were written, so the hot list routes instead
+project them with a ``TrustedShape`` and return a ``FastJSONResponse``;
+FastAPI skips response-model processing for ``Response`` objects, while the
+declared ``response_model`` keeps the OpenAPI schema unchanged.
+
+A shape is compiled once per model. Projecting a row keeps only the model's
+fields in declaration order, fills defaults, turns ints into floats for float
+fields and passes nested models through their own shape. Values are only
+type-checked, not validated (an ``EmailStr`` is trusted to be one); a row with
+a missing required field or a value of an unexpected type goes through the
+model instead, so bad data still fails the way it did before. ``only`` gives
+the shape of a sparse fieldset: the same projection restricted to a few
+fields.
+
+Bodies are rendered with orjson when installed, otherwise with
+``pydantic_core.to_json``; both match the output of pydantic's JSON mode
+(``Z`` suffix for UTC datetimes, enums as their values).
+
+``ndjson_response`` streams a listing as newline-delimited JSON for clients
+sending ``Accept: application/x-ndjson``. Rows come in batches from an async
+iterator and each is encoded on its own, so memory stays at one batch however
+long the listing is. Rows without a model are encoded like FastAPI's default
+JSON response (``+00:00`` offsets).
+"""
+import copy
+import typing
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Type
+
+from pydantic import BaseModel, EmailStr
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+    import pydantic_core
+    from fastapi.encoders import jsonable_encoder
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+_MISSING = object()
+# Field kinds checked while projecting; anything else is passed through
+_ANY, _FLOAT, _INT, _BOOL, _STR, _DATETIME, _ENUM, _MODEL = range(8)
+_SIMPLE_KINDS = {float: _FLOAT, int: _INT, bool: _BOOL, str: _STR, datetime: _DATETIME}
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return pydantic_core.to_json(content)
+
+
+def dumps_plain(content: Any) -> bytes:
+    """JSON as FastAPI renders handler results without a response model"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(jsonable_encoder(content), separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson (or pydantic-core), no encoder pass"""
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _field_kind(annotation) -> tuple:
+    """(kind, nullable, extra) for a field annotation"""
+    nullable = False
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        nullable = len(args) < len(typing.get_args(annotation))
+        if len(args) != 1:
+            return _ANY, nullable, None
+        annotation = args[0]
+    if annotation in _SIMPLE_KINDS:
+        return _SIMPLE_KINDS[annotation], nullable, None
+    if annotation is EmailStr:
+        return _STR, nullable, None
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            # Members hash by name, so stored raw values need their own entries
+            return _ENUM, nullable, frozenset(list(annotation) + [member.value for member in annotation])
+        if issubclass(annotation, BaseModel):
+            return _MODEL, nullable, annotation
+    return _ANY, nullable, None
+
+
+class TrustedShape:
+    """Projects stored rows onto a response model without validating them"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.names: Optional[FrozenSet[str]] = None
+        self._subsets: Dict[FrozenSet[str], 'TrustedShape'] = {}
+        self.fields = []
+        for name, info in model.model_fields.items():
+            kind, nullable, extra = _field_kind(info.annotation)
+            if kind == _MODEL:
+                extra = shape(extra)
+            if info.is_required():
+                default = _MISSING
+            elif info.default_factory is not None:
+                default = info.default_factory()
+            else:
+                default = info.default
+            self.fields.append((name, default, kind, nullable, extra))
+
+    def project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        out = {}
+        for name, default, kind, nullable, extra in self.fields:
+            value = row.get(name, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING:
+                    return self.validated(row)
+                value = default
+            elif value is None:
+                if not nullable:
+                    return self.validated(row)
+            elif kind == _FLOAT:
+                value_type = type(value)
+                if value_type is int:
+                    value = float(value)
+                elif value_type is not float:
+                    return self.validated(row)
+            elif kind == _STR:
+                if not isinstance(value, str):
+                    return self.validated(row)
+            elif kind == _DATETIME:
+                if not isinstance(value, datetime):
+                    return self.validated(row)
+            elif kind == _ENUM:
+                if value not in extra:
+                    return self.validated(row)
+            elif kind == _MODEL:
+                if not isinstance(value, dict):
+                    return self.validated(row)
+                value = extra.project(value)
+            elif kind == _BOOL:
+                if type(value) is not bool:
+                    return self.validated(row)
+            elif kind == _INT:
+                # IntEnum members render as their value; bools would render as true/false
+                if not isinstance(value, int) or type(value) is bool:
+                    return self.validated(row)
+            out[name] = value
+        return out
+
+    def validated(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Slow path: full model validation (raises on invalid rows)"""
+        out = self.model.model_validate(row).model_dump()
+        if self.names is None:
+            return out
+        return {name: out[name] for name, *_ in self.fields}
+
+    def only(self, names: Iterable[str]) -> 'TrustedShape':
+        """Shape projecting just the fields in ``names``, still in declaration order"""
+        names = frozenset(names).intersection(self.model.model_fields)
+        subset = self._subsets.get(names)
+        if subset is None:
+            subset = copy.copy(self)
+            subset.names = names
+            subset.fields = [field for field in self.fields if field[0] in names]
+            subset._subsets = {}
+            self._subsets[names] = subset
+        return subset
+
+
+_shapes: Dict[type, TrustedShape] = {}
+
+
+def shape(model: Type[BaseModel]) -> TrustedShape:
+    compiled = _shapes.get(model)
+    if compiled is None:
+        compiled = _shapes[model] = TrustedShape(model)
+    return compiled
+
+
+def trusted_list(model: Type[BaseModel], rows: Iterable[Dict[str, Any]],
+                 headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """Render ``rows`` as a JSON list of ``model`` without validating them twice"""
+    project = shape(model).project
+    return FastJSONResponse([project(row) for row in rows], headers=headers)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def ndjson_response(batches: AsyncIterator[List[Dict[str, Any]]], model: Optional[Type[BaseModel]] = None,
+                    transform: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None,
+                    headers: Optional[Dict[str, str]] = None, projected: bool = False) -> StreamingResponse:
+    """Stream ``batches`` as one JSON document per line, one chunk per batch
+
+    ``transform`` (e.g. adding related records) runs per row before it is
+    projected onto ``model``; without a model rows are encoded as they are,
+    or like ``trusted_list`` output when they were ``projected`` already.
+    """
+    if model is not None:
+        encode = lambda row, project=shape(model).project: dumps(project(row))
+    else:
+        encode = dumps if projected else dumps_plain
+
+    async def body():
+        async for batch in batches:
+            lines = []
+            for row in batch:
+                if transform is not None:
+                    row = await transform(row)
+                lines.append(encode(row))
+            if lines:
+                lines.append(b'')
+                yield b'\n'.join(lines)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
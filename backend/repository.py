@@ -0,0 +1,519 @@
+"""Entity repository in front of the in-memory ``dummy_data`` store.
+
+Route handlers never touch ``dummy_data`` lists directly; they go through a
+``Repository`` whose collections keep a primary-key hash index next to the
+row list, so lookups by id are O(1) regardless of collection size.
+Collections can also maintain secondary (optionally composite) indexes so
+equality filters only touch matching rows.
+
+The interface is async so a database-backed implementation can be swapped in
+without touching the route handlers; ``create_repository`` picks the backend.
+Read methods accept ``fields`` naming the keys the caller needs. Backends
+that can project (MongoDB) only return those keys; the in-memory store
+returns the full row, which is always a superset.
+
+``page`` reads rows in the stable ``PAGE_ORDER`` (created_at, id) starting
+after a given key, which is what keyset pagination needs: every backend keeps
+a sorted index on that order, so a page deep into a collection costs the same
+as the first one.
+
+Set ``MEMORY_WAL_DIR`` to make the in-memory store durable: writes go to a
+write-ahead log with periodic snapshots (see ``persistence``).
+"""
+import bisect
+import heapq
+import os
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+COLLECTIONS = (
+    'users',
+    'profiles',
+    'accounts',
+    'plans',
+    'services',
+    'invoices',
+    'payments',
+    'bill_cycles',
+    'bill_schedules',
+    'bill_runs',
+    'billed_accounts',
+    'billing_changes',
+)
+
+# Secondary indexes per collection; each entry is a tuple of field names.
+# Database backends create the same indexes on startup.
+INDEXES = {
+    'users': (
+        ('profile_id',),
+        ('email_key',),
+    ),
+    'profiles': (
+        ('master_profile_id',),
+    ),
+    'accounts': (
+        ('user_id',),
+    ),
+    'bill_runs': (
+        ('bill_cycle_id',),
+        ('status',),
+    ),
+    'billed_accounts': (
+        ('bill_run_id',),
+        ('account_id',),
+    ),
+    'services': (
+        ('account_id',),
+        ('plan_id',),
+        ('managed_by',),
+        ('service_category',),
+        ('is_active',),
+        ('service_category', 'is_active'),
+        ('service_category', 'managed_by', 'is_active'),
+    ),
+}
+
+# Sort order of ``page``; rows without created_at come first
+PAGE_ORDER = ('created_at', 'id')
+# (created_at or None, id) of a row, the position ``page`` continues after
+PageKey = Tuple[Optional[datetime], str]
+
+# Values assumed for fields missing from a row, mirroring the ``row.get(field, default)``
+# checks the routes have always used
+FIELD_DEFAULTS = {
+    'services': {'is_active': True},
+}
+
+
+def normalize_email(email: Any) -> Any:
+    """Lookup form of an email address: surrounding whitespace stripped, lower-cased"""
+    return email.strip().lower() if isinstance(email, str) else email
+
+
+# Fields computed from another field of the same row on every insert and update,
+# so they can be indexed like stored ones: collection -> {field: (source, function)}.
+# Database backends backfill them on startup for rows written before they existed.
+DERIVED_FIELDS = {
+    'users': {'email_key': ('email', normalize_email)},
+}
+
+
+def derive(derived: Optional[Dict[str, Tuple[str, Callable[[Any], Any]]]], row: Dict[str, Any]) -> Dict[str, Any]:
+    """Set every derived field whose source is present in ``row``; returns ``row``"""
+    if derived:
+        for field, (source, fn) in derived.items():
+            if source in row:
+                row[field] = fn(row[source])
+    return row
+
+# Write listeners are called as listener(op, collection, id, payload) after every
+# successful write; op is 'insert' (payload: the row), 'update' (payload: the
+# changed fields with their new values), 'delete' (payload: {}) or 'config'
+# (payload: the changes).
+#
+# Every backend also counts writes per collection: ``versions(names)`` returns
+# the counters and ``epoch`` is a token that changes whenever they restart from
+# zero, so (epoch, versions) identifies the state of those collections. The
+# counter is bumped once the write is stored, so a version read before reading
+# rows never describes rows older than the ones read.
+WriteListener = Callable[[str, str, Optional[str], Dict[str, Any]], None]
+
+
+def notify(listeners: List[WriteListener], op: str, collection: str, entity_id: Optional[str],
+           payload: Dict[str, Any]):
+    for listener in listeners:
+        listener(op, collection, entity_id, payload)
+
+
+_MIN_CREATED = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _page_key(row: Dict[str, Any]) -> Tuple[datetime, str]:
+    created = row.get('created_at')
+    return (created if isinstance(created, datetime) else _MIN_CREATED, row['id'])
+
+
+class InMemoryCollection:
+    """A list of row dicts plus hash indexes kept in sync on every write"""
+
+    def __init__(self, name: str, rows: List[Dict[str, Any]],
+                 indexes: Sequence[Tuple[str, ...]] = (), defaults: Optional[Dict[str, Any]] = None,
+                 listeners: Optional[List[WriteListener]] = None,
+                 derived: Optional[Dict[str, Tuple[str, Callable[[Any], Any]]]] = None):
+        self.name = name
+        # The list is shared with ``dummy_data`` so both views stay identical
+        self._rows = rows
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        # Insertion sequence per id, used to keep index buckets in list order
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._defaults = defaults or {}
+        self._derived = derived or {}
+        # fields -> {key tuple -> {id -> row}}
+        self._indexes: Dict[Tuple[str, ...], Dict[tuple, Dict[str, Dict[str, Any]]]] = {
+            tuple(fields): {} for fields in indexes
+        }
+        self._indexed_fields = {field for fields in self._indexes for field in fields}
+        # Buckets that received an older row after a newer one and need re-sorting
+        self._unsorted = set()
+        # Shared with the repository, see ``WriteListener``
+        self.listeners = listeners if listeners is not None else []
+        # Writes since the collection was built
+        self.version = 0
+        # Sorted ``_page_key`` of every row, built on the first ``page`` call
+        self._order: Optional[List[Tuple[datetime, str]]] = None
+        self._build(rows)
+
+    def _build(self, rows: List[Dict[str, Any]]):
+        """Index ``rows`` in bulk; they arrive in list order so buckets come out sorted"""
+        by_id = self._by_id
+        for seq, row in enumerate(rows):
+            derive(self._derived, row)
+            row_id = row['id']
+            if row_id in by_id:
+                raise ValueError(f"Duplicate id {row_id!r} in {self.name}")
+            by_id[row_id] = row
+            self._seq[row_id] = seq
+        self._next_seq = len(rows)
+        for fields, index in self._indexes.items():
+            defaults = tuple(self._defaults.get(field) for field in fields)
+            if len(fields) == 1:
+                field, default = fields[0], defaults[0]
+                keys = [(row.get(field, default),) for row in rows]
+            else:
+                pairs = tuple(zip(fields, defaults))
+                keys = [tuple([row.get(field, default) for field, default in pairs]) for row in rows]
+            for key, row in zip(keys, rows):
+                try:
+                    index[key][row['id']] = row
+                except KeyError:
+                    index[key] = {row['id']: row}
+
+    def _index(self, row: Dict[str, Any]):
+        if row['id'] in self._by_id:
+            raise ValueError(f"Duplicate id {row['id']!r} in {self.name}")
+        self._by_id[row['id']] = row
+        self._seq[row['id']] = self._next_seq
+        self._next_seq += 1
+        for fields in self._indexes:
+            self._bucket_add(fields, self._key(row, fields), row)
+
+    def _key(self, row: Dict[str, Any], fields: Tuple[str, ...]) -> tuple:
+        return tuple(row.get(field, self._defaults.get(field)) for field in fields)
+
+    def _bucket_add(self, fields, key, row):
+        bucket = self._indexes[fields].setdefault(key, {})
+        if bucket and self._seq[row['id']] < self._seq[next(reversed(bucket))]:
+            self._unsorted.add((fields, key))
+        bucket[row['id']] = row
+
+    def _bucket_remove(self, fields, key, row_id):
+        bucket = self._indexes[fields].get(key)
+        if bucket is not None:
+            bucket.pop(row_id, None)
+            if not bucket:
+                del self._indexes[fields][key]
+                self._unsorted.discard((fields, key))
+
+    def _bucket(self, fields, key) -> Dict[str, Dict[str, Any]]:
+        bucket = self._indexes[fields].get(key)
+        if bucket is None:
+            return {}
+        if (fields, key) in self._unsorted:
+            bucket = dict(sorted(bucket.items(), key=lambda item: self._seq[item[0]]))
+            self._indexes[fields][key] = bucket
+            self._unsorted.discard((fields, key))
+        return bucket
+
+    def _plan(self, criteria: Dict[str, Any]) -> Tuple[Iterable[Dict[str, Any]], Dict[str, Any], int]:
+        """Pick the smallest index bucket covering part of ``criteria``
+
+        Returns the candidate rows, the criteria still to be checked per row and
+        the number of candidates.
+        """
+        best_fields, best_bucket = None, None
+        for fields in self._indexes:
+            if all(field in criteria for field in fields):
+                bucket = self._bucket(fields, tuple(criteria[field] for field in fields))
+                if best_bucket is None or len(bucket) < len(best_bucket) or \
+                        (len(bucket) == len(best_bucket) and len(fields) > len(best_fields)):
+                    best_fields, best_bucket = fields, bucket
+        if best_bucket is None:
+            return self._by_id.values(), criteria, len(self._by_id)
+        remaining = {field: value for field, value in criteria.items() if field not in best_fields}
+        return best_bucket.values(), remaining, len(best_bucket)
+
+    def _matches(self, row: Dict[str, Any], criteria: Dict[str, Any]) -> bool:
+        return all(row.get(field, self._defaults.get(field)) == value for field, value in criteria.items())
+
+    async def get(self, entity_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Return the stored row (not a copy) or None"""
+        return self._by_id.get(entity_id)
+
+    async def list(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Return all rows in insertion order"""
+        return list(self._rows)
+
+    async def find(self, fields: Optional[Sequence[str]] = None, **criteria) -> List[Dict[str, Any]]:
+        """Return rows whose fields equal every keyword argument, in insertion order"""
+        candidates, remaining, _ = self._plan(criteria)
+        if not remaining:
+            return list(candidates)
+        return [row for row in candidates if self._matches(row, remaining)]
+
+    async def page(self, limit: int, after: Optional[PageKey] = None, fields: Optional[Sequence[str]] = None,
+                   **criteria) -> List[Dict[str, Any]]:
+        """Up to ``limit`` rows matching ``criteria`` in ``PAGE_ORDER``, starting after the key ``after``"""
+        if self._order is None:
+            self._order = sorted(_page_key(row) for row in self._rows)
+        order = self._order
+        start_key = (after[0] or _MIN_CREATED, after[1]) if after is not None else None
+        start = bisect.bisect_right(order, start_key) if start_key is not None else 0
+        by_id = self._by_id
+        if not criteria:
+            return [by_id[row_id] for _, row_id in order[start:start + limit]]
+        candidates, remaining, size = self._plan(criteria)
+        if size * size < limit * len(order):
+            # Sorting the matching bucket is cheaper than walking the order
+            # until ``limit`` matches (about limit * n / size rows)
+            matches = (row for row in candidates if self._matches(row, remaining))
+            if start_key is not None:
+                matches = (row for row in matches if _page_key(row) > start_key)
+            return heapq.nsmallest(limit, matches, key=_page_key)
+        rows = []
+        for _, row_id in islice(order, start, None):
+            row = by_id[row_id]
+            if self._matches(row, criteria):
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return rows
+
+    async def count(self, **criteria) -> int:
+        if not criteria:
+            return len(self._rows)
+        candidates, remaining, size = self._plan(criteria)
+        if not remaining:
+            return size
+        return sum(1 for row in candidates if self._matches(row, remaining))
+
+    async def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        self._insert(row)
+        if self.listeners:
+            notify(self.listeners, 'insert', self.name, row['id'], row)
+        return row
+
+    async def insert_many(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            await self.insert(row)
+
+    def _insert(self, row: Dict[str, Any]):
+        derive(self._derived, row)
+        self._index(row)
+        self._rows.append(row)
+        if self._order is not None:
+            bisect.insort(self._order, _page_key(row))
+        self.version += 1
+
+    async def update(self, entity_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply ``changes`` to the row in place; returns None if the id is unknown"""
+        row = self._update(entity_id, changes)
+        if row is not None and self.listeners:
+            notify(self.listeners, 'update', self.name, entity_id, changes)
+        return row
+
+    def _update(self, entity_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        row = self._by_id.get(entity_id)
+        if row is None:
+            return None
+        if 'id' in changes and changes['id'] != entity_id:
+            raise ValueError("Primary key cannot be changed")
+        if self._derived:
+            changes = derive(self._derived, dict(changes))
+        touched = []
+        if not self._indexed_fields.isdisjoint(changes):
+            touched = [fields for fields in self._indexes if any(field in changes for field in fields)]
+        old_keys = [self._key(row, fields) for fields in touched]
+        old_page_key = _page_key(row) if self._order is not None and 'created_at' in changes else None
+        row.update(changes)
+        for fields, old_key in zip(touched, old_keys):
+            new_key = self._key(row, fields)
+            if new_key != old_key:
+                self._bucket_remove(fields, old_key, entity_id)
+                self._bucket_add(fields, new_key, row)
+        if old_page_key is not None:
+            del self._order[bisect.bisect_left(self._order, old_page_key)]
+            bisect.insort(self._order, _page_key(row))
+        self.version += 1
+        return row
+
+    async def increment(self, entity_id: str, field: str, amount: int = 1, expect: Optional[Dict[str, Any]] = None,
+                        changes: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Add ``amount`` to a numeric field and apply ``changes`` in the same write.
+
+        With ``expect`` the row is only written if it has those field values;
+        None when it does not, or the id is unknown.
+        """
+        row = self._by_id.get(entity_id)
+        if row is None or (expect and any(row.get(key) != value for key, value in expect.items())):
+            return None
+        return await self.update(entity_id, {**(changes or {}), field: row.get(field, 0) + amount})
+
+    async def delete_many(self, ids: Iterable[str]) -> int:
+        """Remove the rows with these ids; returns how many there were"""
+        deleted = self._delete(ids)
+        if self.listeners:
+            for entity_id in deleted:
+                notify(self.listeners, 'delete', self.name, entity_id, {})
+        return len(deleted)
+
+    def _delete(self, ids: Iterable[str]) -> List[str]:
+        deleted = []
+        for entity_id in ids:
+            row = self._by_id.pop(entity_id, None)
+            if row is None:
+                continue
+            del self._seq[entity_id]
+            for fields in self._indexes:
+                self._bucket_remove(fields, self._key(row, fields), entity_id)
+            if self._order is not None:
+                del self._order[bisect.bisect_left(self._order, _page_key(row))]
+            deleted.append(entity_id)
+        if deleted:
+            # One pass over the list, however many rows go
+            gone = set(deleted)
+            self._rows[:] = [row for row in self._rows if row['id'] not in gone]
+            self.version += len(deleted)
+        return deleted
+
+    def apply(self, op: str, entity_id: str, payload: Dict[str, Any]):
+        """Redo a logged write; inserts of an existing id overwrite it so replay is idempotent"""
+        if op == 'delete':
+            self._delete([entity_id])
+        elif op == 'insert' and entity_id not in self._by_id:
+            self._insert(payload)
+        else:
+            self._update(entity_id, payload)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Shallow copy of the row list, taken atomically"""
+        return self._rows[:]
+
+
+class InMemoryRepository:
+    """Typed access to every collection of the backing ``data`` dict
+
+    ``seed`` is called on ``open`` to fill an empty store. With ``persistence``
+    set, ``open`` first restores the newest snapshot plus the log tail, and
+    every write is appended to the write-ahead log.
+    """
+
+    # Only this process writes to the store, so write listeners see every change
+    shared = False
+
+    def __init__(self, data: Dict[str, Any], seed: Optional[Callable[[], Dict[str, Any]]] = None,
+                 persistence=None):
+        self._seed = seed
+        self._persistence = persistence
+        self.listeners: List[WriteListener] = []
+        self.load(data)
+
+    def load(self, data: Dict[str, Any]):
+        """(Re)build all collections and indexes from ``data``"""
+        self._data = data
+        # Versions restart with the collections; the counters only live in this process
+        self.epoch = os.urandom(6).hex()
+        for name in COLLECTIONS:
+            setattr(self, name, InMemoryCollection(
+                name,
+                data.setdefault(name, []),
+                indexes=INDEXES.get(name, ()),
+                defaults=FIELD_DEFAULTS.get(name),
+                listeners=self.listeners,
+                derived=DERIVED_FIELDS.get(name),
+            ))
+        data.setdefault('system_config', {'deposit_multiplier': 2.0})
+
+    def restore(self, data: Dict[str, Any]):
+        """Replace every row and the config with ``data``, keeping the backing dict"""
+        for name in COLLECTIONS:
+            self._data.setdefault(name, [])[:] = data.get(name, [])
+        self._data.setdefault('system_config', {}).clear()
+        self._data['system_config'].update(data.get('system_config', {'deposit_multiplier': 2.0}))
+        self.load(self._data)
+
+    def apply(self, op: str, collection: str, entity_id: Optional[str], payload: Dict[str, Any]):
+        """Redo one logged write without notifying listeners"""
+        if op == 'config':
+            self._data['system_config'].update(payload)
+        else:
+            getattr(self, collection).apply(op, entity_id, payload)
+
+    def add_write_listener(self, listener: WriteListener):
+        self.listeners.append(listener)
+
+    def remove_write_listener(self, listener: WriteListener):
+        self.listeners.remove(listener)
+
+    async def versions(self, names: Sequence[str]) -> Dict[str, int]:
+        return {name: getattr(self, name).version for name in names}
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Row lists and config as of now; rows are shared, only the lists are copied"""
+        state = {name: getattr(self, name).rows() for name in COLLECTIONS}
+        state['system_config'] = dict(self._data['system_config'])
+        return state
+
+    async def open(self):
+        recovered = False
+        if self._persistence is not None:
+            recovered = await self._persistence.recover(self)
+        if not recovered and self._seed is not None:
+            self.restore(self._seed())
+        if self._persistence is not None:
+            await self._persistence.start(self)
+
+    async def close(self):
+        if self._persistence is not None:
+            await self._persistence.close()
+
+    async def checkpoint(self):
+        """Write a snapshot now so the next start replays no log"""
+        if self._persistence is not None:
+            await self._persistence.snapshot()
+
+    async def get_config(self) -> Dict[str, Any]:
+        return dict(self._data['system_config'])
+
+    async def update_config(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        self._data['system_config'].update(changes)
+        if self.listeners:
+            notify(self.listeners, 'config', 'system_config', None, changes)
+        return dict(self._data['system_config'])
+
+
+def create_repository(backend: str, data: Dict[str, Any], seed: Optional[Callable[[], Dict[str, Any]]] = None):
+    """Build the repository for ``backend``
+
+    ``data`` backs the in-memory store; ``seed`` is only called, on ``open``,
+    when the store turns out to be empty.
+    """
+    if backend == 'memory':
+        wal_dir = os.environ.get('MEMORY_WAL_DIR')
+        if not wal_dir:
+            return InMemoryRepository(data, seed=seed)
+        from persistence import Persistence
+        return InMemoryRepository(data, seed=seed, persistence=Persistence(
+            wal_dir,
+            fsync_interval_ms=int(os.environ.get('MEMORY_WAL_FSYNC_INTERVAL_MS', '20')),
+            snapshot_interval_s=float(os.environ.get('MEMORY_SNAPSHOT_INTERVAL_S', '300')),
+            snapshot_min_records=int(os.environ.get('MEMORY_SNAPSHOT_MIN_RECORDS', '100000')),
+        ))
+    if backend == 'mongo':
+        from mongo_repository import MongoRepository
+        return MongoRepository(os.environ['MONGO_URL'], os.environ['DB_NAME'], seed=seed)
+    if backend == 'sqlite':
+        from sqlite_repository import DEFAULT_PATH, SQLiteRepository
+        return SQLiteRepository(os.environ.get('SQLITE_PATH', str(DEFAULT_PATH)), seed=seed)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,1718 @@
+"""Demo seed data for empty stores.
+
+Only imported when a repository finds its store empty, so building these
+literals never runs on the import path of ``server``. Demo users all share
+the password ``password``; its bcrypt hash is precomputed so seeding costs no
+hashing at all.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict
+
+# passlib bcrypt hash of 'password' (12 rounds)
+DEMO_PASSWORD_HASH = '$2b$12$247amv.XZJhsiq7Vh6sAbufQUcTTgZtN8NDtRNS0RA4akaec0VMj2'
+
+
+def build_dummy_data() -> Dict[str, Any]:
+    """Return a fresh copy of every demo collection plus the default system config"""
+    # Add demo users
+    demo_users = [
+        {
+            'id': 'user_001',
+            'email': 'superadmin@example.com',
+            'name': 'Super Admin',
+            'role': 'super_admin',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_master',
+            'department': 'Executive Management',
+            'title': 'Chief Executive Officer',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_002',
+            'email': 'admin@example.com',
+            'name': 'Admin User',
+            'role': 'admin',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_001',
+            'department': 'Administration',
+            'title': 'System Administrator',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_003',
+            'email': 'user@example.com',
+            'name': 'Regular User',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_001',
+            'department': 'Operations',
+            'title': 'Operations Manager',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_004',
+            'email': 'manager@techsolutions.com',
+            'name': 'Tech Manager',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_001',
+            'department': 'Technology',
+            'title': 'Technical Manager',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_005',
+            'email': 'staff@greenrestaurant.com',
+            'name': 'Restaurant Staff',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_002',
+            'department': 'Food Service',
+            'title': 'Restaurant Manager',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_006',
+            'email': 'chef@greenrestaurant.com',
+            'name': 'Head Chef',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_002',
+            'department': 'Kitchen',
+            'title': 'Executive Chef',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_007',
+            'email': 'creative@digitalmarketing.com',
+            'name': 'Creative Director',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_003',
+            'department': 'Creative',
+            'title': 'Creative Director',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_008',
+            'email': 'doctor@healthcaresolutions.com',
+            'name': 'Dr. Sarah Johnson',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_004',
+            'department': 'Medical',
+            'title': 'Chief Medical Officer',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_009',
+            'email': 'supervisor@manufacturing.com',
+            'name': 'Production Supervisor',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_005',
+            'department': 'Manufacturing',
+            'title': 'Production Supervisor',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_010',
+            'email': 'john.smith@personal.com',
+            'name': 'John Smith',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_enduser',
+            'department': 'Personal',
+            'title': 'Individual Customer',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_011',
+            'email': 'analyst@techsolutions.com',
+            'name': 'Data Analyst',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_001',
+            'department': 'Analytics',
+            'title': 'Senior Data Analyst',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_012',
+            'email': 'support@techsolutions.com',
+            'name': 'Support Specialist',
+            'role': 'user',
+            'password': DEMO_PASSWORD_HASH,
+            'profile_id': 'prof_001',
+            'department': 'Customer Support',
+            'title': 'Support Specialist',
+            'is_active': True,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        }
+    ]
+    
+    # Add demo profiles with master profile references and user tags
+    demo_profiles = [
+        {
+            'id': 'prof_master',
+            'name': 'UtilityTech Master Organization',
+            'email': 'master@utilitytech.com',
+            'phone': '+1-800-UTILITY-MASTER',
+            'profession': 'Master Utility Organization',
+            'address': '1000 Corporate Blvd, Suite 1200',
+            'city': 'San Francisco',
+            'state': 'CA',
+            'zipcode': '94105',
+            'deposit_amount': 0.0,
+            'linked_plan_id': None,
+            'is_master_profile': True,
+            'license_number': 'UTIL-MASTER-2024-001',
+            'established_year': '2020',
+            'service_area': 'California, Nevada, Arizona',
+            'total_customers': 50000,
+            'annual_revenue': 50000000.0,
+            'is_active': True,
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_001',
+            'name': 'Tech Solutions Inc',
+            'email': 'contact@techsolutions.com',
+            'phone': '+1-555-0101',
+            'profession': 'Technology Company',
+            'address': '123 Tech Street, Floor 5',
+            'city': 'San Francisco',
+            'state': 'CA',
+            'zipcode': '94102',
+            'deposit_amount': 1500.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'department': 'IT Services',
+            'employee_count': 25,
+            'monthly_usage': 2500.0,
+            'is_active': True,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_002',
+            'name': 'Green Restaurant Group',
+            'email': 'info@greenrestaurant.com',
+            'phone': '+1-555-0102',
+            'profession': 'Restaurant Chain',
+            'address': '456 Food Avenue, Building A',
+            'city': 'Los Angeles',
+            'state': 'CA',
+            'zipcode': '90210',
+            'deposit_amount': 2000.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'department': 'Food & Beverage',
+            'employee_count': 150,
+            'monthly_usage': 8500.0,
+            'is_active': True,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_003',
+            'name': 'Digital Marketing Hub',
+            'email': 'hello@digitalmarketing.com',
+            'phone': '+1-555-0103',
+            'profession': 'Marketing Agency',
+            'address': '789 Creative Blvd, Studio 12',
+            'city': 'Los Angeles',
+            'state': 'CA',
+            'zipcode': '90211',
+            'deposit_amount': 1200.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'department': 'Creative Services',
+            'employee_count': 35,
+            'monthly_usage': 3200.0,
+            'is_active': True,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_004',
+            'name': 'Healthcare Solutions LLC',
+            'email': 'admin@healthcaresolutions.com',
+            'phone': '+1-555-0104',
+            'profession': 'Healthcare Provider',
+            'address': '321 Medical Center Dr',
+            'city': 'San Diego',
+            'state': 'CA',
+            'zipcode': '92101',
+            'deposit_amount': 3000.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'department': 'Medical Services',
+            'employee_count': 75,
+            'monthly_usage': 5500.0,
+            'is_active': True,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_005',
+            'name': 'Manufacturing Corp',
+            'email': 'operations@manufacturing.com',
+            'phone': '+1-555-0105',
+            'profession': 'Manufacturing',
+            'address': '555 Industrial Way',
+            'city': 'Sacramento',
+            'state': 'CA',
+            'zipcode': '95814',
+            'deposit_amount': 5000.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'department': 'Production',
+            'employee_count': 200,
+            'monthly_usage': 15000.0,
+            'is_active': True,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'prof_enduser',
+            'name': 'John Smith Personal Account',
+            'email': 'john.smith@personal.com',
+            'phone': '+1-555-0199',
+            'profession': 'Individual Consumer',
+            'address': '999 Residential St, Apt 5B',
+            'city': 'Oakland',
+            'state': 'CA',
+            'zipcode': '94607',
+            'deposit_amount': 200.0,
+            'linked_plan_id': None,
+            'master_profile_id': 'prof_master',
+            'end_user': True,
+            'account_type': 'Personal',
+            'monthly_usage': 350.0,
+            'is_active': True,
+            'created_by': 'user_010',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        }
+    ]
+    
+    # Enhanced demo service plans with new fields (Base Plans - plan_type: 1, Addon Plans - plan_type: 2)
+    demo_plans = [
+        # Base Plans (plan_type = 1)
+        {
+            'id': 'plan_001',
+            'name': 'Enterprise Electricity Pro',
+            'description': 'High-capacity electricity plan for large businesses',
+            'plan_type': 1,  # Base Plan
+            'service_type': 'electricity',
+            'charge_type': 'recurring',
+            'charge_category': 'utility',
+            'base_price': 250.0,
+            'setup_fee': 100.0,
+            'charges': 250.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 2.0,
+            'features': ['24/7 Priority Support', 'Dedicated Account Manager', 'Green Energy Option', 'Load Balancing'],
+            'terms_conditions': 'Enterprise-level service agreement with SLA guarantees',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,  # for end users
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'plan_002',
+            'name': 'Admin Internet Management',
+            'description': 'Special internet plan for admin management',
+            'plan_type': 1,  # Base Plan
+            'service_type': 'internet',
+            'charge_type': 'recurring',
+            'charge_category': 'administrative',
+            'base_price': 120.0,
+            'setup_fee': 50.0,
+            'charges': 120.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.5,
+            'features': ['Admin Dashboard Access', 'Management Tools', '99.9% Uptime SLA', 'Priority Support'],
+            'terms_conditions': 'Administrative service agreement',
+            'is_proration_enabled': False,
+            'status': 'active',
+            'is_for_admin': True,  # for admins
+            'assigned_to_role': 'admin',
+            'created_for_admin': 'user_002',
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'plan_003',
+            'name': 'Commercial Water Supply Plus',
+            'description': 'Enhanced water supply for commercial operations',
+            'plan_type': 1,  # Base Plan
+            'service_type': 'water',
+            'charge_type': 'recurring',
+            'charge_category': 'utility',
+            'base_price': 85.0,
+            'setup_fee': 25.0,
+            'charges': 85.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 2.5,
+            'features': ['High Pressure System', 'Quality Testing', 'Emergency Support', 'Usage Analytics'],
+            'terms_conditions': 'Monthly service with consumption-based billing',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        
+        # Addon Plans (plan_type = 2)
+        {
+            'id': 'addon_001',
+            'name': 'Premium Support Addon',
+            'description': '24/7 premium technical support with dedicated engineer',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'electricity',
+            'charge_type': 'recurring',
+            'charge_category': 'service',
+            'base_price': 50.0,
+            'setup_fee': 0.0,
+            'charges': 50.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['24/7 Premium Support', 'Dedicated Engineer', '2-Hour Response Time', 'Priority Queue'],
+            'terms_conditions': 'Premium support addon for electricity services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'addon_002',
+            'name': 'Advanced Monitoring Addon',
+            'description': 'Real-time monitoring and analytics dashboard',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'electricity',
+            'charge_type': 'recurring',
+            'charge_category': 'service',
+            'base_price': 30.0,
+            'setup_fee': 25.0,
+            'charges': 30.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['Real-time Monitoring', 'Custom Analytics Dashboard', 'Usage Forecasting', 'Automated Alerts'],
+            'terms_conditions': 'Advanced monitoring addon for electricity services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'addon_003',
+            'name': 'Green Energy Addon',
+            'description': '100% renewable energy sourcing with carbon credits',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'electricity',
+            'charge_type': 'recurring',
+            'charge_category': 'utility',
+            'base_price': 40.0,
+            'setup_fee': 0.0,
+            'charges': 40.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['100% Renewable Energy', 'Carbon Credits', 'Green Certification', 'Environmental Reports'],
+            'terms_conditions': 'Green energy addon for electricity services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'addon_004',
+            'name': 'High-Speed Internet Addon',
+            'description': 'Gigabit internet speed upgrade with dedicated bandwidth',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'internet',
+            'charge_type': 'recurring',
+            'charge_category': 'service',
+            'base_price': 75.0,
+            'setup_fee': 100.0,
+            'charges': 75.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['Gigabit Speed', 'Dedicated Bandwidth', 'Low Latency', 'Static IP Address'],
+            'terms_conditions': 'High-speed internet addon for internet services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': True,
+            'assigned_to_role': 'admin',
+            'created_for_admin': 'user_002',
+            'created_by': 'user_001',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'addon_005',
+            'name': 'Water Quality Plus Addon',
+            'description': 'Advanced water filtration and quality monitoring',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'water',
+            'charge_type': 'recurring',
+            'charge_category': 'service',
+            'base_price': 25.0,
+            'setup_fee': 50.0,
+            'charges': 25.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['Advanced Filtration', 'Quality Monitoring', 'Purity Reports', 'Automated Testing'],
+            'terms_conditions': 'Water quality addon for water services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'addon_006',
+            'name': 'Emergency Backup Addon',
+            'description': 'Emergency backup service with instant switchover',
+            'plan_type': 2,  # Addon Plan
+            'service_type': 'water',
+            'charge_type': 'recurring',
+            'charge_category': 'service',
+            'base_price': 35.0,
+            'setup_fee': 75.0,
+            'charges': 35.0,
+            'billing_frequency': 'monthly',
+            'start_date': datetime.now(timezone.utc),
+            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
+            'deposit_multiplier': 1.0,
+            'features': ['Emergency Backup', 'Instant Switchover', '24/7 Monitoring', 'Automatic Failover'],
+            'terms_conditions': 'Emergency backup addon for water services',
+            'is_proration_enabled': True,
+            'status': 'active',
+            'is_for_admin': False,
+            'assigned_to_role': 'user',
+            'created_for_admin': None,
+            'created_by': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        }
+    ]
+    
+    # Add demo accounts with enhanced financial statistics
+    demo_accounts = [
+        {
+            'id': 'acc_001',
+            'profile_id': 'prof_001',
+            'name': 'Tech Solutions Main Office',
+            'email': 'billing@techsolutions.com',
+            'phone': '+1-555-0101',
+            'address': '123 Tech Street',
+            'city': 'San Francisco',
+            'state': 'CA',
+            'zipcode': '94102',
+            'business_type': 'Technology',
+            'tax_id': '12-3456789',
+            'deposit_paid': 1500.0,
+            'is_active': True,
+            'user_id': 'user_002',
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc),
+            # Enhanced Account Statistics
+            'total_deposit': 2500.0,
+            'monthly_billing': 1245.75,
+            'active_services': 8,
+            'outstanding_balance': 187.25,
+            'credit_balance': 450.50,
+            'total_credit': 2800.00,
+            'credit_limit': 5000.00,
+            'total_debit': 15420.80,
+            'total_payment': 14820.55,
+            'last_payment': 325.75,
+            'last_payment_date': datetime.now(timezone.utc) - timedelta(days=5),
+            'total_user_deposit': 3250.00
+        }
+    ]
+    
+    # Add comprehensive demo services with categories
+    demo_services = [
+        # Master Services - System level services managed by super admin/master
+        {
+            'id': 'master_serv_001',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Master Grid Connection',
+            'service_description': 'Primary grid connection for entire network',
+            'service_category': 'master_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 2500.0,
+            'start_date': datetime.now(timezone.utc),
+            'end_date': None,
+            'service_address': 'Master Grid Station, San Francisco, CA',
+            'installation_notes': 'Main grid connection with redundancy',
+            'meter_number': 'GRID-MASTER-001',
+            'connection_type': 'high_voltage',
+            'capacity': '10 MW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_001',
+            'assigned_to': 'master',
+            'priority': 'critical',
+            'last_reading': 125420.5,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'master_serv_002',
+            'account_id': 'acc_001', 
+            'plan_id': 'plan_003',
+            'service_name': 'Master Water Distribution',
+            'service_description': 'Central water distribution system',
+            'service_category': 'master_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 1800.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
+            'end_date': None,
+            'service_address': 'Water Treatment Plant, San Francisco, CA',
+            'installation_notes': 'Main distribution network with monitoring',
+            'meter_number': 'WATER-MASTER-001',
+            'connection_type': 'distribution',
+            'capacity': '50,000 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_001',
+            'assigned_to': 'master',
+            'priority': 'critical',
+            'last_reading': 485230.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'master_serv_003',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Master Internet Infrastructure',
+            'service_description': 'Core internet infrastructure management',
+            'service_category': 'master_service',
+            'service_type': 'internet',
+            'custom_price': 5000.0,
+            'monthly_charges': 5000.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=180),
+            'end_date': None,
+            'service_address': 'Data Center, San Francisco, CA',
+            'installation_notes': 'Fiber backbone with redundancy',
+            'meter_number': 'NET-MASTER-001',
+            'connection_type': 'fiber_backbone',
+            'capacity': '10 Gbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_001',
+            'assigned_to': 'master',
+            'priority': 'high',
+            'last_reading': 8542.8,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=180),
+            'updated_at': datetime.now(timezone.utc)
+        },
+
+        # Self Services - Services managed by current admin user
+        {
+            'id': 'self_serv_001',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Admin Office Electricity',
+            'service_description': 'Electricity service for admin office',
+            'service_category': 'self_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 245.50,
+            'start_date': datetime.now(timezone.utc),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Standard office electrical connection',
+            'meter_number': 'ELC-ADMIN-001',
+            'connection_type': 'single_phase',
+            'capacity': '50 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'medium',
+            'last_reading': 1240.5,
+            'created_at': datetime.now(timezone.utc),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'self_serv_002',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Admin Office Water',
+            'service_description': 'Water supply for admin facilities',
+            'service_category': 'self_service',
+            'service_type': 'water',
+            'custom_price': 95.0,
+            'monthly_charges': 95.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=30),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Water connection with basic monitoring',
+            'meter_number': 'WTR-ADMIN-001',
+            'connection_type': 'municipal',
+            'capacity': '200 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'medium',
+            'last_reading': 850.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'self_serv_003',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Admin Internet Service',
+            'service_description': 'High-speed internet for administrative tasks',
+            'service_category': 'self_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 120.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Dedicated business line with SLA',
+            'meter_number': 'NET-ADMIN-001',
+            'connection_type': 'fiber',
+            'capacity': '500 Mbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'high',
+            'last_reading': 2542.1,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
+            'updated_at': datetime.now(timezone.utc)
+        },
+
+        # User Services - Services for end users with various statuses
+        {
+            'id': 'user_serv_001',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Tech Solutions Electricity',
+            'service_description': 'Electricity service for Tech Solutions Inc',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 450.75,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
+            'end_date': None,
+            'service_address': '123 Tech Street, San Francisco, CA',
+            'installation_notes': 'Three-phase connection for tech equipment',
+            'meter_number': 'ELC-TECH-001',
+            'connection_type': 'three_phase',
+            'capacity': '75 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 5420.3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_002',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Restaurant Water Service',
+            'service_description': 'Water service for Green Restaurant Group',
+            'service_category': 'user_service',
+            'service_type': 'water',
+            'custom_price': 185.25,
+            'monthly_charges': 185.25,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
+            'end_date': None,
+            'service_address': '456 Food Avenue, Los Angeles, CA',
+            'installation_notes': 'High-capacity line for restaurant use',
+            'meter_number': 'WTR-REST-001',
+            'connection_type': 'commercial',
+            'capacity': '1,000 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 12850.7,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_003',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Marketing Hub Internet',
+            'service_description': 'High-speed internet for Digital Marketing Hub',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 325.80,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
+            'end_date': None,
+            'service_address': '789 Creative Blvd, Los Angeles, CA',
+            'installation_notes': 'Fiber connection with static IP',
+            'meter_number': 'NET-MKT-001',
+            'connection_type': 'fiber',
+            'capacity': '1 Gbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 8542.1,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_004',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Healthcare Power Service',
+            'service_description': 'Electricity for Healthcare Solutions LLC',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': 1250.50,
+            'monthly_charges': 1250.50,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=150),
+            'end_date': None,
+            'service_address': '321 Medical Center Dr, San Diego, CA',
+            'installation_notes': 'Hospital-grade connection with backup',
+            'meter_number': 'ELC-HLTH-001',
+            'connection_type': 'three_phase_backup',
+            'capacity': '200 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'critical',
+            'last_reading': 18750.8,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=150),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_005',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Manufacturing Power Grid',
+            'service_description': 'High-capacity electricity for Manufacturing Corp',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 2150.75,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=200),
+            'end_date': None,
+            'service_address': '555 Industrial Way, Sacramento, CA',
+            'installation_notes': 'Industrial-grade three-phase with monitoring',
+            'meter_number': 'ELC-MFG-001',
+            'connection_type': 'industrial',
+            'capacity': '500 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 45820.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=200),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_006',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Retail Chain Water',
+            'service_description': 'Water service for Metro Retail Chain',
+            'service_category': 'user_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 875.25,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=75),
+            'end_date': None,
+            'service_address': '888 Shopping Center Blvd, San Jose, CA',
+            'installation_notes': 'Multiple connection points for retail complex',
+            'meter_number': 'WTR-RETAIL-001',
+            'connection_type': 'commercial_multi',
+            'capacity': '2,500 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 22100.5,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=75),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_007',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Academy Power Service',
+            'service_description': 'Electricity service for Sunrise Academy',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 650.40,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=180),
+            'end_date': None,
+            'service_address': '222 Education Drive, Fresno, CA',
+            'installation_notes': 'Educational facility connection',
+            'meter_number': 'ELC-EDU-001',
+            'connection_type': 'educational',
+            'capacity': '100 kW',
+            'is_active': False, # Deactivated service
+            'status': 'suspended',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'low',
+            'last_reading': 9850.3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=180),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=30)
+        },
+        {
+            'id': 'user_serv_008',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Hotel Complex Internet',
+            'service_description': 'Internet service for Grand Plaza Hotel',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 1450.90,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=100),
+            'end_date': None,
+            'service_address': '777 Hospitality Row, San Francisco, CA',
+            'installation_notes': 'High-speed wifi infrastructure for hotel',
+            'meter_number': 'NET-HOTEL-001',
+            'connection_type': 'hospitality_fiber',
+            'capacity': '2 Gbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 15420.7,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=100),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        # Additional Self Services
+        {
+            'id': 'self_serv_004',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Admin Backup Power',
+            'service_description': 'Backup electricity for admin operations',
+            'service_category': 'self_service',
+            'service_type': 'electricity',
+            'custom_price': 180.0,
+            'monthly_charges': 180.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=20),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Emergency backup power system',
+            'meter_number': 'ELC-ADMIN-002',
+            'connection_type': 'backup',
+            'capacity': '25 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'high',
+            'last_reading': 450.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=20),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'self_serv_005',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Admin Fire Safety Water',
+            'service_description': 'Fire safety water system for admin building',
+            'service_category': 'self_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 65.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=15),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Fire suppression system water line',
+            'meter_number': 'WTR-ADMIN-002',
+            'connection_type': 'safety',
+            'capacity': '100 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'critical',
+            'last_reading': 125.8,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=15),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        # Additional User Services
+        {
+            'id': 'user_serv_009',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Shopping Mall Electricity',
+            'service_description': 'Main power supply for Metro Shopping Complex',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 2850.75,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
+            'end_date': None,
+            'service_address': '999 Commerce Ave, Los Angeles, CA',
+            'installation_notes': 'High-capacity mall electrical grid',
+            'meter_number': 'ELC-MALL-001',
+            'connection_type': 'commercial',
+            'capacity': '750 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 68420.3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_010',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'University Campus Internet',
+            'service_description': 'Campus-wide internet for State University',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': 2200.0,
+            'monthly_charges': 2200.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=80),
+            'end_date': None,
+            'service_address': '500 University Drive, Berkeley, CA',
+            'installation_notes': 'High-speed campus network infrastructure',
+            'meter_number': 'NET-UNI-001',
+            'connection_type': 'educational',
+            'capacity': '5 Gbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 25840.1,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=80),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_011',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Sports Complex Water',
+            'service_description': 'Water supply for Metro Sports Complex',
+            'service_category': 'user_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 750.25,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=35),
+            'end_date': None,
+            'service_address': '300 Athletic Way, San Jose, CA',
+            'installation_notes': 'Pool and facility water systems',
+            'meter_number': 'WTR-SPORTS-001',
+            'connection_type': 'recreational',
+            'capacity': '3,000 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 18450.7,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=35),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_012',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Airport Terminal Power',
+            'service_description': 'Electricity for Regional Airport Terminal',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': 4200.0,
+            'monthly_charges': 4200.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
+            'end_date': None,
+            'service_address': '1200 Airport Blvd, San Francisco, CA',
+            'installation_notes': 'Critical infrastructure power supply',
+            'meter_number': 'ELC-AIRPORT-001',
+            'connection_type': 'critical',
+            'capacity': '1.2 MW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'critical',
+            'last_reading': 98750.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_013',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Residential Complex Water',
+            'service_description': 'Water supply for Sunset Residential Complex',
+            'service_category': 'user_service',
+            'service_type': 'water',
+            'custom_price': 1250.0,
+            'monthly_charges': 1250.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
+            'end_date': None,
+            'service_address': '850 Sunset Ave, Oakland, CA',
+            'installation_notes': 'Multi-building residential water supply',
+            'meter_number': 'WTR-RES-001',
+            'connection_type': 'residential',
+            'capacity': '5,000 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 42850.1,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        
+        # Additional Self Services for Admin (user_002) with Addon Plans
+        {
+            'id': 'self_serv_006',
+            'account_id': 'acc_001',
+            'plan_id': 'addon_001', # Premium Support Addon
+            'service_name': 'Admin Premium Support',
+            'service_description': '24/7 premium support for admin operations',
+            'service_category': 'self_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 50.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=10),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Premium support addon activated',
+            'meter_number': 'ADDON-ADMIN-001',
+            'connection_type': 'addon_service',
+            'capacity': '24/7 Support',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'high',
+            'last_reading': None,
+            'is_addon': True,
+            'parent_service_id': 'self_serv_001', # Linked to main electricity service
+            'created_at': datetime.now(timezone.utc) - timedelta(days=10),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'self_serv_007',
+            'account_id': 'acc_001',
+            'plan_id': 'addon_002', # Advanced Monitoring Addon
+            'service_name': 'Admin Advanced Monitoring',
+            'service_description': 'Real-time monitoring for admin electricity service',
+            'service_category': 'self_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 30.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=15),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Advanced monitoring system installed',
+            'meter_number': 'MON-ADMIN-001',
+            'connection_type': 'addon_service',
+            'capacity': 'Real-time Analytics',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'medium',
+            'last_reading': None,
+            'is_addon': True,
+            'parent_service_id': 'self_serv_001',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=15),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'self_serv_008',
+            'account_id': 'acc_001',
+            'plan_id': 'addon_005', # Water Quality Plus Addon
+            'service_name': 'Admin Water Quality Plus',
+            'service_description': 'Advanced water filtration for admin facilities',
+            'service_category': 'self_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 25.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=20),
+            'end_date': None,
+            'service_address': '123 Admin Street, San Francisco, CA',
+            'installation_notes': 'Water quality system addon',
+            'meter_number': 'WQ-ADMIN-001',
+            'connection_type': 'addon_service',
+            'capacity': 'Quality Monitoring',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'admin',
+            'priority': 'medium',
+            'last_reading': None,
+            'is_addon': True,
+            'parent_service_id': 'self_serv_002',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=20),
+            'updated_at': datetime.now(timezone.utc)
+        },
+
+        # Additional User Services managed by Admin (user_002)
+        {
+            'id': 'user_serv_014',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Office Complex Electricity',
+            'service_description': 'Main electricity supply for office complex',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 850.75,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
+            'end_date': None,
+            'service_address': '456 Business Ave, San Francisco, CA',
+            'installation_notes': 'High-capacity office electrical system',
+            'meter_number': 'ELC-OFF-001',
+            'connection_type': 'commercial',
+            'capacity': '150 kW',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 15420.8,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_015',
+            'account_id': 'acc_001',
+            'plan_id': 'addon_001', # Premium Support Addon for user service
+            'service_name': 'Office Premium Support Addon',
+            'service_description': '24/7 premium support for office complex',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 50.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=30),
+            'end_date': None,
+            'service_address': '456 Business Ave, San Francisco, CA',
+            'installation_notes': 'Premium support addon for office electricity',
+            'meter_number': 'SUPP-OFF-001',
+            'connection_type': 'addon_service',
+            'capacity': '24/7 Support',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': None,
+            'is_addon': True,
+            'parent_service_id': 'user_serv_014',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_016',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Corporate Internet Hub',
+            'service_description': 'High-speed internet for corporate operations',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 450.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
+            'end_date': None,
+            'service_address': '789 Corporate Blvd, San Francisco, CA',
+            'installation_notes': 'Dedicated fiber for corporate use',
+            'meter_number': 'NET-CORP-001',
+            'connection_type': 'fiber',
+            'capacity': '2 Gbps',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'high',
+            'last_reading': 8520.3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_017',
+            'account_id': 'acc_001',
+            'plan_id': 'addon_004', # High-Speed Internet Addon
+            'service_name': 'Corporate Gigabit Upgrade',
+            'service_description': 'Gigabit speed upgrade for corporate internet',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 75.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=25),
+            'end_date': None,
+            'service_address': '789 Corporate Blvd, San Francisco, CA',
+            'installation_notes': 'Gigabit speed upgrade addon',
+            'meter_number': 'GIG-CORP-001',
+            'connection_type': 'addon_service',
+            'capacity': 'Gigabit Speed',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': None,
+            'is_addon': True,
+            'parent_service_id': 'user_serv_016',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=25),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        {
+            'id': 'user_serv_018',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_003',
+            'service_name': 'Retail Water Supply',
+            'service_description': 'Commercial water supply for retail stores',
+            'service_category': 'user_service',
+            'service_type': 'water',
+            'custom_price': None,
+            'monthly_charges': 320.50,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=40),
+            'end_date': None,
+            'service_address': '321 Retail Plaza, San Francisco, CA',
+            'installation_notes': 'Multi-outlet water supply system',
+            'meter_number': 'WTR-RET-001',
+            'connection_type': 'commercial',
+            'capacity': '800 gallons/day',
+            'is_active': True,
+            'status': 'active',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'medium',
+            'last_reading': 5240.2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=40),
+            'updated_at': datetime.now(timezone.utc)
+        },
+        
+        # Some Inactive/Suspended Services to test status filtering
+        {
+            'id': 'user_serv_019',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_001',
+            'service_name': 'Warehouse Electricity - Suspended',
+            'service_description': 'Electricity service for warehouse (suspended)',
+            'service_category': 'user_service',
+            'service_type': 'electricity',
+            'custom_price': None,
+            'monthly_charges': 650.25,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
+            'end_date': None,
+            'service_address': '999 Warehouse District, San Francisco, CA',
+            'installation_notes': 'Suspended due to maintenance',
+            'meter_number': 'ELC-WARE-001',
+            'connection_type': 'industrial',
+            'capacity': '200 kW',
+            'is_active': True,
+            'status': 'suspended',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'low',
+            'last_reading': 25420.1,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=5)
+        },
+        {
+            'id': 'user_serv_020',
+            'account_id': 'acc_001',
+            'plan_id': 'plan_002',
+            'service_name': 'Branch Office Internet - Cancelled',
+            'service_description': 'Internet service for branch office (cancelled)',
+            'service_category': 'user_service',
+            'service_type': 'internet',
+            'custom_price': None,
+            'monthly_charges': 180.0,
+            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
+            'end_date': datetime.now(timezone.utc) - timedelta(days=10),
+            'service_address': '555 Branch St, Oakland, CA',
+            'installation_notes': 'Service cancelled - office closure',
+            'meter_number': 'NET-BRANCH-001',
+            'connection_type': 'fiber',
+            'capacity': '500 Mbps',
+            'is_active': False,
+            'status': 'terminated',
+            'managed_by': 'user_002',
+            'assigned_to': 'user',
+            'priority': 'low',
+            'last_reading': 1520.3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=10)
+        }
+    ]
+    
+    # Add demo bill cycles
+    demo_bill_cycles = [
+        {
+            'id': 'cycle_001',
+            'name': 'Monthly Utility Cycle',
+            'frequency': 'monthly',
+            'day_of_cycle': 1
+        },
+        {
+            'id': 'cycle_002', 
+            'name': 'Quarterly Business Cycle',
+            'frequency': 'quarterly',
+            'day_of_cycle': 15
+        },
+        {
+            'id': 'cycle_003',
+            'name': 'Weekly Service Cycle', 
+            'frequency': 'weekly',
+            'day_of_cycle': 1
+        }
+    ]
+    
+    # Add demo bill schedules
+    demo_bill_schedules = [
+        {
+            'id': 'schedule_001',
+            'bill_cycle_id': 'cycle_001',
+            'bill_run_name': 'January 2024 Utility Bills',
+            'bill_date': datetime.now(timezone.utc),
+            'status': 'completed',
+            'account_count': 5,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=25)
+        },
+        {
+            'id': 'schedule_002',
+            'bill_cycle_id': 'cycle_001',
+            'bill_run_name': 'February 2024 Utility Bills',
+            'bill_date': datetime.now(timezone.utc) + timedelta(days=5),
+            'status': 'pending',
+            'account_count': 6,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=5),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=5)
+        },
+        {
+            'id': 'schedule_003',
+            'bill_cycle_id': 'cycle_002',
+            'bill_run_name': 'Q1 2024 Business Bills',
+            'bill_date': datetime.now(timezone.utc) + timedelta(days=10),
+            'status': 'processing',
+            'account_count': 3,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=2),
+            'updated_at': datetime.now(timezone.utc) - timedelta(days=1)
+        }
+    ]
+    
+    # Add demo bill runs
+    demo_bill_runs = [
+        {
+            'id': 'run_001',
+            'bill_schedule_id': 'schedule_001',
+            'bill_cycle_id': 'cycle_001',
+            'run_name': 'January 2024 Utility Bills',
+            'run_date': datetime.now(timezone.utc) - timedelta(days=30),
+            'status': 'completed',
+            'total_accounts': 5,
+            'bills_generated': 5,
+            'bills_approved': 4,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30)
+        },
+        {
+            'id': 'run_002', 
+            'bill_schedule_id': 'schedule_002',
+            'bill_cycle_id': 'cycle_001',
+            'run_name': 'February 2024 Utility Bills',
+            'run_date': datetime.now(timezone.utc) + timedelta(days=5),
+            'status': 'processing',
+            'total_accounts': 6,
+            'bills_generated': 2,
+            'bills_approved': 0,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=5)
+        },
+        {
+            'id': 'run_003',
+            'bill_schedule_id': 'schedule_003', 
+            'bill_cycle_id': 'cycle_002',
+            'run_name': 'Q1 2024 Business Bills',
+            'run_date': datetime.now(timezone.utc) + timedelta(days=10),
+            'status': 'processing',
+            'total_accounts': 3,
+            'bills_generated': 3,
+            'bills_approved': 2,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
+        }
+    ]
+    
+    # Add demo billed accounts
+    demo_billed_accounts = [
+        {
+            'id': 'bill_acc_001',
+            'bill_run_id': 'run_001',
+            'account_id': 'acc_001',
+            'account_name': 'Tech Solutions Inc',
+            'charges': 295.50,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=30),
+            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
+            'status': 'approved',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30)
+        },
+        {
+            'id': 'bill_acc_002',
+            'bill_run_id': 'run_003',
+            'account_id': 'acc_001', 
+            'account_name': 'Tech Solutions Inc',
+            'charges': 425.75,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=2),
+            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
+            'status': 'billed',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
+        },
+        {
+            'id': 'bill_acc_003',
+            'bill_run_id': 'run_003',
+            'account_id': 'acc_001',
+            'account_name': 'Green Restaurant Group', 
+            'charges': 567.25,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=2),
+            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
+            'status': 'approved',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
+        },
+        {
+            'id': 'bill_acc_004',
+            'bill_run_id': 'run_003',
+            'account_id': 'acc_001',
+            'account_name': 'Digital Marketing Hub',
+            'charges': 234.80,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=2), 
+            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
+            'status': 'billed',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
+        },
+        {
+            'id': 'bill_acc_005',
+            'bill_run_id': 'run_002',
+            'account_id': 'acc_001',
+            'account_name': 'Tech Solutions Inc',
+            'charges': 189.99,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=1), 
+            'due_date': datetime.now(timezone.utc) + timedelta(days=29),
+            'status': 'billed',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=1)
+        },
+        {
+            'id': 'bill_acc_006',
+            'bill_run_id': 'run_002',
+            'account_id': 'acc_001',
+            'account_name': 'Green Restaurant Group',
+            'charges': 456.78,
+            'bill_date': datetime.now(timezone.utc) - timedelta(days=1), 
+            'due_date': datetime.now(timezone.utc) + timedelta(days=29),
+            'status': 'billed',
+            'created_at': datetime.now(timezone.utc) - timedelta(days=1)
+        }
+    ]
+
+    # Add demo invoices with multiple services
+    demo_invoices = [
+        {
+            'id': 'inv_demo_001',
+            'invoice_number': 'INV-000789',
+            'account_name': 'Tech Solutions Inc',
+            'account_id': 'acc_001',
+            'total_amount': 2076.60,
+            'subtotal': 1920.00,
+            'tax_amount': 156.60,
+            'discount_amount': 0.00,
+            'status': 'overdue',
+            'paid_status': False,
+            'days_overdue': 15,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
+            'issue_date': datetime.now(timezone.utc) - timedelta(days=45),
+            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
+            'month': 'March 2024',
+            'category': 'utility',
+            'items': [
+                {
+                    'description': 'Electricity Service - Enterprise Pro',
+                    'quantity': 1,
+                    'amount': 195.25,
+                    'service_id': 'srv_001'
+                },
+                {
+                    'description': 'Water Service - Commercial Plus',
+                    'quantity': 1, 
+                    'amount': 133.10,
+                    'service_id': 'srv_002'
+                },
+                {
+                    'description': 'Gas Service - Business Standard',
+                    'quantity': 1,
+                    'amount': 1748.25,
+                    'service_id': 'srv_003'
+                },
+                {
+                    'description': 'Internet Service - High-Speed Fiber',
+                    'quantity': 1,
+                    'amount': 450.00,
+                    'service_id': 'srv_004'
+                },
+                {
+                    'description': 'Waste Management Service',
+                    'quantity': 1,
+                    'amount': 85.75,
+                    'service_id': 'srv_005'
+                },
+                {
+                    'description': 'Security System Monitoring',
+                    'quantity': 1,
+                    'amount': 120.50,
+                    'service_id': 'srv_006'
+                }
+            ]
+        },
+        {
+            'id': 'inv_demo_002',
+            'invoice_number': 'INV-000790',
+            'account_name': 'Green Restaurant Group',
+            'account_id': 'acc_001', 
+            'total_amount': 856.30,
+            'subtotal': 792.00,
+            'tax_amount': 64.30,
+            'discount_amount': 0.00,
+            'status': 'paid',
+            'paid_status': True,
+            'days_overdue': 0,
+            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
+            'issue_date': datetime.now(timezone.utc) - timedelta(days=30),
+            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
+            'month': 'March 2024',
+            'category': 'utility',
+            'items': [
+                {
+                    'description': 'Electricity Service - Commercial',
+                    'quantity': 1,
+                    'amount': 345.75,
+                    'service_id': 'srv_001'
+                },
+                {
+                    'description': 'Water Service - High Volume',
+                    'quantity': 1,
+                    'amount': 256.25,
+                    'service_id': 'srv_002'
+                },
+                {
+                    'description': 'Waste Management - Restaurant',
+                    'quantity': 1,
+                    'amount': 190.00,
+                    'service_id': 'srv_005'
+                }
+            ]
+        }
+    ]
+
+    return {
+        'users': demo_users,
+        'profiles': demo_profiles,
+        'plans': demo_plans,
+        'accounts': demo_accounts,
+        'services': demo_services,
+        'invoices': demo_invoices,
+        'payments': [],
+        'bill_cycles': demo_bill_cycles,
+        'bill_schedules': demo_bill_schedules,
+        'bill_runs': demo_bill_runs,
+        'billed_accounts': demo_billed_accounts,
+        'system_config': {
+            'deposit_multiplier': 2.0  # Default multiplier for deposits
+        }
+    }
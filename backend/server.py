@@ -1,11 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.cors import CORSMiddleware
 import os
-import logging
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
@@ -14,8 +19,33 @@ from enum import Enum
 import json
 import io
 import base64
+from dotenv import load_dotenv
+from repository import create_repository, normalize_email
+from auth_cache import TokenCache
+from billing import BillRunEngine
+from email_filter import EmailFilter
+from enrichment import EnrichmentCache
+from etags import collection_etag, etag_matches
+from pagination import (PAGE_MAX_LIMIT, PAGE_MAX_OFFSET, PageRequest, fetch_list, iter_batches, page_headers, paginate,
+                        parse_cursor)
+from password_pool import PasswordPool, PoolSaturated
+import metrics
+from profiler import ProfilerBusy, SamplingProfiler
+from progress import ProgressHub
+from rendering import FastJSONResponse, ndjson_response, shape, trusted_list, wants_ndjson
+from structured_logging import LogPipeline, RequestContext, get_logger, parse_sample_rates
 
 ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# JSON lines on stdout; callers only enqueue records, a background thread writes them
+log_pipeline = LogPipeline(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '')),
+    queue_size=int(os.environ.get('LOG_QUEUE_SIZE', '10000')),
+)
+log_pipeline.start()
+log = get_logger('server')
 
 # Dummy data storage (replacing MongoDB for now)
 dummy_data = {
@@ -43,7 +73,7 @@ def verify_password(plain_password, hashed_password):
         truncated_password = plain_password[:72] if len(plain_password.encode('utf-8')) > 72 else plain_password
         return pwd_context.verify(truncated_password, hashed_password)
     except Exception as e:
-        print(f"Password verification error: {e}")
+        log.warning('password_verification_error', error=str(e))
         return False
 
 def get_password_hash(password):
@@ -51,1723 +81,141 @@ def get_password_hash(password):
         truncated_password = password[:72] if len(password.encode('utf-8')) > 72 else password
         return pwd_context.hash(truncated_password)
     except Exception as e:
-        print(f"Password hashing error: {e}")
+        log.error('password_hashing_error', error=str(e))
         return None
 
-# Initialize dummy data
-def init_dummy_data():
-    # Add demo users
-    demo_users = [
-        {
-            'id': 'user_001',
-            'email': 'superadmin@example.com',
-            'name': 'Super Admin',
-            'role': 'super_admin',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_master',
-            'department': 'Executive Management',
-            'title': 'Chief Executive Officer',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_002',
-            'email': 'admin@example.com',
-            'name': 'Admin User',
-            'role': 'admin',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_001',
-            'department': 'Administration',
-            'title': 'System Administrator',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_003',
-            'email': 'user@example.com',
-            'name': 'Regular User',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_001',
-            'department': 'Operations',
-            'title': 'Operations Manager',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_004',
-            'email': 'manager@techsolutions.com',
-            'name': 'Tech Manager',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_001',
-            'department': 'Technology',
-            'title': 'Technical Manager',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_005',
-            'email': 'staff@greenrestaurant.com',
-            'name': 'Restaurant Staff',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_002',
-            'department': 'Food Service',
-            'title': 'Restaurant Manager',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_006',
-            'email': 'chef@greenrestaurant.com',
-            'name': 'Head Chef',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_002',
-            'department': 'Kitchen',
-            'title': 'Executive Chef',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_007',
-            'email': 'creative@digitalmarketing.com',
-            'name': 'Creative Director',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_003',
-            'department': 'Creative',
-            'title': 'Creative Director',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_008',
-            'email': 'doctor@healthcaresolutions.com',
-            'name': 'Dr. Sarah Johnson',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_004',
-            'department': 'Medical',
-            'title': 'Chief Medical Officer',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_009',
-            'email': 'supervisor@manufacturing.com',
-            'name': 'Production Supervisor',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_005',
-            'department': 'Manufacturing',
-            'title': 'Production Supervisor',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_010',
-            'email': 'john.smith@personal.com',
-            'name': 'John Smith',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_enduser',
-            'department': 'Personal',
-            'title': 'Individual Customer',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_011',
-            'email': 'analyst@techsolutions.com',
-            'name': 'Data Analyst',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_001',
-            'department': 'Analytics',
-            'title': 'Senior Data Analyst',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_012',
-            'email': 'support@techsolutions.com',
-            'name': 'Support Specialist',
-            'role': 'user',
-            'password': get_password_hash('password'),
-            'profile_id': 'prof_001',
-            'department': 'Customer Support',
-            'title': 'Support Specialist',
-            'is_active': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        }
-    ]
-    
-    # Add demo profiles with master profile references and user tags
-    demo_profiles = [
-        {
-            'id': 'prof_master',
-            'name': 'UtilityTech Master Organization',
-            'email': 'master@utilitytech.com',
-            'phone': '+1-800-UTILITY-MASTER',
-            'profession': 'Master Utility Organization',
-            'address': '1000 Corporate Blvd, Suite 1200',
-            'city': 'San Francisco',
-            'state': 'CA',
-            'zipcode': '94105',
-            'deposit_amount': 0.0,
-            'linked_plan_id': None,
-            'is_master_profile': True,
-            'license_number': 'UTIL-MASTER-2024-001',
-            'established_year': '2020',
-            'service_area': 'California, Nevada, Arizona',
-            'total_customers': 50000,
-            'annual_revenue': 50000000.0,
-            'is_active': True,
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_001',
-            'name': 'Tech Solutions Inc',
-            'email': 'contact@techsolutions.com',
-            'phone': '+1-555-0101',
-            'profession': 'Technology Company',
-            'address': '123 Tech Street, Floor 5',
-            'city': 'San Francisco',
-            'state': 'CA',
-            'zipcode': '94102',
-            'deposit_amount': 1500.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'department': 'IT Services',
-            'employee_count': 25,
-            'monthly_usage': 2500.0,
-            'is_active': True,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_002',
-            'name': 'Green Restaurant Group',
-            'email': 'info@greenrestaurant.com',
-            'phone': '+1-555-0102',
-            'profession': 'Restaurant Chain',
-            'address': '456 Food Avenue, Building A',
-            'city': 'Los Angeles',
-            'state': 'CA',
-            'zipcode': '90210',
-            'deposit_amount': 2000.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'department': 'Food & Beverage',
-            'employee_count': 150,
-            'monthly_usage': 8500.0,
-            'is_active': True,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_003',
-            'name': 'Digital Marketing Hub',
-            'email': 'hello@digitalmarketing.com',
-            'phone': '+1-555-0103',
-            'profession': 'Marketing Agency',
-            'address': '789 Creative Blvd, Studio 12',
-            'city': 'Los Angeles',
-            'state': 'CA',
-            'zipcode': '90211',
-            'deposit_amount': 1200.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'department': 'Creative Services',
-            'employee_count': 35,
-            'monthly_usage': 3200.0,
-            'is_active': True,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_004',
-            'name': 'Healthcare Solutions LLC',
-            'email': 'admin@healthcaresolutions.com',
-            'phone': '+1-555-0104',
-            'profession': 'Healthcare Provider',
-            'address': '321 Medical Center Dr',
-            'city': 'San Diego',
-            'state': 'CA',
-            'zipcode': '92101',
-            'deposit_amount': 3000.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'department': 'Medical Services',
-            'employee_count': 75,
-            'monthly_usage': 5500.0,
-            'is_active': True,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_005',
-            'name': 'Manufacturing Corp',
-            'email': 'operations@manufacturing.com',
-            'phone': '+1-555-0105',
-            'profession': 'Manufacturing',
-            'address': '555 Industrial Way',
-            'city': 'Sacramento',
-            'state': 'CA',
-            'zipcode': '95814',
-            'deposit_amount': 5000.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'department': 'Production',
-            'employee_count': 200,
-            'monthly_usage': 15000.0,
-            'is_active': True,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'prof_enduser',
-            'name': 'John Smith Personal Account',
-            'email': 'john.smith@personal.com',
-            'phone': '+1-555-0199',
-            'profession': 'Individual Consumer',
-            'address': '999 Residential St, Apt 5B',
-            'city': 'Oakland',
-            'state': 'CA',
-            'zipcode': '94607',
-            'deposit_amount': 200.0,
-            'linked_plan_id': None,
-            'master_profile_id': 'prof_master',
-            'end_user': True,
-            'account_type': 'Personal',
-            'monthly_usage': 350.0,
-            'is_active': True,
-            'created_by': 'user_010',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        }
-    ]
-    
-    # Enhanced demo service plans with new fields (Base Plans - plan_type: 1, Addon Plans - plan_type: 2)
-    demo_plans = [
-        # Base Plans (plan_type = 1)
-        {
-            'id': 'plan_001',
-            'name': 'Enterprise Electricity Pro',
-            'description': 'High-capacity electricity plan for large businesses',
-            'plan_type': 1,  # Base Plan
-            'service_type': 'electricity',
-            'charge_type': 'recurring',
-            'charge_category': 'utility',
-            'base_price': 250.0,
-            'setup_fee': 100.0,
-            'charges': 250.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 2.0,
-            'features': ['24/7 Priority Support', 'Dedicated Account Manager', 'Green Energy Option', 'Load Balancing'],
-            'terms_conditions': 'Enterprise-level service agreement with SLA guarantees',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,  # for end users
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'plan_002',
-            'name': 'Admin Internet Management',
-            'description': 'Special internet plan for admin management',
-            'plan_type': 1,  # Base Plan
-            'service_type': 'internet',
-            'charge_type': 'recurring',
-            'charge_category': 'administrative',
-            'base_price': 120.0,
-            'setup_fee': 50.0,
-            'charges': 120.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.5,
-            'features': ['Admin Dashboard Access', 'Management Tools', '99.9% Uptime SLA', 'Priority Support'],
-            'terms_conditions': 'Administrative service agreement',
-            'is_proration_enabled': False,
-            'status': 'active',
-            'is_for_admin': True,  # for admins
-            'assigned_to_role': 'admin',
-            'created_for_admin': 'user_002',
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'plan_003',
-            'name': 'Commercial Water Supply Plus',
-            'description': 'Enhanced water supply for commercial operations',
-            'plan_type': 1,  # Base Plan
-            'service_type': 'water',
-            'charge_type': 'recurring',
-            'charge_category': 'utility',
-            'base_price': 85.0,
-            'setup_fee': 25.0,
-            'charges': 85.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 2.5,
-            'features': ['High Pressure System', 'Quality Testing', 'Emergency Support', 'Usage Analytics'],
-            'terms_conditions': 'Monthly service with consumption-based billing',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        
-        # Addon Plans (plan_type = 2)
-        {
-            'id': 'addon_001',
-            'name': 'Premium Support Addon',
-            'description': '24/7 premium technical support with dedicated engineer',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'electricity',
-            'charge_type': 'recurring',
-            'charge_category': 'service',
-            'base_price': 50.0,
-            'setup_fee': 0.0,
-            'charges': 50.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['24/7 Premium Support', 'Dedicated Engineer', '2-Hour Response Time', 'Priority Queue'],
-            'terms_conditions': 'Premium support addon for electricity services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'addon_002',
-            'name': 'Advanced Monitoring Addon',
-            'description': 'Real-time monitoring and analytics dashboard',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'electricity',
-            'charge_type': 'recurring',
-            'charge_category': 'service',
-            'base_price': 30.0,
-            'setup_fee': 25.0,
-            'charges': 30.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['Real-time Monitoring', 'Custom Analytics Dashboard', 'Usage Forecasting', 'Automated Alerts'],
-            'terms_conditions': 'Advanced monitoring addon for electricity services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'addon_003',
-            'name': 'Green Energy Addon',
-            'description': '100% renewable energy sourcing with carbon credits',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'electricity',
-            'charge_type': 'recurring',
-            'charge_category': 'utility',
-            'base_price': 40.0,
-            'setup_fee': 0.0,
-            'charges': 40.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['100% Renewable Energy', 'Carbon Credits', 'Green Certification', 'Environmental Reports'],
-            'terms_conditions': 'Green energy addon for electricity services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'addon_004',
-            'name': 'High-Speed Internet Addon',
-            'description': 'Gigabit internet speed upgrade with dedicated bandwidth',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'internet',
-            'charge_type': 'recurring',
-            'charge_category': 'service',
-            'base_price': 75.0,
-            'setup_fee': 100.0,
-            'charges': 75.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['Gigabit Speed', 'Dedicated Bandwidth', 'Low Latency', 'Static IP Address'],
-            'terms_conditions': 'High-speed internet addon for internet services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': True,
-            'assigned_to_role': 'admin',
-            'created_for_admin': 'user_002',
-            'created_by': 'user_001',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'addon_005',
-            'name': 'Water Quality Plus Addon',
-            'description': 'Advanced water filtration and quality monitoring',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'water',
-            'charge_type': 'recurring',
-            'charge_category': 'service',
-            'base_price': 25.0,
-            'setup_fee': 50.0,
-            'charges': 25.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['Advanced Filtration', 'Quality Monitoring', 'Purity Reports', 'Automated Testing'],
-            'terms_conditions': 'Water quality addon for water services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'addon_006',
-            'name': 'Emergency Backup Addon',
-            'description': 'Emergency backup service with instant switchover',
-            'plan_type': 2,  # Addon Plan
-            'service_type': 'water',
-            'charge_type': 'recurring',
-            'charge_category': 'service',
-            'base_price': 35.0,
-            'setup_fee': 75.0,
-            'charges': 35.0,
-            'billing_frequency': 'monthly',
-            'start_date': datetime.now(timezone.utc),
-            'end_date': datetime.now(timezone.utc) + timedelta(days=365),
-            'deposit_multiplier': 1.0,
-            'features': ['Emergency Backup', 'Instant Switchover', '24/7 Monitoring', 'Automatic Failover'],
-            'terms_conditions': 'Emergency backup addon for water services',
-            'is_proration_enabled': True,
-            'status': 'active',
-            'is_for_admin': False,
-            'assigned_to_role': 'user',
-            'created_for_admin': None,
-            'created_by': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        }
-    ]
-    
-    # Add demo accounts with enhanced financial statistics
-    demo_accounts = [
-        {
-            'id': 'acc_001',
-            'profile_id': 'prof_001',
-            'name': 'Tech Solutions Main Office',
-            'email': 'billing@techsolutions.com',
-            'phone': '+1-555-0101',
-            'address': '123 Tech Street',
-            'city': 'San Francisco',
-            'state': 'CA',
-            'zipcode': '94102',
-            'business_type': 'Technology',
-            'tax_id': '12-3456789',
-            'deposit_paid': 1500.0,
-            'is_active': True,
-            'user_id': 'user_002',
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc),
-            # Enhanced Account Statistics
-            'total_deposit': 2500.0,
-            'monthly_billing': 1245.75,
-            'active_services': 8,
-            'outstanding_balance': 187.25,
-            'credit_balance': 450.50,
-            'total_credit': 2800.00,
-            'credit_limit': 5000.00,
-            'total_debit': 15420.80,
-            'total_payment': 14820.55,
-            'last_payment': 325.75,
-            'last_payment_date': datetime.now(timezone.utc) - timedelta(days=5),
-            'total_user_deposit': 3250.00
-        }
-    ]
-    
-    # Add comprehensive demo services with categories
-    demo_services = [
-        # Master Services - System level services managed by super admin/master
-        {
-            'id': 'master_serv_001',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Master Grid Connection',
-            'service_description': 'Primary grid connection for entire network',
-            'service_category': 'master_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 2500.0,
-            'start_date': datetime.now(timezone.utc),
-            'end_date': None,
-            'service_address': 'Master Grid Station, San Francisco, CA',
-            'installation_notes': 'Main grid connection with redundancy',
-            'meter_number': 'GRID-MASTER-001',
-            'connection_type': 'high_voltage',
-            'capacity': '10 MW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_001',
-            'assigned_to': 'master',
-            'priority': 'critical',
-            'last_reading': 125420.5,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'master_serv_002',
-            'account_id': 'acc_001', 
-            'plan_id': 'plan_003',
-            'service_name': 'Master Water Distribution',
-            'service_description': 'Central water distribution system',
-            'service_category': 'master_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 1800.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
-            'end_date': None,
-            'service_address': 'Water Treatment Plant, San Francisco, CA',
-            'installation_notes': 'Main distribution network with monitoring',
-            'meter_number': 'WATER-MASTER-001',
-            'connection_type': 'distribution',
-            'capacity': '50,000 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_001',
-            'assigned_to': 'master',
-            'priority': 'critical',
-            'last_reading': 485230.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'master_serv_003',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Master Internet Infrastructure',
-            'service_description': 'Core internet infrastructure management',
-            'service_category': 'master_service',
-            'service_type': 'internet',
-            'custom_price': 5000.0,
-            'monthly_charges': 5000.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=180),
-            'end_date': None,
-            'service_address': 'Data Center, San Francisco, CA',
-            'installation_notes': 'Fiber backbone with redundancy',
-            'meter_number': 'NET-MASTER-001',
-            'connection_type': 'fiber_backbone',
-            'capacity': '10 Gbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_001',
-            'assigned_to': 'master',
-            'priority': 'high',
-            'last_reading': 8542.8,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=180),
-            'updated_at': datetime.now(timezone.utc)
-        },
+# bcrypt runs on a bounded pool; when it is full, password routes answer 429 right away
+password_pool = PasswordPool(
+    workers=int(os.environ.get('PASSWORD_POOL_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.environ.get('PASSWORD_POOL_QUEUE', '32')),
+)
 
-        # Self Services - Services managed by current admin user
-        {
-            'id': 'self_serv_001',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Admin Office Electricity',
-            'service_description': 'Electricity service for admin office',
-            'service_category': 'self_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 245.50,
-            'start_date': datetime.now(timezone.utc),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Standard office electrical connection',
-            'meter_number': 'ELC-ADMIN-001',
-            'connection_type': 'single_phase',
-            'capacity': '50 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'medium',
-            'last_reading': 1240.5,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'self_serv_002',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Admin Office Water',
-            'service_description': 'Water supply for admin facilities',
-            'service_category': 'self_service',
-            'service_type': 'water',
-            'custom_price': 95.0,
-            'monthly_charges': 95.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=30),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Water connection with basic monitoring',
-            'meter_number': 'WTR-ADMIN-001',
-            'connection_type': 'municipal',
-            'capacity': '200 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'medium',
-            'last_reading': 850.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'self_serv_003',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Admin Internet Service',
-            'service_description': 'High-speed internet for administrative tasks',
-            'service_category': 'self_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 120.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Dedicated business line with SLA',
-            'meter_number': 'NET-ADMIN-001',
-            'connection_type': 'fiber',
-            'capacity': '500 Mbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'high',
-            'last_reading': 2542.1,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
-            'updated_at': datetime.now(timezone.utc)
-        },
+async def run_password_task(fn, *args):
+    """Run ``fn`` on the password pool, turning saturation into 429"""
+    try:
+        return await password_pool.run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many password checks in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
 
-        # User Services - Services for end users with various statuses
-        {
-            'id': 'user_serv_001',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Tech Solutions Electricity',
-            'service_description': 'Electricity service for Tech Solutions Inc',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 450.75,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
-            'end_date': None,
-            'service_address': '123 Tech Street, San Francisco, CA',
-            'installation_notes': 'Three-phase connection for tech equipment',
-            'meter_number': 'ELC-TECH-001',
-            'connection_type': 'three_phase',
-            'capacity': '75 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 5420.3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_002',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Restaurant Water Service',
-            'service_description': 'Water service for Green Restaurant Group',
-            'service_category': 'user_service',
-            'service_type': 'water',
-            'custom_price': 185.25,
-            'monthly_charges': 185.25,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
-            'end_date': None,
-            'service_address': '456 Food Avenue, Los Angeles, CA',
-            'installation_notes': 'High-capacity line for restaurant use',
-            'meter_number': 'WTR-REST-001',
-            'connection_type': 'commercial',
-            'capacity': '1,000 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 12850.7,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_003',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Marketing Hub Internet',
-            'service_description': 'High-speed internet for Digital Marketing Hub',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 325.80,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
-            'end_date': None,
-            'service_address': '789 Creative Blvd, Los Angeles, CA',
-            'installation_notes': 'Fiber connection with static IP',
-            'meter_number': 'NET-MKT-001',
-            'connection_type': 'fiber',
-            'capacity': '1 Gbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 8542.1,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_004',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Healthcare Power Service',
-            'service_description': 'Electricity for Healthcare Solutions LLC',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': 1250.50,
-            'monthly_charges': 1250.50,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=150),
-            'end_date': None,
-            'service_address': '321 Medical Center Dr, San Diego, CA',
-            'installation_notes': 'Hospital-grade connection with backup',
-            'meter_number': 'ELC-HLTH-001',
-            'connection_type': 'three_phase_backup',
-            'capacity': '200 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'critical',
-            'last_reading': 18750.8,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=150),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_005',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Manufacturing Power Grid',
-            'service_description': 'High-capacity electricity for Manufacturing Corp',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 2150.75,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=200),
-            'end_date': None,
-            'service_address': '555 Industrial Way, Sacramento, CA',
-            'installation_notes': 'Industrial-grade three-phase with monitoring',
-            'meter_number': 'ELC-MFG-001',
-            'connection_type': 'industrial',
-            'capacity': '500 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 45820.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=200),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_006',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Retail Chain Water',
-            'service_description': 'Water service for Metro Retail Chain',
-            'service_category': 'user_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 875.25,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=75),
-            'end_date': None,
-            'service_address': '888 Shopping Center Blvd, San Jose, CA',
-            'installation_notes': 'Multiple connection points for retail complex',
-            'meter_number': 'WTR-RETAIL-001',
-            'connection_type': 'commercial_multi',
-            'capacity': '2,500 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 22100.5,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=75),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_007',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Academy Power Service',
-            'service_description': 'Electricity service for Sunrise Academy',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 650.40,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=180),
-            'end_date': None,
-            'service_address': '222 Education Drive, Fresno, CA',
-            'installation_notes': 'Educational facility connection',
-            'meter_number': 'ELC-EDU-001',
-            'connection_type': 'educational',
-            'capacity': '100 kW',
-            'is_active': False, # Deactivated service
-            'status': 'suspended',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'low',
-            'last_reading': 9850.3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=180),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=30)
-        },
-        {
-            'id': 'user_serv_008',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Hotel Complex Internet',
-            'service_description': 'Internet service for Grand Plaza Hotel',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 1450.90,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=100),
-            'end_date': None,
-            'service_address': '777 Hospitality Row, San Francisco, CA',
-            'installation_notes': 'High-speed wifi infrastructure for hotel',
-            'meter_number': 'NET-HOTEL-001',
-            'connection_type': 'hospitality_fiber',
-            'capacity': '2 Gbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 15420.7,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=100),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        # Additional Self Services
-        {
-            'id': 'self_serv_004',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Admin Backup Power',
-            'service_description': 'Backup electricity for admin operations',
-            'service_category': 'self_service',
-            'service_type': 'electricity',
-            'custom_price': 180.0,
-            'monthly_charges': 180.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=20),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Emergency backup power system',
-            'meter_number': 'ELC-ADMIN-002',
-            'connection_type': 'backup',
-            'capacity': '25 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'high',
-            'last_reading': 450.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=20),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'self_serv_005',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Admin Fire Safety Water',
-            'service_description': 'Fire safety water system for admin building',
-            'service_category': 'self_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 65.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=15),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Fire suppression system water line',
-            'meter_number': 'WTR-ADMIN-002',
-            'connection_type': 'safety',
-            'capacity': '100 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'critical',
-            'last_reading': 125.8,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=15),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        # Additional User Services
-        {
-            'id': 'user_serv_009',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Shopping Mall Electricity',
-            'service_description': 'Main power supply for Metro Shopping Complex',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 2850.75,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
-            'end_date': None,
-            'service_address': '999 Commerce Ave, Los Angeles, CA',
-            'installation_notes': 'High-capacity mall electrical grid',
-            'meter_number': 'ELC-MALL-001',
-            'connection_type': 'commercial',
-            'capacity': '750 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 68420.3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_010',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'University Campus Internet',
-            'service_description': 'Campus-wide internet for State University',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': 2200.0,
-            'monthly_charges': 2200.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=80),
-            'end_date': None,
-            'service_address': '500 University Drive, Berkeley, CA',
-            'installation_notes': 'High-speed campus network infrastructure',
-            'meter_number': 'NET-UNI-001',
-            'connection_type': 'educational',
-            'capacity': '5 Gbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 25840.1,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=80),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_011',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Sports Complex Water',
-            'service_description': 'Water supply for Metro Sports Complex',
-            'service_category': 'user_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 750.25,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=35),
-            'end_date': None,
-            'service_address': '300 Athletic Way, San Jose, CA',
-            'installation_notes': 'Pool and facility water systems',
-            'meter_number': 'WTR-SPORTS-001',
-            'connection_type': 'recreational',
-            'capacity': '3,000 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 18450.7,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=35),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_012',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Airport Terminal Power',
-            'service_description': 'Electricity for Regional Airport Terminal',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': 4200.0,
-            'monthly_charges': 4200.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
-            'end_date': None,
-            'service_address': '1200 Airport Blvd, San Francisco, CA',
-            'installation_notes': 'Critical infrastructure power supply',
-            'meter_number': 'ELC-AIRPORT-001',
-            'connection_type': 'critical',
-            'capacity': '1.2 MW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'critical',
-            'last_reading': 98750.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_013',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Residential Complex Water',
-            'service_description': 'Water supply for Sunset Residential Complex',
-            'service_category': 'user_service',
-            'service_type': 'water',
-            'custom_price': 1250.0,
-            'monthly_charges': 1250.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
-            'end_date': None,
-            'service_address': '850 Sunset Ave, Oakland, CA',
-            'installation_notes': 'Multi-building residential water supply',
-            'meter_number': 'WTR-RES-001',
-            'connection_type': 'residential',
-            'capacity': '5,000 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 42850.1,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        
-        # Additional Self Services for Admin (user_002) with Addon Plans
-        {
-            'id': 'self_serv_006',
-            'account_id': 'acc_001',
-            'plan_id': 'addon_001', # Premium Support Addon
-            'service_name': 'Admin Premium Support',
-            'service_description': '24/7 premium support for admin operations',
-            'service_category': 'self_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 50.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=10),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Premium support addon activated',
-            'meter_number': 'ADDON-ADMIN-001',
-            'connection_type': 'addon_service',
-            'capacity': '24/7 Support',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'high',
-            'last_reading': None,
-            'is_addon': True,
-            'parent_service_id': 'self_serv_001', # Linked to main electricity service
-            'created_at': datetime.now(timezone.utc) - timedelta(days=10),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'self_serv_007',
-            'account_id': 'acc_001',
-            'plan_id': 'addon_002', # Advanced Monitoring Addon
-            'service_name': 'Admin Advanced Monitoring',
-            'service_description': 'Real-time monitoring for admin electricity service',
-            'service_category': 'self_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 30.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=15),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Advanced monitoring system installed',
-            'meter_number': 'MON-ADMIN-001',
-            'connection_type': 'addon_service',
-            'capacity': 'Real-time Analytics',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'medium',
-            'last_reading': None,
-            'is_addon': True,
-            'parent_service_id': 'self_serv_001',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=15),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'self_serv_008',
-            'account_id': 'acc_001',
-            'plan_id': 'addon_005', # Water Quality Plus Addon
-            'service_name': 'Admin Water Quality Plus',
-            'service_description': 'Advanced water filtration for admin facilities',
-            'service_category': 'self_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 25.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=20),
-            'end_date': None,
-            'service_address': '123 Admin Street, San Francisco, CA',
-            'installation_notes': 'Water quality system addon',
-            'meter_number': 'WQ-ADMIN-001',
-            'connection_type': 'addon_service',
-            'capacity': 'Quality Monitoring',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'admin',
-            'priority': 'medium',
-            'last_reading': None,
-            'is_addon': True,
-            'parent_service_id': 'self_serv_002',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=20),
-            'updated_at': datetime.now(timezone.utc)
-        },
+def load_seed_data():
+    """Demo data for an empty store; imported only when needed to keep it off the import path"""
+    from seed_data import build_dummy_data
+    return build_dummy_data()
 
-        # Additional User Services managed by Admin (user_002)
-        {
-            'id': 'user_serv_014',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Office Complex Electricity',
-            'service_description': 'Main electricity supply for office complex',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 850.75,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=45),
-            'end_date': None,
-            'service_address': '456 Business Ave, San Francisco, CA',
-            'installation_notes': 'High-capacity office electrical system',
-            'meter_number': 'ELC-OFF-001',
-            'connection_type': 'commercial',
-            'capacity': '150 kW',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 15420.8,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_015',
-            'account_id': 'acc_001',
-            'plan_id': 'addon_001', # Premium Support Addon for user service
-            'service_name': 'Office Premium Support Addon',
-            'service_description': '24/7 premium support for office complex',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 50.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=30),
-            'end_date': None,
-            'service_address': '456 Business Ave, San Francisco, CA',
-            'installation_notes': 'Premium support addon for office electricity',
-            'meter_number': 'SUPP-OFF-001',
-            'connection_type': 'addon_service',
-            'capacity': '24/7 Support',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': None,
-            'is_addon': True,
-            'parent_service_id': 'user_serv_014',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_016',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Corporate Internet Hub',
-            'service_description': 'High-speed internet for corporate operations',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 450.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=60),
-            'end_date': None,
-            'service_address': '789 Corporate Blvd, San Francisco, CA',
-            'installation_notes': 'Dedicated fiber for corporate use',
-            'meter_number': 'NET-CORP-001',
-            'connection_type': 'fiber',
-            'capacity': '2 Gbps',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'high',
-            'last_reading': 8520.3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=60),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_017',
-            'account_id': 'acc_001',
-            'plan_id': 'addon_004', # High-Speed Internet Addon
-            'service_name': 'Corporate Gigabit Upgrade',
-            'service_description': 'Gigabit speed upgrade for corporate internet',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 75.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=25),
-            'end_date': None,
-            'service_address': '789 Corporate Blvd, San Francisco, CA',
-            'installation_notes': 'Gigabit speed upgrade addon',
-            'meter_number': 'GIG-CORP-001',
-            'connection_type': 'addon_service',
-            'capacity': 'Gigabit Speed',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': None,
-            'is_addon': True,
-            'parent_service_id': 'user_serv_016',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=25),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        {
-            'id': 'user_serv_018',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_003',
-            'service_name': 'Retail Water Supply',
-            'service_description': 'Commercial water supply for retail stores',
-            'service_category': 'user_service',
-            'service_type': 'water',
-            'custom_price': None,
-            'monthly_charges': 320.50,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=40),
-            'end_date': None,
-            'service_address': '321 Retail Plaza, San Francisco, CA',
-            'installation_notes': 'Multi-outlet water supply system',
-            'meter_number': 'WTR-RET-001',
-            'connection_type': 'commercial',
-            'capacity': '800 gallons/day',
-            'is_active': True,
-            'status': 'active',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'medium',
-            'last_reading': 5240.2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=40),
-            'updated_at': datetime.now(timezone.utc)
-        },
-        
-        # Some Inactive/Suspended Services to test status filtering
-        {
-            'id': 'user_serv_019',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_001',
-            'service_name': 'Warehouse Electricity - Suspended',
-            'service_description': 'Electricity service for warehouse (suspended)',
-            'service_category': 'user_service',
-            'service_type': 'electricity',
-            'custom_price': None,
-            'monthly_charges': 650.25,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=90),
-            'end_date': None,
-            'service_address': '999 Warehouse District, San Francisco, CA',
-            'installation_notes': 'Suspended due to maintenance',
-            'meter_number': 'ELC-WARE-001',
-            'connection_type': 'industrial',
-            'capacity': '200 kW',
-            'is_active': True,
-            'status': 'suspended',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'low',
-            'last_reading': 25420.1,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=90),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=5)
-        },
-        {
-            'id': 'user_serv_020',
-            'account_id': 'acc_001',
-            'plan_id': 'plan_002',
-            'service_name': 'Branch Office Internet - Cancelled',
-            'service_description': 'Internet service for branch office (cancelled)',
-            'service_category': 'user_service',
-            'service_type': 'internet',
-            'custom_price': None,
-            'monthly_charges': 180.0,
-            'start_date': datetime.now(timezone.utc) - timedelta(days=120),
-            'end_date': datetime.now(timezone.utc) - timedelta(days=10),
-            'service_address': '555 Branch St, Oakland, CA',
-            'installation_notes': 'Service cancelled - office closure',
-            'meter_number': 'NET-BRANCH-001',
-            'connection_type': 'fiber',
-            'capacity': '500 Mbps',
-            'is_active': False,
-            'status': 'terminated',
-            'managed_by': 'user_002',
-            'assigned_to': 'user',
-            'priority': 'low',
-            'last_reading': 1520.3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=120),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=10)
-        }
-    ]
-    
-    # Add demo bill cycles
-    demo_bill_cycles = [
-        {
-            'id': 'cycle_001',
-            'name': 'Monthly Utility Cycle',
-            'frequency': 'monthly',
-            'day_of_cycle': 1
-        },
-        {
-            'id': 'cycle_002', 
-            'name': 'Quarterly Business Cycle',
-            'frequency': 'quarterly',
-            'day_of_cycle': 15
-        },
-        {
-            'id': 'cycle_003',
-            'name': 'Weekly Service Cycle', 
-            'frequency': 'weekly',
-            'day_of_cycle': 1
-        }
-    ]
-    
-    # Add demo bill schedules
-    demo_bill_schedules = [
-        {
-            'id': 'schedule_001',
-            'bill_cycle_id': 'cycle_001',
-            'bill_run_name': 'January 2024 Utility Bills',
-            'bill_date': datetime.now(timezone.utc),
-            'status': 'completed',
-            'account_count': 5,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=25)
-        },
-        {
-            'id': 'schedule_002',
-            'bill_cycle_id': 'cycle_001',
-            'bill_run_name': 'February 2024 Utility Bills',
-            'bill_date': datetime.now(timezone.utc) + timedelta(days=5),
-            'status': 'pending',
-            'account_count': 6,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=5),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=5)
-        },
-        {
-            'id': 'schedule_003',
-            'bill_cycle_id': 'cycle_002',
-            'bill_run_name': 'Q1 2024 Business Bills',
-            'bill_date': datetime.now(timezone.utc) + timedelta(days=10),
-            'status': 'processing',
-            'account_count': 3,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=2),
-            'updated_at': datetime.now(timezone.utc) - timedelta(days=1)
-        }
-    ]
-    
-    # Add demo bill runs
-    demo_bill_runs = [
-        {
-            'id': 'run_001',
-            'bill_schedule_id': 'schedule_001',
-            'bill_cycle_id': 'cycle_001',
-            'run_name': 'January 2024 Utility Bills',
-            'run_date': datetime.now(timezone.utc) - timedelta(days=30),
-            'status': 'completed',
-            'total_accounts': 5,
-            'bills_generated': 5,
-            'bills_approved': 4,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30)
-        },
-        {
-            'id': 'run_002', 
-            'bill_schedule_id': 'schedule_002',
-            'bill_cycle_id': 'cycle_001',
-            'run_name': 'February 2024 Utility Bills',
-            'run_date': datetime.now(timezone.utc) + timedelta(days=5),
-            'status': 'processing',
-            'total_accounts': 6,
-            'bills_generated': 2,
-            'bills_approved': 0,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=5)
-        },
-        {
-            'id': 'run_003',
-            'bill_schedule_id': 'schedule_003', 
-            'bill_cycle_id': 'cycle_002',
-            'run_name': 'Q1 2024 Business Bills',
-            'run_date': datetime.now(timezone.utc) + timedelta(days=10),
-            'status': 'processing',
-            'total_accounts': 3,
-            'bills_generated': 3,
-            'bills_approved': 2,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
-        }
-    ]
-    
-    # Add demo billed accounts
-    demo_billed_accounts = [
-        {
-            'id': 'bill_acc_001',
-            'bill_run_id': 'run_001',
-            'account_id': 'acc_001',
-            'account_name': 'Tech Solutions Inc',
-            'charges': 295.50,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=30),
-            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
-            'status': 'approved',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30)
-        },
-        {
-            'id': 'bill_acc_002',
-            'bill_run_id': 'run_003',
-            'account_id': 'acc_001', 
-            'account_name': 'Tech Solutions Inc',
-            'charges': 425.75,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=2),
-            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
-            'status': 'billed',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
-        },
-        {
-            'id': 'bill_acc_003',
-            'bill_run_id': 'run_003',
-            'account_id': 'acc_001',
-            'account_name': 'Green Restaurant Group', 
-            'charges': 567.25,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=2),
-            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
-            'status': 'approved',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
-        },
-        {
-            'id': 'bill_acc_004',
-            'bill_run_id': 'run_003',
-            'account_id': 'acc_001',
-            'account_name': 'Digital Marketing Hub',
-            'charges': 234.80,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=2), 
-            'due_date': datetime.now(timezone.utc) + timedelta(days=28),
-            'status': 'billed',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=2)
-        },
-        {
-            'id': 'bill_acc_005',
-            'bill_run_id': 'run_002',
-            'account_id': 'acc_001',
-            'account_name': 'Tech Solutions Inc',
-            'charges': 189.99,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=1), 
-            'due_date': datetime.now(timezone.utc) + timedelta(days=29),
-            'status': 'billed',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=1)
-        },
-        {
-            'id': 'bill_acc_006',
-            'bill_run_id': 'run_002',
-            'account_id': 'acc_001',
-            'account_name': 'Green Restaurant Group',
-            'charges': 456.78,
-            'bill_date': datetime.now(timezone.utc) - timedelta(days=1), 
-            'due_date': datetime.now(timezone.utc) + timedelta(days=29),
-            'status': 'billed',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=1)
-        }
-    ]
+# All route handlers read and write through the repository.
+# STORAGE_BACKEND=memory (default) keeps everything in dummy_data; mongo uses MONGO_URL/DB_NAME;
+# sqlite shares one WAL-mode database file (SQLITE_PATH) between all workers on the host.
+repo = create_repository(os.environ.get('STORAGE_BACKEND', 'memory'), dummy_data, seed=load_seed_data)
 
-    # Add demo invoices with multiple services
-    demo_invoices = [
-        {
-            'id': 'inv_demo_001',
-            'invoice_number': 'INV-000789',
-            'account_name': 'Tech Solutions Inc',
-            'account_id': 'acc_001',
-            'total_amount': 2076.60,
-            'subtotal': 1920.00,
-            'tax_amount': 156.60,
-            'discount_amount': 0.00,
-            'status': 'overdue',
-            'paid_status': False,
-            'days_overdue': 15,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=45),
-            'issue_date': datetime.now(timezone.utc) - timedelta(days=45),
-            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
-            'month': 'March 2024',
-            'category': 'utility',
-            'items': [
-                {
-                    'description': 'Electricity Service - Enterprise Pro',
-                    'quantity': 1,
-                    'amount': 195.25,
-                    'service_id': 'srv_001'
-                },
-                {
-                    'description': 'Water Service - Commercial Plus',
-                    'quantity': 1, 
-                    'amount': 133.10,
-                    'service_id': 'srv_002'
-                },
-                {
-                    'description': 'Gas Service - Business Standard',
-                    'quantity': 1,
-                    'amount': 1748.25,
-                    'service_id': 'srv_003'
-                },
-                {
-                    'description': 'Internet Service - High-Speed Fiber',
-                    'quantity': 1,
-                    'amount': 450.00,
-                    'service_id': 'srv_004'
-                },
-                {
-                    'description': 'Waste Management Service',
-                    'quantity': 1,
-                    'amount': 85.75,
-                    'service_id': 'srv_005'
-                },
-                {
-                    'description': 'Security System Monitoring',
-                    'quantity': 1,
-                    'amount': 120.50,
-                    'service_id': 'srv_006'
-                }
-            ]
-        },
-        {
-            'id': 'inv_demo_002',
-            'invoice_number': 'INV-000790',
-            'account_name': 'Green Restaurant Group',
-            'account_id': 'acc_001', 
-            'total_amount': 856.30,
-            'subtotal': 792.00,
-            'tax_amount': 64.30,
-            'discount_amount': 0.00,
-            'status': 'paid',
-            'paid_status': True,
-            'days_overdue': 0,
-            'created_at': datetime.now(timezone.utc) - timedelta(days=30),
-            'issue_date': datetime.now(timezone.utc) - timedelta(days=30),
-            'due_date': datetime.now(timezone.utc) - timedelta(days=15),
-            'month': 'March 2024',
-            'category': 'utility',
-            'items': [
-                {
-                    'description': 'Electricity Service - Commercial',
-                    'quantity': 1,
-                    'amount': 345.75,
-                    'service_id': 'srv_001'
-                },
-                {
-                    'description': 'Water Service - High Volume',
-                    'quantity': 1,
-                    'amount': 256.25,
-                    'service_id': 'srv_002'
-                },
-                {
-                    'description': 'Waste Management - Restaurant',
-                    'quantity': 1,
-                    'amount': 190.00,
-                    'service_id': 'srv_005'
-                }
-            ]
-        }
-    ]
+# Bearer token -> user; updates to a user drop their cached tokens
+token_cache = TokenCache(
+    maxsize=int(os.environ.get('AUTH_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '300')),
+)
+repo.add_write_listener(token_cache.on_write)
 
-    dummy_data.update({
-        'users': demo_users,
-        'profiles': demo_profiles,
-        'plans': demo_plans,
-        'accounts': demo_accounts,
-        'services': demo_services,
-        'invoices': demo_invoices,
-        'payments': [],
-        'bill_cycles': demo_bill_cycles,
-        'bill_schedules': demo_bill_schedules,
-        'bill_runs': demo_bill_runs,
-        'billed_accounts': demo_billed_accounts
-    })
+# Known emails, so unknown-email logins and new registrations skip the user lookup
+email_filter = EmailFilter(
+    authoritative=not repo.shared,
+    fp_rate=float(os.environ.get('EMAIL_FILTER_FP_RATE', '0.01')),
+)
+repo.add_write_listener(email_filter.on_write)
+
+# Executes pending bill runs once their run date has come; BILL_RUN_POLL_SECONDS=0 disables it.
+# Services are priced and shards of BILL_RUN_SHARD_SIZE accounts rated on a thread, or by a pool of
+# BILL_RUN_WORKERS processes when it is set above 1.
+# A processing run without a checkpoint for BILL_RUN_STALE_SECONDS is marked failed or partial
+bill_run_engine = BillRunEngine(
+    repo,
+    batch_size=int(os.environ.get('BILL_RUN_BATCH_SIZE', '1000')),
+    poll_interval=float(os.environ.get('BILL_RUN_POLL_SECONDS', '30')),
+    due_days=int(os.environ.get('BILL_DUE_DAYS', '15')),
+    shard_size=int(os.environ.get('BILL_RUN_SHARD_SIZE', '5000')),
+    workers=int(os.environ.get('BILL_RUN_WORKERS', '1')),
+    stale_after=float(os.environ.get('BILL_RUN_STALE_SECONDS', '300')),
+)
+
+# Bill-run progress for the SSE routes: watched runs are read once per PROGRESS_TICK_SECONDS
+# and only their changes are sent, however many dashboards stream them
+progress_hub = ProgressHub(
+    repo,
+    tick=float(os.environ.get('PROGRESS_TICK_SECONDS', '1')),
+    keepalive=float(os.environ.get('PROGRESS_KEEPALIVE_SECONDS', '15')),
+)
+
+def public_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a user row without the password hash and internal lookup keys"""
+    return {key: value for key, value in user.items() if key not in ('password', 'email_key')}
+
+async def find_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """Case-insensitive user lookup through the email filter and the email_key index"""
+    key = normalize_email(email)
+    if not email_filter.might_exist(key):
+        return None
+    email_filter.rebuild_if_full(repo)
+    users = await repo.users.find(email_key=key)
+    if not users:
+        email_filter.false_positive()
+        return None
+    return users[0]
 
-# Initialize dummy data on startup
-try:
-    init_dummy_data()
-    print("✅ Enhanced dummy data initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing dummy data: {e}")
+async def warm_up(app: FastAPI):
+    """Open the repository (recovery or seeding) and mark the app ready"""
+    started = time.perf_counter()
+    try:
+        await repo.open()
+        await email_filter.build(repo)
+    except Exception as e:
+        log.exception('storage_init_failed', error=str(e))
+        raise
+    app.state.ready = True
+    log.info('storage_ready', seconds=round(time.perf_counter() - started, 3))
+    bill_run_engine.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background so the worker accepts connections right away;
+    # until it finishes API calls get 503 and /api/health/ready reports not ready
+    app.state.ready = False
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    app.state.ready = False
+    await bill_run_engine.stop()
+    await progress_hub.stop()
+    await repo.close()
+
+class ReadinessGate:
+    """ASGI middleware answering 503 to API calls until the app is warm"""
+
+    # Probes, metrics and the API docs answer while warming up
+    def __init__(self, app, exempt=('/api/health/ready', '/metrics', '/docs', '/docs/oauth2-redirect',
+                                    '/redoc', '/openapi.json')):
+        self.app = app
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not getattr(scope['app'].state, 'ready', False) \
+                and scope['path'] not in self.exempt:
+            response = JSONResponse({'detail': 'Service is warming up'}, status_code=503,
+                                    headers={'Retry-After': '1'})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
 # Create the main app without a prefix
-app = FastAPI(title="Enhanced Utility Manager CRM API", version="2.0.0")
+app = FastAPI(title="Enhanced Utility Manager CRM API", version="2.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=metrics.TimedRoute)
 
 # Enhanced Enums
 class UserRole(str, Enum):
@@ -2112,6 +560,17 @@ class PaymentResponse(PaymentBase):
 class SystemConfig(BaseModel):
     deposit_multiplier: float = 2.0
 
+class LoggingSettings(BaseModel):
+    level: Optional[str] = None
+    sample_rates: Optional[Dict[str, float]] = None
+
+class ProfileRequest(BaseModel):
+    seconds: float = 10.0  # stop after this long...
+    requests: Optional[int] = None  # ...or once this many matching requests completed
+    route: Optional[str] = None  # route template, e.g. /api/services/{service_id}
+    method: Optional[str] = None
+    interval_ms: float = 5.0
+
 # Analytics Models
 class DashboardStats(BaseModel):
     total_profiles: Optional[int] = None
@@ -2140,33 +599,6 @@ def create_access_token(data: dict):
     to_encode = data.copy()
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-            elif isinstance(value, dict):
-                data[key] = prepare_for_mongo(value)
-            elif isinstance(value, list):
-                data[key] = [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
-    return data
-
-def parse_from_mongo(item):
-    """Parse datetime strings from MongoDB back to datetime objects"""
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and key.endswith(('_at', '_date')):
-                try:
-                    item[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    pass
-            elif isinstance(value, dict):
-                item[key] = parse_from_mongo(value)
-            elif isinstance(value, list):
-                item[key] = [parse_from_mongo(i) if isinstance(i, dict) else i for i in value]
-    return item
-
 def generate_invoice_pdf(invoice_data: dict) -> str:
     """Generate a simple PDF invoice representation (mock for now)"""
     invoice_content = f"""
@@ -2186,19 +618,30 @@ def generate_invoice_pdf(invoice_data: dict) -> str:
 
 # Authentication dependency
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    started = time.perf_counter()
+    try:
+        return await _authenticate(credentials.credentials)
+    finally:
+        metrics.record_auth(time.perf_counter() - started)
+
+async def _authenticate(token: str):
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    # Find user in dummy data
-    user = next((u for u in dummy_data['users'] if u['id'] == user_id), None)
+    user = await repo.users.get(user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
+    token_cache.put(token, user_id, user, payload.get("exp"))
     return user
 
 # Role-based access control
@@ -2209,47 +652,66 @@ def require_role(required_roles: List[UserRole]):
         return current_user
     return role_checker
 
+# Conditional GET for lists that rarely change
+def conditional_get(*collections: str):
+    """Dependency answering 304 before the handler runs when If-None-Match still matches
+
+    The ETag covers the write counters of ``collections`` plus the route, query,
+    Accept header (JSON or NDJSON) and caller's role and id. It returns the validator headers; handlers that
+    build their own Response must pass them on.
+    """
+    async def check(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+        # Versions are read before the handler reads any rows, see repository.WriteListener
+        versions = await repo.versions(collections)
+        scope = (request.url.path, request.url.query, wants_ndjson(request), current_user['role'], current_user['id'])
+        headers = {'ETag': collection_etag(repo.epoch, versions, scope), 'Cache-Control': 'private, no-cache', 'Vary': 'Accept'}
+        if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return headers
+    return check
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Enhanced Utility Manager CRM API", "version": "2.0.0"}
 
+@api_router.get("/health/ready")
+async def readiness(response: Response):
+    """Readiness probe: 503 until storage is opened and seeded"""
+    if not app.state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "warming_up"}
+    return {"status": "ready"}
+
 # Authentication routes
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register(user_data: UserCreate):
     # Check if user already exists
-    existing_user = next((u for u in dummy_data['users'] if u['email'] == user_data.email), None)
-    if existing_user:
+    if await find_user_by_email(user_data.email):
         raise HTTPException(status_code=400, detail="User already exists")
     
     user_dict = user_data.dict()
     user_dict["id"] = str(uuid.uuid4())
-    user_dict["password"] = get_password_hash(user_data.password)
+    user_dict["password"] = await run_password_task(get_password_hash, user_data.password)
     user_dict["created_at"] = datetime.now(timezone.utc)
     user_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    dummy_data['users'].append(user_dict.copy())
+    await repo.users.insert(user_dict.copy())
     
     del user_dict["password"]
     return UserResponse(**user_dict)
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(login_data: UserLogin):
-    print(f"🔍 Login attempt for email: {login_data.email}")
-    print(f"🔍 Total users in dummy_data: {len(dummy_data['users'])}")
-    
-    # Find user in dummy data
-    user = next((u for u in dummy_data['users'] if u['email'] == login_data.email), None)
+    user = await find_user_by_email(login_data.email)
     
     if user:
-        print(f"✅ User found: {user['email']}")
-        password_valid = verify_password(login_data.password, user['password'])
-        print(f"🔍 Password verification result: {password_valid}")
+        password_valid = await run_password_task(verify_password, login_data.password, user['password'])
         
         if password_valid:
             if not user.get("is_active", True):
-                print("❌ Account is disabled")
+                log.info('login_failed', reason='account_disabled', user_id=user['id'])
                 raise HTTPException(status_code=401, detail="Account is disabled")
             
             access_token = create_access_token(data={"sub": user["id"]})
@@ -2259,17 +721,16 @@ async def login(login_data: UserLogin):
             if "password" in user_data:
                 del user_data["password"]
             
-            print("✅ Login successful")
+            log.info('login_succeeded', user_id=user['id'])
             return {
                 "access_token": access_token,
                 "token_type": "bearer",
                 "user": UserResponse(**user_data)
             }
         else:
-            print("❌ Password verification failed")
+            log.info('login_failed', reason='bad_password', user_id=user['id'])
     else:
-        print(f"❌ User not found with email: {login_data.email}")
-        print(f"🔍 Available users: {[u['email'] for u in dummy_data['users']]}")
+        log.info('login_failed', reason='unknown_email')
     
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -2283,29 +744,24 @@ async def create_profile(profile_data: ProfileCreate, current_user: dict = Depen
     profile_dict["created_at"] = datetime.now(timezone.utc)
     profile_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    dummy_data['profiles'].append(profile_dict)
+    await repo.profiles.insert(profile_dict)
     
     return ProfileResponse(**profile_dict)
 
 @api_router.get("/profiles", response_model=List[ProfileResponse])
 async def get_profiles(current_user: dict = Depends(get_current_user)):
     """Get profiles based on user role"""
-    return [ProfileResponse(**profile) for profile in dummy_data['profiles']]
+    return trusted_list(ProfileResponse, await repo.profiles.list())
 
 @api_router.put("/profiles/{profile_id}", response_model=ProfileResponse)
 async def update_profile(profile_id: str, profile_data: ProfileUpdate, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
     """Update profile (Admin and Super Admin only)"""
-    # Find and update profile in dummy data
-    for i, profile in enumerate(dummy_data['profiles']):
-        if profile['id'] == profile_id:
-            # Update fields
-            update_dict = profile_data.dict(exclude_unset=True)
-            dummy_data['profiles'][i].update(update_dict)
-            dummy_data['profiles'][i]['updated_at'] = datetime.now(timezone.utc)
-            return ProfileResponse(**dummy_data['profiles'][i])
-    
-    raise HTTPException(status_code=404, detail="Profile not found")
+    update_dict = profile_data.dict(exclude_unset=True)
+    update_dict['updated_at'] = datetime.now(timezone.utc)
+    profile = await repo.profiles.update(profile_id, update_dict)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return ProfileResponse(**profile)
 
 # Enhanced Service Plan Routes
 @api_router.post("/plans", response_model=ServicePlanResponse)
@@ -2317,8 +773,7 @@ async def create_service_plan(plan_data: ServicePlanCreate, current_user: dict =
     plan_dict["created_at"] = datetime.now(timezone.utc)
     plan_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    dummy_data['plans'].append(plan_dict)
+    await repo.plans.insert(plan_dict)
     
     # Calculate deposit for response
     response_dict = plan_dict.copy()
@@ -2327,9 +782,9 @@ async def create_service_plan(plan_data: ServicePlanCreate, current_user: dict =
     return ServicePlanResponse(**response_dict)
 
 @api_router.get("/plans", response_model=List[ServicePlanResponse])
-async def get_service_plans(current_user: dict = Depends(get_current_user)):
+async def get_service_plans(current_user: dict = Depends(get_current_user), validators: dict = Depends(conditional_get('plans'))):
     """Get service plans based on user role"""
-    plans = dummy_data['plans'].copy()
+    plans = await repo.plans.list()
     
     # Filter based on role
     if current_user["role"] == "user":
@@ -2345,32 +800,32 @@ async def get_service_plans(current_user: dict = Depends(get_current_user)):
     for plan in plans:
         plan_dict = plan.copy()
         plan_dict['calculated_deposit'] = plan['charges'] * plan.get('deposit_multiplier', 2.0)
-        enhanced_plans.append(ServicePlanResponse(**plan_dict))
+        enhanced_plans.append(plan_dict)
     
-    return enhanced_plans
+    return trusted_list(ServicePlanResponse, enhanced_plans, headers=validators)
 
 @api_router.put("/plans/{plan_id}", response_model=ServicePlanResponse)
 async def update_service_plan(plan_id: str, plan_data: ServicePlanUpdate, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
     """Update service plan"""
-    # Find and update plan in dummy data
-    for i, plan in enumerate(dummy_data['plans']):
-        if plan['id'] == plan_id:
-            # Check permissions
-            if current_user['role'] == 'admin' and plan.get('created_for_admin') != current_user['id'] and plan.get('created_by') != current_user['id']:
-                raise HTTPException(status_code=403, detail="Cannot modify this plan")
-            
-            # Update fields
-            update_dict = plan_data.dict(exclude_unset=True)
-            dummy_data['plans'][i].update(update_dict)
-            dummy_data['plans'][i]['updated_at'] = datetime.now(timezone.utc)
-            
-            # Add calculated deposit
-            response_dict = dummy_data['plans'][i].copy()
-            response_dict['calculated_deposit'] = response_dict['charges'] * response_dict.get('deposit_multiplier', 2.0)
-            
-            return ServicePlanResponse(**response_dict)
+    plan = await repo.plans.get(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    # Check permissions
+    if current_user['role'] == 'admin' and plan.get('created_for_admin') != current_user['id'] and plan.get('created_by') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Cannot modify this plan")
+    
+    # Update fields
+    update_dict = plan_data.dict(exclude_unset=True)
+    update_dict['updated_at'] = datetime.now(timezone.utc)
+    plan = await repo.plans.update(plan_id, update_dict)
+    await bill_run_engine.record_changes(plan_ids=[plan_id])
     
-    raise HTTPException(status_code=404, detail="Plan not found")
+    # Add calculated deposit
+    response_dict = plan.copy()
+    response_dict['calculated_deposit'] = response_dict['charges'] * response_dict.get('deposit_multiplier', 2.0)
+    
+    return ServicePlanResponse(**response_dict)
 
 # Enhanced Account Management Routes
 @api_router.post("/accounts", response_model=AccountResponse)
@@ -2382,26 +837,27 @@ async def create_account(account_data: AccountCreate, current_user: dict = Depen
     account_dict["created_at"] = datetime.now(timezone.utc)
     account_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    dummy_data['accounts'].append(account_dict)
+    await repo.accounts.insert(account_dict)
     
     return AccountResponse(**account_dict)
 
 @api_router.get("/accounts", response_model=List[AccountResponse])
-async def get_accounts(current_user: dict = Depends(get_current_user)):
+async def get_accounts(request: Request, paging: PageRequest = Depends(), current_user: dict = Depends(get_current_user), validators: dict = Depends(conditional_get('accounts'))):
     """Get accounts with enhanced data"""
-    accounts = dummy_data['accounts'].copy()
-    
     # Filter based on role
+    criteria = {}
     if current_user["role"] == "user":
-        accounts = [a for a in accounts if a.get('user_id') == current_user['id']]
+        criteria['user_id'] = current_user['id']
+    if wants_ndjson(request):
+        return ndjson_response(iter_batches(repo.accounts, paging, **criteria), AccountResponse, headers=validators)
+    accounts, headers = await fetch_list(repo.accounts, paging, request, **criteria)
     
-    return [AccountResponse(**account) for account in accounts]
+    return trusted_list(AccountResponse, accounts, headers={**validators, **headers})
 
 @api_router.get("/accounts/{account_id}", response_model=AccountResponse)
 async def get_account_by_id(account_id: str, current_user: dict = Depends(get_current_user)):
     """Get specific account by ID"""
-    account = next((a for a in dummy_data['accounts'] if a['id'] == account_id), None)
+    account = await repo.accounts.get(account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
@@ -2421,7 +877,7 @@ async def create_service(service_data: ServiceCreate, current_user: dict = Depen
     service_dict["updated_at"] = datetime.now(timezone.utc)
     
     # Validate account access
-    account = next((a for a in dummy_data['accounts'] if a['id'] == service_data.account_id), None)
+    account = await repo.accounts.get(service_data.account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
@@ -2430,122 +886,183 @@ async def create_service(service_data: ServiceCreate, current_user: dict = Depen
         raise HTTPException(status_code=403, detail="Cannot create service for this account")
     
     # Validate plan exists
-    plan = next((p for p in dummy_data['plans'] if p['id'] == service_data.plan_id), None)
+    plan = await repo.plans.get(service_data.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    # Add to dummy data
-    dummy_data['services'].append(service_dict)
+    await repo.services.insert(service_dict)
+    await bill_run_engine.record_changes(account_ids=[service_dict['account_id']])
     
     return ServiceResponse(**service_dict)
 
+def plan_view(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """A plan as embedded in responses: projected, with its calculated deposit"""
+    plan_copy = plan.copy()
+    plan_copy['calculated_deposit'] = plan['charges'] * plan.get('deposit_multiplier', 2.0)
+    return shape(ServicePlanResponse).project(plan_copy)
+
+def account_view(account: Dict[str, Any]) -> Dict[str, Any]:
+    return shape(AccountResponse).project(account)
+
+# Plan and account views embedded in service and subscription responses
+enrichment = EnrichmentCache(repo, plan_view, account_view, maxsize=int(os.environ.get('ENRICHMENT_CACHE_SIZE', '10000')))
+repo.add_write_listener(enrichment.on_write)
+
+SERVICE_RELATIONS = ('plan', 'account')
+
+
+def parse_field_list(value: str, allowed, param: str) -> set:
+    """Comma-separated names from a query parameter; 400 for names not in ``allowed``"""
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {param}: {', '.join(sorted(unknown))}")
+    return names
+
+
+class ServiceView:
+    """``fields``, ``expand`` and ``included`` parameters of the service routes
+
+    Without them a service embeds its plan (plus calculated deposit) and its
+    account, as before. ``fields`` keeps only the listed fields (``id`` is
+    always sent), ``expand`` names the relations to embed (``expand=`` embeds
+    none, so nothing is read besides the services) and ``included=true`` sends
+    every expanded plan and account once, keyed by id, in an ``included``
+    table next to the ``data`` instead of inside each service.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[str] = Query(None, description="Comma-separated service fields to return"),
+        expand: Optional[str] = Query(None, description="Relations to embed: plan, account (default: both)"),
+        included: bool = Query(False, description="Return expanded relations once in an 'included' table"),
+    ):
+        names = set(ServiceResponse.model_fields) if fields is None else parse_field_list(fields, ServiceResponse.model_fields, 'fields') | {'id'}
+        relations = set(SERVICE_RELATIONS) if expand is None else parse_field_list(expand, SERVICE_RELATIONS, 'expand')
+        self.included = included
+        if included:
+            # Services reference the side table by id, so those ids are always sent
+            self.relations = [relation for relation in SERVICE_RELATIONS if relation in relations]
+            names = (names - set(SERVICE_RELATIONS)) | {f"{relation}_id" for relation in self.relations}
+        else:
+            self.relations = [relation for relation in SERVICE_RELATIONS if relation in relations and relation in names]
+            names -= set(SERVICE_RELATIONS) - set(self.relations)
+        self.shape = shape(ServiceResponse).only(names)
+
+    async def related(self, services: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Views of the plans and accounts of ``services`` by relation and id"""
+        tables: Dict[str, Dict[str, Any]] = {}
+        if self.relations:
+            await enrichment.sync()
+        if 'plan' in self.relations:
+            plans = tables['plan'] = {}
+            for plan_id in dict.fromkeys(service['plan_id'] for service in services):
+                plan = await enrichment.plan(plan_id)
+                if plan:
+                    plans[plan_id] = plan
+        if 'account' in self.relations:
+            accounts = tables['account'] = {}
+            for account_id in dict.fromkeys(service['account_id'] for service in services):
+                account = await enrichment.account(account_id)
+                if account:
+                    accounts[account_id] = account
+        return tables
+
+    async def rows(self, services: List[Dict[str, Any]], tables: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """``services`` projected for the response, relations embedded unless ``included``"""
+        if tables is None:
+            tables = await self.related(services)
+        project = self.shape.project
+        rows = []
+        for service in services:
+            row = project(service)
+            if not self.included:
+                for relation, table in tables.items():
+                    row[relation] = table.get(service[f"{relation}_id"])
+            rows.append(row)
+        return rows
+
+    async def render(self, services: List[Dict[str, Any]], headers: Optional[Dict[str, str]] = None,
+                     single: bool = False) -> FastJSONResponse:
+        tables = await self.related(services)
+        rows = await self.rows(services, tables)
+        content = rows[0] if single else rows
+        if self.included:
+            content = {'data': content, 'included': {f"{relation}s": table for relation, table in tables.items()}}
+        return FastJSONResponse(content, headers=headers)
+
+    async def stream(self, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[List[Dict[str, Any]]]:
+        # Relations are read per batch so memory stays at one batch
+        async for batch in batches:
+            yield await self.rows(batch)
+
+
 @api_router.get("/services", response_model=List[ServiceResponse])
-async def get_services(account_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_services(request: Request, account_id: Optional[str] = None, paging: PageRequest = Depends(), view: ServiceView = Depends(), current_user: dict = Depends(get_current_user)):
     """Get services with enhanced data"""
-    services = dummy_data['services'].copy()
-    
     # Filter by account if specified
+    criteria = {}
     if account_id:
-        services = [s for s in services if s['account_id'] == account_id]
+        criteria['account_id'] = account_id
         
         # Check permissions for specific account
         if current_user["role"] == "user":
-            account = next((a for a in dummy_data['accounts'] if a['id'] == account_id), None)
+            account = await repo.accounts.get(account_id, fields=('user_id',))
             if account and account.get('user_id') != current_user['id']:
                 raise HTTPException(status_code=403, detail="Access denied")
+    if wants_ndjson(request):
+        if view.included:
+            raise HTTPException(status_code=400, detail="included is not available for NDJSON responses")
+        return ndjson_response(view.stream(iter_batches(repo.services, paging, **criteria)), projected=True)
+    services, headers = await fetch_list(repo.services, paging, request, **criteria)
     
     # Add plan and account details
-    enhanced_services = []
-    for service in services:
-        service_dict = service.copy()
-        
-        # Get plan details
-        plan = next((p for p in dummy_data['plans'] if p['id'] == service['plan_id']), None)
-        if plan:
-            plan_copy = plan.copy()
-            plan_copy['calculated_deposit'] = plan['charges'] * plan.get('deposit_multiplier', 2.0)
-            service_dict['plan'] = plan_copy
-            
-        # Get account details
-        account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
-        if account:
-            service_dict['account'] = account
-            
-        enhanced_services.append(ServiceResponse(**service_dict))
-    
-    return enhanced_services
+    return await view.render(services, headers=headers)
 
 @api_router.put("/services/{service_id}", response_model=ServiceResponse)
-async def update_service(service_id: str, service_data: ServiceUpdate, current_user: dict = Depends(get_current_user)):
+async def update_service(service_id: str, service_data: ServiceUpdate, view: ServiceView = Depends(), current_user: dict = Depends(get_current_user)):
     """Update service (all fields except service_id are updatable)"""
-    # Find service in dummy data
-    for i, service in enumerate(dummy_data['services']):
-        if service['id'] == service_id:
-            # Check permissions
-            if current_user["role"] == "user":
-                account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
-                if account and account.get('user_id') != current_user['id']:
-                    raise HTTPException(status_code=403, detail="Access denied")
-            
-            # Update fields (all except id are updatable)
-            update_dict = service_data.dict(exclude_unset=True)
-            dummy_data['services'][i].update(update_dict)
-            dummy_data['services'][i]['updated_at'] = datetime.now(timezone.utc)
-            
-            # Return updated service with enhanced data
-            service_dict = dummy_data['services'][i].copy()
-            
-            # Get plan details
-            plan = next((p for p in dummy_data['plans'] if p['id'] == service_dict['plan_id']), None)
-            if plan:
-                plan_copy = plan.copy()
-                plan_copy['calculated_deposit'] = plan['charges'] * plan.get('deposit_multiplier', 2.0)
-                service_dict['plan'] = plan_copy
-            
-            # Get account details
-            account = next((a for a in dummy_data['accounts'] if a['id'] == service_dict['account_id']), None)
-            if account:
-                service_dict['account'] = account
-            
-            return ServiceResponse(**service_dict)
+    service = await repo.services.get(service_id)
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    
+    # Check permissions
+    if current_user["role"] == "user":
+        account = await repo.accounts.get(service['account_id'], fields=('user_id',))
+        if account and account.get('user_id') != current_user['id']:
+            raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Update fields (all except id are updatable)
+    update_dict = service_data.dict(exclude_unset=True)
+    update_dict['updated_at'] = datetime.now(timezone.utc)
+    previous_account_id = service['account_id']
+    service = await repo.services.update(service_id, update_dict)
+    await bill_run_engine.record_changes(account_ids=[previous_account_id, service['account_id']])
     
-    raise HTTPException(status_code=404, detail="Service not found")
+    # Return updated service with enhanced data
+    return await view.render([service], single=True)
 
 @api_router.get("/services/{service_id}", response_model=ServiceResponse)
-async def get_service_by_id(service_id: str, current_user: dict = Depends(get_current_user)):
+async def get_service_by_id(service_id: str, view: ServiceView = Depends(), current_user: dict = Depends(get_current_user)):
     """Get specific service by ID"""
-    service = next((s for s in dummy_data['services'] if s['id'] == service_id), None)
+    service = await repo.services.get(service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     
     # Check permissions
     if current_user["role"] == "user":
-        account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
+        account = await repo.accounts.get(service['account_id'], fields=('user_id',))
         if account and account.get('user_id') != current_user['id']:
             raise HTTPException(status_code=403, detail="Access denied")
     
     # Add enhanced data
-    service_dict = service.copy()
-    
-    # Get plan details
-    plan = next((p for p in dummy_data['plans'] if p['id'] == service['plan_id']), None)
-    if plan:
-        plan_copy = plan.copy()
-        plan_copy['calculated_deposit'] = plan['charges'] * plan.get('deposit_multiplier', 2.0)
-        service_dict['plan'] = plan_copy
-    
-    # Get account details
-    account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
-    if account:
-        service_dict['account'] = account
-    
-    return ServiceResponse(**service_dict)
+    return await view.render([service], single=True)
 
 # Enhanced Invoice Routes
 @api_router.post("/invoices", response_model=InvoiceResponse)
 async def create_invoice(invoice_data: InvoiceCreate, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
     """Create enhanced invoice"""
-    invoice_count = len(dummy_data['invoices']) + 1
+    invoice_count = await repo.invoices.count() + 1
     invoice_number = f"INV-{invoice_count:06d}"
     
     invoice_dict = invoice_data.dict()
@@ -2554,21 +1071,24 @@ async def create_invoice(invoice_data: InvoiceCreate, current_user: dict = Depen
     invoice_dict["created_at"] = datetime.now(timezone.utc)
     invoice_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    dummy_data['invoices'].append(invoice_dict)
+    await repo.invoices.insert(invoice_dict)
     
     return InvoiceResponse(**invoice_dict)
 
 @api_router.get("/invoices")
-async def get_invoices(current_user: dict = Depends(get_current_user)):
+async def get_invoices(request: Request, response: Response, paging: PageRequest = Depends(), current_user: dict = Depends(get_current_user)):
     """Get invoices for current user"""
     # For demo, return all invoices - in real app, filter by user permissions
-    return dummy_data['invoices']
+    if wants_ndjson(request):
+        return ndjson_response(iter_batches(repo.invoices, paging))
+    invoices, headers = await fetch_list(repo.invoices, paging, request)
+    response.headers.update(headers)
+    return invoices
 
 @api_router.get("/invoices/{invoice_id}")
 async def get_invoice_details(invoice_id: str, current_user: dict = Depends(get_current_user)):
     """Get specific invoice details"""
-    invoice = next((i for i in dummy_data['invoices'] if i['id'] == invoice_id), None)
+    invoice = await repo.invoices.get(invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return invoice
@@ -2577,7 +1097,7 @@ async def get_invoice_details(invoice_id: str, current_user: dict = Depends(get_
 async def generate_invoice_pdf_endpoint(invoice_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
     """Generate PDF for invoice"""
     # Find invoice
-    invoice = next((i for i in dummy_data['invoices'] if i['id'] == invoice_id), None)
+    invoice = await repo.invoices.get(invoice_id)
     if not invoice:
         # Mock invoice data for demo
         invoice_data = {
@@ -2607,6 +1127,8 @@ class BillRunStatus(str, Enum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
+    PARTIAL = "partial"  # failed after committing some bills; resumable
+    FAILED = "failed"
 
 class BillCycle(BaseModel):
     id: str
@@ -2619,6 +1141,7 @@ class BillScheduleCreate(BaseModel):
     bill_run_name: str
     bill_date: datetime
     account_ids: List[str] = []  # empty means all accounts
+    incremental: bool = False  # reuse the last completed run's charges of unchanged accounts
 
 class BillScheduleResponse(BaseModel):
     id: str
@@ -2657,21 +1180,21 @@ class BilledAccountResponse(BaseModel):
 
 # Bill Generation API Endpoints
 
-@api_router.get("/billing/cycles")
+@api_router.get("/billing/cycles", dependencies=[Depends(conditional_get('bill_cycles'))])
 async def get_bill_cycles(current_user: dict = Depends(get_current_user)):
     """Get all bill cycles"""
-    bill_cycles = dummy_data.get('bill_cycles', [])
+    bill_cycles = await repo.bill_cycles.list()
     return bill_cycles
 
-@api_router.get("/billing/schedules")
+@api_router.get("/billing/schedules", dependencies=[Depends(conditional_get('bill_schedules', 'bill_cycles'))])
 async def get_bill_schedules(current_user: dict = Depends(get_current_user)):
     """Get all bill schedules with pagination"""
-    bill_schedules = dummy_data.get('bill_schedules', [])
+    bill_schedules = await repo.bill_schedules.list()
     
     # Add bill cycle name to each schedule
     enhanced_schedules = []
     for schedule in bill_schedules:
-        cycle = next((c for c in dummy_data.get('bill_cycles', []) if c['id'] == schedule['bill_cycle_id']), None)
+        cycle = await repo.bill_cycles.get(schedule['bill_cycle_id'], fields=('name',))
         schedule_copy = schedule.copy()
         schedule_copy['bill_cycle_name'] = cycle['name'] if cycle else 'Unknown Cycle'
         enhanced_schedules.append(schedule_copy)
@@ -2684,14 +1207,11 @@ async def create_bill_schedule(schedule_data: BillScheduleCreate, current_user:
     schedule_dict = schedule_data.dict()
     schedule_dict["id"] = str(uuid.uuid4())
     schedule_dict["status"] = BillScheduleStatus.PENDING
-    schedule_dict["account_count"] = len(schedule_data.account_ids) if schedule_data.account_ids else len(dummy_data['accounts'])
+    schedule_dict["account_count"] = len(schedule_data.account_ids) if schedule_data.account_ids else await repo.accounts.count()
     schedule_dict["created_at"] = datetime.now(timezone.utc)
     schedule_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Add to dummy data
-    if 'bill_schedules' not in dummy_data:
-        dummy_data['bill_schedules'] = []
-    dummy_data['bill_schedules'].append(schedule_dict)
+    await repo.bill_schedules.insert(schedule_dict)
     
     # Also create a corresponding bill run
     bill_run = {
@@ -2704,77 +1224,129 @@ async def create_bill_schedule(schedule_data: BillScheduleCreate, current_user:
         "total_accounts": schedule_dict["account_count"],
         "bills_generated": 0,
         "bills_approved": 0,
+        "incremental": schedule_data.incremental,
         "created_at": datetime.now(timezone.utc)
     }
     
-    if 'bill_runs' not in dummy_data:
-        dummy_data['bill_runs'] = []
-    dummy_data['bill_runs'].append(bill_run)
+    await repo.bill_runs.insert(bill_run)
+    bill_run_engine.wake()
     
     return {"message": "Bill schedule created successfully", "schedule_id": schedule_dict["id"]}
 
 @api_router.get("/billing/runs")
-async def get_bill_runs(bill_cycle_id: str = None, bill_run_id: str = None, status: str = None, current_user: dict = Depends(get_current_user)):
+async def get_bill_runs(request: Request, response: Response, bill_cycle_id: str = None, bill_run_id: str = None, status: str = None, paging: PageRequest = Depends(), current_user: dict = Depends(get_current_user)):
     """Get all bill runs with optional filtering"""
-    bill_runs = dummy_data.get('bill_runs', [])
-    
     # Apply filters
+    criteria = {}
     if bill_cycle_id:
-        bill_runs = [r for r in bill_runs if r['bill_cycle_id'] == bill_cycle_id]
-    if bill_run_id:
-        bill_runs = [r for r in bill_runs if r['id'] == bill_run_id]
+        criteria['bill_cycle_id'] = bill_cycle_id
     if status:
-        bill_runs = [r for r in bill_runs if r['status'] == status]
+        criteria['status'] = status
+    if bill_run_id:
+        bill_run = await repo.bill_runs.get(bill_run_id)
+        bill_runs = [bill_run] if bill_run and all(bill_run.get(k) == v for k, v in criteria.items()) else []
+    elif wants_ndjson(request):
+        return ndjson_response(iter_batches(repo.bill_runs, paging, **criteria), transform=with_cycle_name)
+    else:
+        bill_runs, headers = await fetch_list(repo.bill_runs, paging, request, **criteria)
+        response.headers.update(headers)
     
     # Add bill cycle name to each run
     enhanced_runs = []
     for run in bill_runs:
-        cycle = next((c for c in dummy_data.get('bill_cycles', []) if c['id'] == run['bill_cycle_id']), None)
-        run_copy = run.copy()
-        run_copy['bill_cycle_name'] = cycle['name'] if cycle else 'Unknown Cycle'
-        enhanced_runs.append(run_copy)
+        enhanced_runs.append(await with_cycle_name(run))
     
     return enhanced_runs
 
+async def with_cycle_name(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a bill run with the name of its bill cycle"""
+    cycle = await repo.bill_cycles.get(run['bill_cycle_id'], fields=('name',))
+    run_copy = run.copy()
+    run_copy['bill_cycle_name'] = cycle['name'] if cycle else 'Unknown Cycle'
+    return run_copy
+
+@api_router.post("/billing/runs/{bill_run_id}/resume")
+async def resume_bill_run(bill_run_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
+    """Continue a failed or partial bill run from its last checkpoint"""
+    run = await repo.bill_runs.get(bill_run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Bill run not found")
+    if run.get('status') not in (BillRunStatus.FAILED, BillRunStatus.PARTIAL) or run.get('aborted_at'):
+        raise HTTPException(status_code=409, detail=f"Bill run is {'aborted' if run.get('aborted_at') else run.get('status')}")
+    claimed = await bill_run_engine.resume(run)
+    if claimed is None:
+        raise HTTPException(status_code=409, detail="Bill run is already being resumed or aborted")
+    log.info('bill_run_resume_requested', bill_run_id=bill_run_id, user_id=current_user['id'])
+    return await with_cycle_name(claimed)
+
+@api_router.post("/billing/runs/{bill_run_id}/abort")
+async def abort_bill_run(bill_run_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
+    """Stop a bill run for good; bills it already generated are kept"""
+    run = await repo.bill_runs.get(bill_run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Bill run not found")
+    if run.get('status') == BillRunStatus.COMPLETED or run.get('aborted_at'):
+        raise HTTPException(status_code=409, detail=f"Bill run is {'aborted' if run.get('aborted_at') else run.get('status')}")
+    run = await bill_run_engine.abort(run)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Bill run not found")
+    log.info('bill_run_abort_requested', bill_run_id=bill_run_id, user_id=current_user['id'])
+    return await with_cycle_name(run)
+
+def progress_response(subscription) -> StreamingResponse:
+    """Event stream of ``subscription``, kept out of proxy buffers and caches"""
+    return StreamingResponse(progress_hub.events(subscription), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_router.get("/billing/runs/{bill_run_id}/events")
+async def stream_bill_run_progress(bill_run_id: str, current_user: dict = Depends(get_current_user)):
+    """Server-Sent Events with the progress of a bill run; ends once the run completes or fails"""
+    if not await repo.bill_runs.get(bill_run_id, fields=('id',)):
+        raise HTTPException(status_code=404, detail="Bill run not found")
+    return progress_response(progress_hub.subscribe(run_id=bill_run_id))
+
+@api_router.get("/billing/cycles/{bill_cycle_id}/events")
+async def stream_bill_cycle_progress(bill_cycle_id: str, current_user: dict = Depends(get_current_user)):
+    """Server-Sent Events with the progress of every bill run of a bill cycle"""
+    if not await repo.bill_cycles.get(bill_cycle_id, fields=('id',)):
+        raise HTTPException(status_code=404, detail="Bill cycle not found")
+    return progress_response(progress_hub.subscribe(cycle_id=bill_cycle_id))
+
 @api_router.get("/billing/accounts")
-async def get_billed_accounts(bill_cycle_id: str = None, bill_run_id: str = None, account_id: str = None, current_user: dict = Depends(get_current_user)):
+async def get_billed_accounts(request: Request, response: Response, bill_cycle_id: str = None, bill_run_id: str = None, account_id: str = None, paging: PageRequest = Depends(), current_user: dict = Depends(get_current_user)):
     """Get all billed accounts with optional filtering"""
-    billed_accounts = dummy_data.get('billed_accounts', [])
-    
     # Apply filters
+    criteria = {}
     if bill_run_id:
-        billed_accounts = [a for a in billed_accounts if a['bill_run_id'] == bill_run_id]
+        criteria['bill_run_id'] = bill_run_id
     if account_id:
-        billed_accounts = [a for a in billed_accounts if a['account_id'] == account_id]
+        criteria['account_id'] = account_id
+    keep = None
     if bill_cycle_id:
         # Filter by bill cycle through bill runs
-        matching_runs = [r['id'] for r in dummy_data.get('bill_runs', []) if r['bill_cycle_id'] == bill_cycle_id]
-        billed_accounts = [a for a in billed_accounts if a['bill_run_id'] in matching_runs]
+        matching_runs = {r['id'] for r in await repo.bill_runs.find(fields=('id',), bill_cycle_id=bill_cycle_id)}
+        keep = lambda a: a['bill_run_id'] in matching_runs
+    if wants_ndjson(request):
+        return ndjson_response(iter_batches(repo.billed_accounts, paging, keep=keep, **criteria))
+    billed_accounts, headers = await fetch_list(repo.billed_accounts, paging, request, keep=keep, **criteria)
+    response.headers.update(headers)
     
     return billed_accounts
 
 @api_router.put("/billing/accounts/{account_bill_id}/approve")
 async def approve_billed_account(account_bill_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))):
     """Approve a billed account"""
-    billed_accounts = dummy_data.get('billed_accounts', [])
+    account = await repo.billed_accounts.update(account_bill_id, {
+        'status': 'approved',
+        'updated_at': datetime.now(timezone.utc)
+    })
+    if not account:
+        raise HTTPException(status_code=404, detail="Billed account not found")
     
-    # Find and update the account bill
-    for i, account in enumerate(billed_accounts):
-        if account['id'] == account_bill_id:
-            dummy_data['billed_accounts'][i]['status'] = 'approved'
-            dummy_data['billed_accounts'][i]['updated_at'] = datetime.now(timezone.utc)
-            
-            # Update bill run counts
-            bill_run_id = account['bill_run_id']
-            bill_runs = dummy_data.get('bill_runs', [])
-            for j, run in enumerate(bill_runs):
-                if run['id'] == bill_run_id:
-                    dummy_data['bill_runs'][j]['bills_approved'] += 1
-                    break
-            
-            return {"message": "Account bill approved successfully"}
+    # Update bill run counts
+    await repo.bill_runs.increment(account['bill_run_id'], 'bills_approved')
     
-    raise HTTPException(status_code=404, detail="Billed account not found")
+    return {"message": "Account bill approved successfully"}
 
 # Subscription Management Models
 class SubscriptionBase(BaseModel):
@@ -2806,10 +1378,83 @@ class DeactivateRequest(BaseModel):
     deactivation_date: datetime
 
 # Subscription Management Routes
+async def subscription_view(service: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Subscription response of an active service; None when its plan or account is gone"""
+    # Get plan details
+    plan = await enrichment.plan(service['plan_id'])
+    # Get account details
+    account = await enrichment.account(service['account_id'])
+    if not (plan and account):
+        return None
+    return dict(
+        id=service['id'],
+        account_id=service['account_id'],
+        account_name=account['name'],
+        service_id=service['id'],
+        service_name=service['service_name'],
+        service_category=service['service_category'],
+        plan_id=service['plan_id'],
+        plan_name=plan['name'],
+        amount=service.get('monthly_charges', plan['charges']),
+        status=service['status'],
+        start_date=service['start_date'],
+        end_date=service.get('end_date'),
+        is_addon=service.get('is_addon', False),
+        parent_service_id=service.get('parent_service_id'),
+        plan_type=plan.get('plan_type', 1)
+    )
+
+async def list_subscriptions(request: Request, criteria: Dict[str, Any], plan_name: Optional[str],
+                             page: int, limit: int, cursor: Optional[str]) -> FastJSONResponse:
+    """One page of subscriptions matching ``criteria``.
+
+    Both forms read keyset pages in (created_at, id) order, capped at
+    PAGE_MAX_LIMIT, and send X-Next-Cursor and Link pointing at the next one.
+    With ``cursor`` (an empty one starts at the top) the page starts after
+    it. Without one it is the offset form: page ``page`` of ``limit``, walked
+    to from the top, so the offset is capped at PAGE_MAX_OFFSET and deeper
+    pages have to follow the cursor. Services without a plan or account are
+    skipped before paging in both.
+    """
+    limit = max(1, min(limit, PAGE_MAX_LIMIT))
+    if cursor is None:
+        skip = (max(page, 1) - 1) * limit
+        if skip > PAGE_MAX_OFFSET:
+            raise HTTPException(status_code=400,
+                                detail=f"Offset is limited to {PAGE_MAX_OFFSET}; follow X-Next-Cursor instead")
+        after = None
+    else:
+        skip = 0
+        after = parse_cursor(cursor) if cursor else None
+    keep = None
+    if plan_name:
+        plan_ids = {p['id'] for p in await repo.plans.list(fields=('name',)) if plan_name.lower() in p['name'].lower()}
+        keep = lambda s: s.get('plan_id') in plan_ids
+    await enrichment.sync()
+    subscriptions = []
+    while len(subscriptions) < limit:
+        # Refilled until the page is full, as skipped services leave it short;
+        # never read past it, so ``after`` stays the key of its last service
+        size = min(skip + limit - len(subscriptions), PAGE_MAX_LIMIT)
+        services, after = await paginate(repo.services, size, after, keep=keep, **criteria)
+        for service in services:
+            subscription = await subscription_view(service)
+            if not subscription:
+                continue
+            if skip:
+                skip -= 1
+            else:
+                subscriptions.append(subscription)
+        if after is None:
+            break
+    return trusted_list(SubscriptionResponse, subscriptions, headers=page_headers(request, after))
+
 @api_router.get("/subscriptions/self", response_model=List[SubscriptionResponse])
 async def get_self_subscriptions(
+    request: Request,
     page: int = 1, 
     limit: int = 10,
+    cursor: Optional[str] = None,
     account_id: str = None,
     plan_name: str = None,
     current_user: dict = Depends(get_current_user)
@@ -2817,62 +1462,22 @@ async def get_self_subscriptions(
     """Get self subscriptions - active services managed by current user"""
     # Filter services for current user (self_service category)
     # Super admin can see all self_service category services
-    if current_user["role"] == "super_admin":
-        services = [s for s in dummy_data['services'] 
-                   if s.get('service_category') == 'self_service' and
-                      s.get('is_active', True)]
-    else:
-        services = [s for s in dummy_data['services'] 
-                   if s.get('service_category') == 'self_service' and 
-                      s.get('managed_by') == current_user['id'] and
-                      s.get('is_active', True)]
+    criteria = {'service_category': 'self_service', 'is_active': True}
+    if current_user["role"] != "super_admin":
+        criteria['managed_by'] = current_user['id']
     
     # Apply filters
     if account_id:
-        services = [s for s in services if s.get('account_id') == account_id]
-    if plan_name:
-        plan_ids = [p['id'] for p in dummy_data['plans'] if plan_name.lower() in p['name'].lower()]
-        services = [s for s in services if s.get('plan_id') in plan_ids]
-    
-    # Build subscription responses
-    subscriptions = []
-    for service in services:
-        # Get plan details
-        plan = next((p for p in dummy_data['plans'] if p['id'] == service['plan_id']), None)
-        # Get account details
-        account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
-        
-        if plan and account:
-            subscription = SubscriptionResponse(
-                id=service['id'],
-                account_id=service['account_id'],
-                account_name=account['name'],
-                service_id=service['id'],
-                service_name=service['service_name'],
-                service_category=service['service_category'],
-                plan_id=service['plan_id'],
-                plan_name=plan['name'],
-                amount=service.get('monthly_charges', plan['charges']),
-                status=service['status'],
-                start_date=service['start_date'],
-                end_date=service.get('end_date'),
-                is_addon=service.get('is_addon', False),
-                parent_service_id=service.get('parent_service_id'),
-                plan_type=plan.get('plan_type', 1)
-            )
-            subscriptions.append(subscription)
-    
-    # Apply pagination
-    start_idx = (page - 1) * limit
-    end_idx = start_idx + limit
-    paginated_subscriptions = subscriptions[start_idx:end_idx]
+        criteria['account_id'] = account_id
     
-    return paginated_subscriptions
+    return await list_subscriptions(request, criteria, plan_name, page, limit, cursor)
 
 @api_router.get("/subscriptions/users", response_model=List[SubscriptionResponse])
 async def get_user_subscriptions(
+    request: Request,
     page: int = 1,
     limit: int = 10,
+    cursor: Optional[str] = None,
     account_id: str = None,
     plan_name: str = None,
     current_user: dict = Depends(get_current_user)
@@ -2880,57 +1485,15 @@ async def get_user_subscriptions(
     """Get user subscriptions - active services for end users"""
     # Filter services for end users (user_service category)
     # Super admin can see all user_service category services
-    if current_user["role"] == "super_admin":
-        services = [s for s in dummy_data['services'] 
-                   if s.get('service_category') == 'user_service' and
-                      s.get('is_active', True)]
-    else:
-        services = [s for s in dummy_data['services'] 
-                   if s.get('service_category') == 'user_service' and
-                      s.get('managed_by') == current_user['id'] and
-                      s.get('is_active', True)]
+    criteria = {'service_category': 'user_service', 'is_active': True}
+    if current_user["role"] != "super_admin":
+        criteria['managed_by'] = current_user['id']
     
     # Apply filters
     if account_id:
-        services = [s for s in services if s.get('account_id') == account_id]
-    if plan_name:
-        plan_ids = [p['id'] for p in dummy_data['plans'] if plan_name.lower() in p['name'].lower()]
-        services = [s for s in services if s.get('plan_id') in plan_ids]
-    
-    # Build subscription responses
-    subscriptions = []
-    for service in services:
-        # Get plan details
-        plan = next((p for p in dummy_data['plans'] if p['id'] == service['plan_id']), None)
-        # Get account details
-        account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
-        
-        if plan and account:
-            subscription = SubscriptionResponse(
-                id=service['id'],
-                account_id=service['account_id'],
-                account_name=account['name'],
-                service_id=service['id'],
-                service_name=service['service_name'],
-                service_category=service['service_category'],
-                plan_id=service['plan_id'],
-                plan_name=plan['name'],
-                amount=service.get('monthly_charges', plan['charges']),
-                status=service['status'],
-                start_date=service['start_date'],
-                end_date=service.get('end_date'),
-                is_addon=service.get('is_addon', False),
-                parent_service_id=service.get('parent_service_id'),
-                plan_type=plan.get('plan_type', 1)
-            )
-            subscriptions.append(subscription)
-    
-    # Apply pagination
-    start_idx = (page - 1) * limit
-    end_idx = start_idx + limit
-    paginated_subscriptions = subscriptions[start_idx:end_idx]
+        criteria['account_id'] = account_id
     
-    return paginated_subscriptions
+    return await list_subscriptions(request, criteria, plan_name, page, limit, cursor)
 
 @api_router.get("/subscriptions/{subscription_id}/details")
 async def get_subscription_details(subscription_id: str, current_user: dict = Depends(get_current_user)):
@@ -2939,12 +1502,12 @@ async def get_subscription_details(subscription_id: str, current_user: dict = De
     service = None
     
     # First try to find by service id
-    service = next((s for s in dummy_data['services'] if s['id'] == subscription_id), None)
+    service = await repo.services.get(subscription_id)
     
     # If not found, try to find by matching in the subscription data structure
     if not service:
         # Look through services to find matching subscription
-        for s in dummy_data['services']:
+        for s in await repo.services.list():
             if s.get('id') == subscription_id or str(s.get('id', '')).endswith(subscription_id):
                 service = s
                 break
@@ -2958,8 +1521,8 @@ async def get_subscription_details(subscription_id: str, current_user: dict = De
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get plan and account details
-    plan = next((p for p in dummy_data['plans'] if p['id'] == service['plan_id']), None)
-    account = next((a for a in dummy_data['accounts'] if a['id'] == service['account_id']), None)
+    plan = await repo.plans.get(service['plan_id'])
+    account = await repo.accounts.get(service['account_id'])
     
     if not plan:
         raise HTTPException(status_code=404, detail="Associated plan not found")
@@ -2994,22 +1557,24 @@ async def deactivate_subscription(
     current_user: dict = Depends(get_current_user)
 ):
     """Deactivate a subscription"""
-    # Find the service in dummy data
-    for i, service in enumerate(dummy_data['services']):
-        if service['id'] == subscription_id:
-            # Check permissions
-            if service.get('managed_by') != current_user['id']:
-                raise HTTPException(status_code=403, detail="Access denied")
-            
-            # Update service status and end date
-            dummy_data['services'][i]['status'] = 'inactive'
-            dummy_data['services'][i]['is_active'] = False
-            dummy_data['services'][i]['end_date'] = deactivate_data.deactivation_date
-            dummy_data['services'][i]['updated_at'] = datetime.now(timezone.utc)
-            
-            return {"message": "Subscription deactivated successfully", "service_id": subscription_id}
+    service = await repo.services.get(subscription_id)
+    if not service:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    
+    # Check permissions
+    if service.get('managed_by') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Update service status and end date
+    await repo.services.update(subscription_id, {
+        'status': 'inactive',
+        'is_active': False,
+        'end_date': deactivate_data.deactivation_date,
+        'updated_at': datetime.now(timezone.utc)
+    })
+    await bill_run_engine.record_changes(account_ids=[service['account_id']])
     
-    raise HTTPException(status_code=404, detail="Subscription not found")
+    return {"message": "Subscription deactivated successfully", "service_id": subscription_id}
 
 @api_router.post("/subscriptions/change-plan")
 async def change_subscription_plan(
@@ -3018,30 +1583,26 @@ async def change_subscription_plan(
 ):
     """Change subscription plan - deactivate current and activate new"""
     # Find current service
-    current_service = None
-    current_service_idx = None
-    for i, service in enumerate(dummy_data['services']):
-        if service['id'] == plan_change.current_service_id:
-            # Check permissions
-            if service.get('managed_by') != current_user['id']:
-                raise HTTPException(status_code=403, detail="Access denied")
-            current_service = service
-            current_service_idx = i
-            break
-    
+    current_service = await repo.services.get(plan_change.current_service_id)
     if not current_service:
         raise HTTPException(status_code=404, detail="Current subscription not found")
     
+    # Check permissions
+    if current_service.get('managed_by') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
     # Get new plan details
-    new_plan = next((p for p in dummy_data['plans'] if p['id'] == plan_change.new_plan_id), None)
+    new_plan = await repo.plans.get(plan_change.new_plan_id)
     if not new_plan:
         raise HTTPException(status_code=404, detail="New plan not found")
     
     # Deactivate current service
-    dummy_data['services'][current_service_idx]['status'] = 'inactive'
-    dummy_data['services'][current_service_idx]['is_active'] = False
-    dummy_data['services'][current_service_idx]['end_date'] = plan_change.activation_date
-    dummy_data['services'][current_service_idx]['updated_at'] = datetime.now(timezone.utc)
+    await repo.services.update(current_service['id'], {
+        'status': 'inactive',
+        'is_active': False,
+        'end_date': plan_change.activation_date,
+        'updated_at': datetime.now(timezone.utc)
+    })
     
     # Create new service with new plan
     new_service = {
@@ -3071,8 +1632,8 @@ async def change_subscription_plan(
         'updated_at': datetime.now(timezone.utc)
     }
     
-    # Add new service to dummy data
-    dummy_data['services'].append(new_service)
+    await repo.services.insert(new_service)
+    await bill_run_engine.record_changes(account_ids=[current_service['account_id']])
     
     return {
         "message": "Plan changed successfully",
@@ -3088,7 +1649,7 @@ async def get_available_plans_for_change(
 ):
     """Get available plans for plan change (excluding current plan)"""
     # Filter out current plan and get available plans
-    available_plans = [p for p in dummy_data['plans'] 
+    available_plans = [p for p in await repo.plans.list() 
                       if p['id'] != current_plan_id and 
                          p.get('status') == 'active']
     
@@ -3106,7 +1667,7 @@ async def get_available_addon_plans(
 ):
     """Get available addon plans for a specific service type"""
     # Filter addon plans (plan_type = 2) for the specific service type
-    addon_plans = [p for p in dummy_data['plans'] 
+    addon_plans = [p for p in await repo.plans.list() 
                    if p.get('plan_type') == 2 and 
                       p.get('service_type') == service_type and
                       p.get('status') == 'active']
@@ -3136,13 +1697,13 @@ async def activate_addon_plan(
             raise HTTPException(status_code=400, detail="Missing required fields: base_service_id and addon_plan_id")
         
         # Find the base service
-        base_service = next((s for s in dummy_data['services'] if s['id'] == base_service_id), None)
+        base_service = await repo.services.get(base_service_id)
         if not base_service:
             raise HTTPException(status_code=404, detail="Base service not found")
         
         # Find the addon plan
-        addon_plan = next((p for p in dummy_data['plans'] if p['id'] == addon_plan_id and p.get('plan_type') == 2), None)
-        if not addon_plan:
+        addon_plan = await repo.plans.get(addon_plan_id)
+        if not addon_plan or addon_plan.get('plan_type') != 2:
             raise HTTPException(status_code=404, detail="Addon plan not found")
         
         # Check if user has permission to activate addon for this service
@@ -3151,7 +1712,7 @@ async def activate_addon_plan(
                 raise HTTPException(status_code=403, detail="Insufficient permissions to activate addon for this service")
         
         # Create new addon service
-        addon_service_id = f"addon_{len(dummy_data['services']) + 1:03d}"
+        addon_service_id = f"addon_{await repo.services.count() + 1:03d}"
         addon_service = {
             'id': addon_service_id,
             'account_id': base_service['account_id'],
@@ -3181,8 +1742,8 @@ async def activate_addon_plan(
             'updated_at': datetime.now(timezone.utc)
         }
         
-        # Add to dummy data
-        dummy_data['services'].append(addon_service)
+        await repo.services.insert(addon_service)
+        await bill_run_engine.record_changes(account_ids=[addon_service['account_id']])
         
         return {
             "success": True,
@@ -3192,7 +1753,7 @@ async def activate_addon_plan(
         }
         
     except Exception as e:
-        print(f"Error activating addon plan: {e}")
+        log.error('addon_activation_failed', error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/subscriptions/deactivate-addon")
@@ -3209,8 +1770,8 @@ async def deactivate_addon_plan(
             raise HTTPException(status_code=400, detail="Missing required field: addon_service_id")
         
         # Find the addon service
-        addon_service = next((s for s in dummy_data['services'] if s['id'] == addon_service_id and s.get('is_addon', False)), None)
-        if not addon_service:
+        addon_service = await repo.services.get(addon_service_id)
+        if not addon_service or not addon_service.get('is_addon', False):
             raise HTTPException(status_code=404, detail="Addon service not found")
         
         # Check permissions
@@ -3219,10 +1780,13 @@ async def deactivate_addon_plan(
                 raise HTTPException(status_code=403, detail="Insufficient permissions to deactivate this addon")
         
         # Deactivate the addon service
-        addon_service['is_active'] = False
-        addon_service['status'] = 'inactive'
-        addon_service['end_date'] = datetime.fromisoformat(deactivation_date.replace('Z', '+00:00'))
-        addon_service['updated_at'] = datetime.now(timezone.utc)
+        await repo.services.update(addon_service_id, {
+            'is_active': False,
+            'status': 'inactive',
+            'end_date': datetime.fromisoformat(deactivation_date.replace('Z', '+00:00')),
+            'updated_at': datetime.now(timezone.utc)
+        })
+        await bill_run_engine.record_changes(account_ids=[addon_service['account_id']])
         
         return {
             "success": True,
@@ -3230,34 +1794,35 @@ async def deactivate_addon_plan(
         }
         
     except Exception as e:
-        print(f"Error deactivating addon plan: {e}")
+        log.error('addon_deactivation_failed', error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Enhanced Dashboard Stats
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_enhanced_dashboard_stats(current_user: dict = Depends(get_current_user)):
     """Get enhanced dashboard statistics"""
+    active_services = await repo.services.count(is_active=True)
     if current_user["role"] == "user":
         return DashboardStats(
-            active_services=len([s for s in dummy_data['services'] if s.get('is_active', True)]),
+            active_services=active_services,
             pending_invoices=2,
             current_month_bill=245.50
         )
     elif current_user["role"] == "admin":
         return DashboardStats(
-            total_accounts=len(dummy_data['accounts']),
-            active_services=len([s for s in dummy_data['services'] if s.get('is_active', True)]),
+            total_accounts=await repo.accounts.count(),
+            active_services=active_services,
             monthly_revenue=34250.00,
             pending_invoices=28,
             overdue_payments=8
         )
     else:  # super_admin
         return DashboardStats(
-            total_users=len(dummy_data['users']),
-            total_profiles=len(dummy_data['profiles']),
-            total_accounts=len(dummy_data['accounts']),
-            total_plans=len(dummy_data['plans']),
-            active_services=len([s for s in dummy_data['services'] if s.get('is_active', True)]),
+            total_users=await repo.users.count(),
+            total_profiles=await repo.profiles.count(),
+            total_accounts=await repo.accounts.count(),
+            total_plans=await repo.plans.count(),
+            active_services=active_services,
             total_revenue=142500.00,
             monthly_revenue=45800.00,
             pending_invoices=45,
@@ -3364,49 +1929,133 @@ async def get_monthly_revenue_report(current_user: dict = Depends(require_role([
 @api_router.get("/system/config", response_model=SystemConfig)
 async def get_system_config(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
     """Get system configuration"""
-    return SystemConfig(**dummy_data['system_config'])
+    return SystemConfig(**await repo.get_config())
 
 @api_router.put("/system/config", response_model=SystemConfig)
 async def update_system_config(config: SystemConfig, current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
     """Update system configuration"""
-    dummy_data['system_config'].update(config.dict())
-    return SystemConfig(**dummy_data['system_config'])
+    return SystemConfig(**await repo.update_config(config.dict()))
+
+@api_router.get("/system/auth-cache")
+async def get_auth_cache_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Token cache size and hit/miss counters"""
+    return token_cache.stats()
+
+@api_router.get("/system/enrichment-cache")
+async def get_enrichment_cache_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Plan and account view cache sizes, hit/miss and invalidation counters"""
+    return enrichment.stats()
+
+@api_router.get("/system/bill-run-engine")
+async def get_bill_run_engine_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Bill runs executed by this worker and the throughput of the last one"""
+    return bill_run_engine.stats()
+
+@api_router.get("/system/progress-hub")
+async def get_progress_hub_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Open bill-run progress streams, ticks and the reads they cost"""
+    return progress_hub.stats()
+
+@api_router.get("/system/password-pool")
+async def get_password_pool_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """bcrypt pool occupancy, rejections and queue time"""
+    return password_pool.stats()
+
+@api_router.get("/system/logging")
+async def get_logging_settings(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Log level, per-route sample rates and queue counters"""
+    return log_pipeline.stats()
+
+@api_router.put("/system/logging")
+async def update_logging_settings(settings: LoggingSettings, current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Change the log level and/or replace the per-route sample rates of this worker"""
+    if settings.level is not None and settings.level.upper() not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+        raise HTTPException(status_code=400, detail="Unknown log level")
+    if settings.sample_rates is not None and any(not 0 <= rate <= 1 for rate in settings.sample_rates.values()):
+        raise HTTPException(status_code=400, detail="Sample rates must be between 0 and 1")
+    log_pipeline.configure(level=settings.level, sample_rates=settings.sample_rates)
+    return log_pipeline.stats()
+
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))
+
+@api_router.post("/system/profile")
+async def profile_worker(profile_request: ProfileRequest, current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Sample this worker's stacks and return them collapsed (flamegraph.pl / speedscope input)"""
+    if not 0 < profile_request.seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    if not 1 <= profile_request.interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if profile_request.requests is not None and profile_request.requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be at least 1")
+    method = profile_request.method.upper() if profile_request.method else None
+    match = None
+    if profile_request.route:
+        routes = [route for route in app.routes if isinstance(route, APIRoute)
+                  and route.path == profile_request.route and (method is None or method in route.methods)]
+        if not routes:
+            raise HTTPException(status_code=404, detail="Unknown route")
+        match = [route.endpoint.__code__ for route in routes]
+
+    def completed():
+        return sum(sum(series.statuses.values()) for (series_method, path), series in metrics.registry.series.items()
+                   if (profile_request.route is None or path == profile_request.route)
+                   and (method is None or series_method == method))
+
+    profiler = SamplingProfiler(threading.get_ident(), profile_request.interval_ms / 1000, match)
+    try:
+        profiler.start()
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    baseline = completed()
+    deadline = time.monotonic() + profile_request.seconds
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+            if profile_request.requests and completed() - baseline >= profile_request.requests:
+                break
+    finally:
+        await asyncio.to_thread(profiler.stop)
+    log.info('profile_taken', route=profile_request.route, samples=profiler.samples, kept=profiler.kept,
+             seconds=round(profiler.duration, 3))
+    return PlainTextResponse(profiler.collapsed(), headers={
+        'Content-Disposition': f'attachment; filename="profile-{os.getpid()}-{int(time.time())}.collapsed"',
+        'X-Profile-Samples': str(profiler.samples),
+        'X-Profile-Kept': str(profiler.kept),
+        'X-Profile-Requests': str(completed() - baseline),
+        'X-Profile-Seconds': f"{profiler.duration:.3f}",
+    })
+
+@api_router.get("/system/email-filter")
+async def get_email_filter_stats(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
+    """Email Bloom filter size and how often it spared a user lookup"""
+    return email_filter.stats()
 
 # User management routes
 @api_router.get("/users", response_model=List[UserResponse])
 async def get_users(current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN]))):
-    users = dummy_data['users'].copy()
-    result = []
-    for user in users:
-        user_data = user.copy()
-        del user_data["password"]
-        result.append(UserResponse(**user_data))
-    return result
+    # The projection keeps only UserResponse fields, so no password or lookup keys
+    return trusted_list(UserResponse, await repo.users.list())
 
 @api_router.get("/users/me", response_model=UserResponse)
 async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
-    user_data = current_user.copy()
-    if "password" in user_data:
-        del user_data["password"]
+    user_data = public_user(current_user)
     return UserResponse(**user_data)
 
 @api_router.get("/users/me/profile-info")
 async def get_current_user_profile_info(current_user: dict = Depends(get_current_user)):
     """Get current user's profile information and related data"""
-    user_data = current_user.copy()
-    if "password" in user_data:
-        del user_data["password"]
+    user_data = public_user(current_user)
     
     # Get user's profile
     user_profile = None
     if user_data.get('profile_id'):
-        user_profile = next((p for p in dummy_data['profiles'] if p['id'] == user_data['profile_id']), None)
+        user_profile = await repo.profiles.get(user_data['profile_id'])
     
     # Get master profile if exists
     master_profile = None
     has_master_profile = False
     if user_profile and user_profile.get('master_profile_id'):
-        master_profile = next((p for p in dummy_data['profiles'] if p['id'] == user_profile['master_profile_id']), None)
+        master_profile = await repo.profiles.get(user_profile['master_profile_id'])
         has_master_profile = True
     elif user_profile and user_profile.get('is_master_profile'):
         master_profile = user_profile
@@ -3415,7 +2064,7 @@ async def get_current_user_profile_info(current_user: dict = Depends(get_current
     # For testing purposes, always provide a master profile if none exists
     if not has_master_profile:
         # Find any master profile or create dummy one for testing
-        test_master = next((p for p in dummy_data['profiles'] if p.get('is_master_profile')), None)
+        test_master = next(iter(await repo.profiles.find(is_master_profile=True)), None)
         if test_master:
             master_profile = test_master
             has_master_profile = True
@@ -3430,43 +2079,37 @@ async def get_current_user_profile_info(current_user: dict = Depends(get_current
     if not test_mode_end_user and user_profile:
         if user_profile.get('is_master_profile'):
             # Master profile - get all users under profiles that have this as master
-            child_profiles = [p for p in dummy_data['profiles'] if p.get('master_profile_id') == user_profile['id']]
+            child_profiles = await repo.profiles.find(master_profile_id=user_profile['id'])
             for profile in child_profiles:
-                profile_users = [u for u in dummy_data['users'] if u.get('profile_id') == profile['id'] and u['id'] != current_user['id']]
+                profile_users = [u for u in await repo.users.find(profile_id=profile['id']) if u['id'] != current_user['id']]
                 for child_user in profile_users:
-                    child_user_data = child_user.copy()
-                    if "password" in child_user_data:
-                        del child_user_data["password"]
+                    child_user_data = public_user(child_user)
                     child_user_data['profile_name'] = profile['name']
                     child_users.append(child_user_data)
         else:
             # Regular profile - get users with same profile or under same master
             if user_profile.get('master_profile_id') or master_profile:
                 # Get all profiles under the same master (or all profiles for testing)
+                master_id = master_profile['id'] if master_profile else user_profile.get('master_profile_id')
+                master_profiles = await repo.profiles.find(master_profile_id=master_id)
                 if master_profile:
-                    master_profiles = [p for p in dummy_data['profiles'] if p.get('master_profile_id') == master_profile['id'] or p['id'] == master_profile['id']]
-                else:
-                    master_profiles = [p for p in dummy_data['profiles'] if p.get('master_profile_id') == user_profile.get('master_profile_id') or p['id'] == user_profile.get('master_profile_id')]
+                    master_profiles.insert(0, master_profile)
                 
                 for profile in master_profiles:
-                    profile_users = [u for u in dummy_data['users'] if u.get('profile_id') == profile['id'] and u['id'] != current_user['id']]
+                    profile_users = [u for u in await repo.users.find(profile_id=profile['id']) if u['id'] != current_user['id']]
                     for child_user in profile_users:
-                        child_user_data = child_user.copy()
-                        if "password" in child_user_data:
-                            del child_user_data["password"]
+                        child_user_data = public_user(child_user)
                         child_user_data['profile_name'] = profile['name']
                         child_users.append(child_user_data)
     
     # For testing, ensure we always have some child users to show user profile functionality
     if not child_users:
         # Add some dummy child users for testing
-        all_users = [u for u in dummy_data['users'] if u['id'] != current_user['id']][:5]  # Take first 5 other users
-        for test_user in all_users:
-            test_user_data = test_user.copy()
-            if "password" in test_user_data:
-                del test_user_data["password"]
+        other_users = [u for u in await repo.users.list() if u['id'] != current_user['id']][:5]  # Take first 5 other users
+        for test_user in other_users:
+            test_user_data = public_user(test_user)
             # Find their profile name
-            test_user_profile = next((p for p in dummy_data['profiles'] if p['id'] == test_user.get('profile_id')), None)
+            test_user_profile = await repo.profiles.get(test_user.get('profile_id'), fields=('name',))
             test_user_data['profile_name'] = test_user_profile['name'] if test_user_profile else 'Unknown Profile'
             child_users.append(test_user_data)
     
@@ -3484,19 +2127,17 @@ async def get_current_user_profile_info(current_user: dict = Depends(get_current
 async def get_user_profile_details(user_id: str, current_user: dict = Depends(get_current_user)):
     """Get detailed profile information for a specific user"""
     # Find the target user
-    target_user = next((u for u in dummy_data['users'] if u['id'] == user_id), None)
+    target_user = await repo.users.get(user_id)
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's profile
     user_profile = None
     if target_user.get('profile_id'):
-        user_profile = next((p for p in dummy_data['profiles'] if p['id'] == target_user['profile_id']), None)
+        user_profile = await repo.profiles.get(target_user['profile_id'])
     
-    # Remove password from user data
-    target_user_data = target_user.copy()
-    if "password" in target_user_data:
-        del target_user_data["password"]
+    # Remove password and lookup keys from user data
+    target_user_data = public_user(target_user)
     
     return {
         "user": target_user_data,
@@ -3506,12 +2147,15 @@ async def get_user_profile_details(user_id: str, current_user: dict = Depends(ge
 # Payments API Endpoints
 @api_router.get("/payments")
 async def get_payments(
+    request: Request,
+    response: Response,
     account_id: Optional[str] = None,
     page: int = 1,
     limit: int = 10,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get payment history with pagination"""
+    """Get payment history with pagination (page/limit, or a cursor; an empty cursor starts at the top)"""
     # Enhanced dummy payment data with invoice details
     dummy_payments = [
         {
@@ -3747,9 +2391,20 @@ async def get_payments(
     
     # Pagination
     total_count = len(dummy_payments)
-    start_idx = (page - 1) * limit
+    if cursor is None:
+        start_idx = (page - 1) * limit
+    else:
+        # The demo list is not stored, so the cursor holds the id of the last payment sent
+        limit = max(1, min(limit, PAGE_MAX_LIMIT))
+        after = parse_cursor(cursor) if cursor else None
+        payment_ids = [p['id'] for p in dummy_payments]
+        if after is not None and after[1] not in payment_ids:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        start_idx = payment_ids.index(after[1]) + 1 if after is not None else 0
     end_idx = start_idx + limit
     paginated_payments = dummy_payments[start_idx:end_idx]
+    if paginated_payments and end_idx < total_count:
+        response.headers.update(page_headers(request, (None, paginated_payments[-1]['id'])))
     
     return {
         'payments': paginated_payments,
@@ -3762,21 +2417,23 @@ async def get_payments(
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Per-route request metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+app.add_middleware(ReadinessGate)
+app.add_middleware(RequestContext)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Link"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
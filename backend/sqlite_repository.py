@@ -0,0 +1,419 @@
+"""Embedded SQLite (WAL mode) implementation of the repository interface.
+
+Every uvicorn worker on a host opens the same database file, so accounts,
+services and bill runs stay consistent across processes. WAL mode lets any
+number of readers run alongside the single writer.
+
+Each collection is a table of JSON documents (``seq``, ``id``, ``doc``); the
+fields listed in ``repository.INDEXES`` get expression indexes on
+``json_extract(doc, '$.field')`` and the generated queries use the same
+expressions so SQLite can pick them up. Each index ends with the page order
+``(coalesce(created_at, ''), id)``, and one more holds only that order, so
+``page`` seeks straight to its first row with or without criteria. Write counters per collection live in
+the ``versions`` table and are bumped in the same transaction as the write.
+SQL strings are built once per
+query shape and reused, so the per-connection statement cache keeps them
+prepared. All I/O runs on a small thread pool with one connection per thread,
+off the event loop.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from repository import COLLECTIONS, DERIVED_FIELDS, FIELD_DEFAULTS, INDEXES, PageKey, WriteListener, derive, notify
+
+DEFAULT_PATH = Path(__file__).parent / 'app.db'
+CONFIG_KEY = 'system_config'
+EPOCH_KEY = 'epoch'
+_FIELD_NAME = re.compile(r'^\w+$')
+# PAGE_ORDER as an indexable expression; missing created_at sorts first, as ''
+_PAGE_CREATED = "coalesce(json_extract(doc, '$.created_at'), '')"
+_PAGE_ORDER = f"{_PAGE_CREATED}, id"
+# (created, id) > (?, ?) spelled so the planner seeks the index instead of scanning it
+_PAGE_AFTER = f"{_PAGE_CREATED} >= ? AND ({_PAGE_CREATED} > ? OR id > ?)"
+# Ids per DELETE statement, well under SQLite's limit on bound parameters
+_DELETE_CHUNK = 500
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_datetimes(obj):
+    for key, value in obj.items():
+        if isinstance(value, str) and key.endswith(('_at', '_date')):
+            try:
+                obj[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                pass
+    return obj
+
+
+def dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, default=_encode, separators=(',', ':'))
+
+
+def loads(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_decode_datetimes)
+
+
+def _field_expr(field: str) -> str:
+    if not _FIELD_NAME.match(field):
+        raise ValueError(f"Invalid field name: {field!r}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _sql_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class SQLiteDatabase:
+    """Thread pool with one WAL-mode connection per worker thread"""
+
+    def __init__(self, path: str, pool_size: int = 4, busy_timeout_ms: int = 5000):
+        self.path = path
+        self._busy_timeout = busy_timeout_ms / 1000
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='sqlite')
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self._busy_timeout,
+                isolation_level=None,  # explicit BEGIN/COMMIT only
+                check_same_thread=False,
+                cached_statements=256,
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute(f"PRAGMA cache_size=-{int(os.environ.get('SQLITE_CACHE_SIZE_KB', '20000'))}")
+            conn.execute(f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    async def run(self, fn, *args):
+        """Run ``fn(conn, *args)`` on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    def _call(self, fn, args):
+        return fn(self.connection(), *args)
+
+    def transaction(self, conn: sqlite3.Connection, fn, *args):
+        """Run ``fn(conn, *args)`` inside BEGIN IMMEDIATE ... COMMIT"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class SQLiteCollection:
+    """Async collection API over one table of JSON documents"""
+
+    def __init__(self, name: str, db: SQLiteDatabase, indexes: Sequence[Sequence[str]] = (),
+                 defaults: Optional[Dict[str, Any]] = None, listeners: Optional[List[WriteListener]] = None,
+                 derived: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self._db = db
+        self._indexes = indexes
+        self._defaults = defaults or {}
+        self._derived = derived or {}
+        self.listeners = listeners if listeners is not None else []
+        self._select_sql: Dict[tuple, str] = {}
+        self._count_sql: Dict[tuple, str] = {}
+        self._page_sql: Dict[tuple, str] = {}
+
+    def create(self, conn: sqlite3.Connection):
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.name} ("
+            "seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, doc TEXT NOT NULL)"
+        )
+        for fields in self._indexes:
+            columns = ', '.join(_field_expr(field) for field in fields)
+            name = f"{self.name}__{'__'.join(fields)}"
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}__page ON {self.name} ({columns}, {_PAGE_ORDER})")
+            # Replaced by the page-ordered index above
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.name}__page ON {self.name} ({_PAGE_ORDER})")
+        conn.execute("INSERT OR IGNORE INTO versions (name, version) VALUES (?, 0)", (self.name,))
+        self._backfill(conn)
+
+    def _bump(self, conn: sqlite3.Connection, writes: int = 1):
+        conn.execute("UPDATE versions SET version = version + ? WHERE name = ?", (writes, self.name))
+
+    def _backfill(self, conn: sqlite3.Connection):
+        """Fill derived fields missing from rows written before they were introduced"""
+        for field in self._derived:
+            stale = conn.execute(
+                f"SELECT id, doc FROM {self.name} WHERE {_field_expr(field)} IS NULL"
+            ).fetchall()
+            conn.executemany(
+                f"UPDATE {self.name} SET doc = ? WHERE id = ?",
+                [(dumps(derive(self._derived, loads(doc))), row_id) for row_id, doc in stale],
+            )
+
+    def _where(self, criteria: Dict[str, Any]):
+        """Return (shape, WHERE clause, params) for equality ``criteria``"""
+        shape = tuple(sorted((field, criteria[field] is None) for field in criteria))
+        clauses, params = [], []
+        for field, is_null in shape:
+            if is_null:
+                clauses.append(f"{_field_expr(field)} IS NULL")
+            else:
+                clauses.append(f"{_field_expr(field)} = ?")
+                params.append(_sql_value(criteria[field]))
+        return shape, (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _stored(self, row: Dict[str, Any]) -> str:
+        derive(self._derived, row)
+        if self._defaults:
+            row = {**self._defaults, **row}
+        return dumps(row)
+
+    async def get(self, entity_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        row = await self._db.run(self._get, entity_id)
+        return loads(row[0]) if row else None
+
+    def _get(self, conn, entity_id):
+        return conn.execute(f"SELECT doc FROM {self.name} WHERE id = ?", (entity_id,)).fetchone()
+
+    async def list(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        return await self.find()
+
+    async def find(self, fields: Optional[Sequence[str]] = None, **criteria) -> List[Dict[str, Any]]:
+        shape, where, params = self._where(criteria)
+        sql = self._select_sql.get(shape)
+        if sql is None:
+            sql = self._select_sql[shape] = f"SELECT doc FROM {self.name}{where} ORDER BY seq"
+        rows = await self._db.run(lambda conn: conn.execute(sql, params).fetchall())
+        return [loads(row[0]) for row in rows]
+
+    async def page(self, limit: int, after: Optional[PageKey] = None, fields: Optional[Sequence[str]] = None,
+                   **criteria) -> List[Dict[str, Any]]:
+        """Up to ``limit`` rows matching ``criteria`` in ``PAGE_ORDER``, starting after the key ``after``"""
+        shape, where, params = self._where(criteria)
+        key = (shape, after is not None)
+        sql = self._page_sql.get(key)
+        if sql is None:
+            if after is not None:
+                where = f"{where} AND {_PAGE_AFTER}" if where else f" WHERE {_PAGE_AFTER}"
+            sql = self._page_sql[key] = f"SELECT doc FROM {self.name}{where} ORDER BY {_PAGE_ORDER} LIMIT ?"
+        if after is not None:
+            created = _sql_value(after[0]) or ''
+            params = params + [created, created, after[1]]
+        rows = await self._db.run(lambda conn: conn.execute(sql, params + [limit]).fetchall())
+        return [loads(row[0]) for row in rows]
+
+    async def count(self, **criteria) -> int:
+        shape, where, params = self._where(criteria)
+        sql = self._count_sql.get(shape)
+        if sql is None:
+            sql = self._count_sql[shape] = f"SELECT count(*) FROM {self.name}{where}"
+        return await self._db.run(lambda conn: conn.execute(sql, params).fetchone()[0])
+
+    async def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        await self._db.run(lambda conn: self._db.transaction(conn, self._insert_many, [row]))
+        notify(self.listeners, 'insert', self.name, row['id'], row)
+        return row
+
+    async def insert_many(self, rows: List[Dict[str, Any]]):
+        if rows:
+            await self._db.run(lambda conn: self._db.transaction(conn, self._insert_many, rows))
+            for row in rows:
+                notify(self.listeners, 'insert', self.name, row['id'], row)
+
+    def _insert_many(self, conn, rows):
+        try:
+            conn.executemany(
+                f"INSERT INTO {self.name} (id, doc) VALUES (?, ?)",
+                [(row['id'], self._stored(row)) for row in rows],
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Duplicate id in {self.name}")
+        self._bump(conn, len(rows))
+
+    async def delete_many(self, ids: Iterable[str]) -> int:
+        """Remove the rows with these ids; returns how many there were"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return 0
+        deleted = await self._db.run(lambda conn: self._db.transaction(conn, self._delete_many, ids))
+        for entity_id in deleted:
+            notify(self.listeners, 'delete', self.name, entity_id, {})
+        return len(deleted)
+
+    def _delete_many(self, conn, ids):
+        deleted = []
+        for start in range(0, len(ids), _DELETE_CHUNK):
+            chunk = ids[start:start + _DELETE_CHUNK]
+            sql = f"DELETE FROM {self.name} WHERE id IN ({', '.join('?' * len(chunk))}) RETURNING id"
+            deleted.extend(row[0] for row in conn.execute(sql, chunk).fetchall())
+        if deleted:
+            self._bump(conn, len(deleted))
+        return deleted
+
+    async def update(self, entity_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply ``changes`` and return the updated row, or None if the id is unknown"""
+        if 'id' in changes and changes['id'] != entity_id:
+            raise ValueError("Primary key cannot be changed")
+        doc = await self._db.run(lambda conn: self._db.transaction(conn, self._update, entity_id, changes))
+        if doc is not None:
+            notify(self.listeners, 'update', self.name, entity_id, changes)
+        return doc
+
+    def _update(self, conn, entity_id, changes):
+        row = self._get(conn, entity_id)
+        if row is None:
+            return None
+        doc = loads(row[0])
+        doc.update(derive(self._derived, dict(changes)) if self._derived else changes)
+        conn.execute(f"UPDATE {self.name} SET doc = ? WHERE id = ?", (dumps(doc), entity_id))
+        self._bump(conn)
+        return doc
+
+    async def increment(self, entity_id: str, field: str, amount: int = 1, expect: Optional[Dict[str, Any]] = None,
+                        changes: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically add ``amount`` to a numeric field and apply ``changes``; with ``expect``, only if
+        the row has those field values (None otherwise)"""
+        if changes and 'id' in changes and changes['id'] != entity_id:
+            raise ValueError("Primary key cannot be changed")
+        if not expect and not changes:
+            expr = _field_expr(field)
+            sql = (f"UPDATE {self.name} SET doc = json_set(doc, '$.{field}', coalesce({expr}, 0) + ?) "
+                   f"WHERE id = ? RETURNING doc")
+            row = await self._db.run(lambda conn: self._db.transaction(conn, self._increment, sql, amount, entity_id))
+            if row is None:
+                return None
+            doc = loads(row[0])
+        else:
+            # Checked and written inside one BEGIN IMMEDIATE, so no other process writes in between
+            doc = await self._db.run(lambda conn: self._db.transaction(
+                conn, self._increment_where, entity_id, field, amount, expect or {}, changes or {}))
+            if doc is None:
+                return None
+        notify(self.listeners, 'update', self.name, entity_id, {**(changes or {}), field: doc.get(field)})
+        return doc
+
+    def _increment(self, conn, sql, amount, entity_id):
+        row = conn.execute(sql, (amount, entity_id)).fetchone()
+        if row is not None:
+            self._bump(conn)
+        return row
+
+    def _increment_where(self, conn, entity_id, field, amount, expect, changes):
+        row = self._get(conn, entity_id)
+        if row is None:
+            return None
+        doc = loads(row[0])
+        if any(doc.get(key) != value for key, value in expect.items()):
+            return None
+        return self._update(conn, entity_id, {**changes, field: (doc.get(field) or 0) + amount})
+
+
+class SQLiteRepository:
+    """Repository whose collections live in one SQLite database file"""
+
+    # Other worker processes write to the same file
+    shared = True
+
+    def __init__(self, path: str, seed: Optional[Callable[[], Dict[str, Any]]] = None):
+        self._db = SQLiteDatabase(
+            path,
+            pool_size=int(os.environ.get('SQLITE_POOL_SIZE', '4')),
+            busy_timeout_ms=int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        )
+        self._seed = seed
+        self.epoch: Optional[str] = None
+        self.listeners: List[WriteListener] = []
+        for name in COLLECTIONS:
+            setattr(self, name, SQLiteCollection(
+                name, self._db, INDEXES.get(name, ()), FIELD_DEFAULTS.get(name), self.listeners,
+                DERIVED_FIELDS.get(name),
+            ))
+
+    async def open(self):
+        """Create tables and indexes; the first worker to get here seeds an empty database"""
+        await self._db.run(lambda conn: self._db.transaction(conn, self._setup))
+
+    def _setup(self, conn):
+        conn.execute("CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        # Created once with the database, so every worker reports the same epoch
+        conn.execute(
+            "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)", (EPOCH_KEY, json.dumps(os.urandom(6).hex())),
+        )
+        self.epoch = json.loads(conn.execute("SELECT value FROM config WHERE key = ?", (EPOCH_KEY,)).fetchone()[0])
+        for name in COLLECTIONS:
+            getattr(self, name).create(conn)
+        if self._seed is None or conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
+        seed = self._seed()
+        for name in COLLECTIONS:
+            getattr(self, name)._insert_many(conn, seed.get(name, []))
+        self._set_config(conn, seed.get('system_config', {}))
+
+    async def close(self):
+        self._db.close()
+
+    async def checkpoint(self):
+        """Fold the WAL file back into the database file"""
+        await self._db.run(lambda conn: conn.execute('PRAGMA wal_checkpoint(TRUNCATE)'))
+
+    def add_write_listener(self, listener: WriteListener):
+        self.listeners.append(listener)
+
+    async def versions(self, names: Sequence[str]) -> Dict[str, int]:
+        rows = await self._db.run(lambda conn: conn.execute("SELECT name, version FROM versions").fetchall())
+        stored = dict(rows)
+        return {name: stored.get(name, 0) for name in names}
+
+    def remove_write_listener(self, listener: WriteListener):
+        self.listeners.remove(listener)
+
+    async def get_config(self) -> Dict[str, Any]:
+        row = await self._db.run(
+            lambda conn: conn.execute("SELECT value FROM config WHERE key = ?", (CONFIG_KEY,)).fetchone()
+        )
+        return json.loads(row[0]) if row else {'deposit_multiplier': 2.0}
+
+    async def update_config(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        config = await self._db.run(lambda conn: self._db.transaction(conn, self._set_config, changes))
+        notify(self.listeners, 'config', CONFIG_KEY, None, changes)
+        return config
+
+    def _set_config(self, conn, changes):
+        row = conn.execute("SELECT value FROM config WHERE key = ?", (CONFIG_KEY,)).fetchone()
+        config = json.loads(row[0]) if row else {}
+        config.update(changes)
+        conn.execute(
+            "INSERT INTO config (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (CONFIG_KEY, json.dumps(config)),
+        )
+        return config
@@ -0,0 +1,211 @@
+"""Queue-backed JSON logging for the request path.
+
+``get_logger(name)`` returns an adapter whose keyword arguments become fields
+of the JSON line::
+
+    log.info('login_failed', reason='bad_password', user_id=user['id'])
+
+Sampled-out and disabled calls return before a ``LogRecord`` exists; the
+rest only build the record and put it on a bounded queue
+(``put_nowait``); formatting and writing to stdout happen on one background
+thread (``logging.handlers.QueueListener``). When the queue is full the
+record is dropped and counted rather than blocking the event loop.
+
+Sampling is per route: ``RequestContext`` middleware stores the request's
+method and path in a context variable, and records logged below WARNING are
+kept with the probability configured for the longest matching path prefix
+(``LOG_SAMPLE_RATES="/api/auth/login=0.1,/api/services=0"``). Warnings and
+errors are never sampled out. ``LOG_LEVEL`` sets the level; both can be
+changed at runtime through ``configure``.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+ROOT_LOGGER = 'crm'
+
+# (method, path) of the request being handled, set by ``RequestContext``
+current_request: contextvars.ContextVar = contextvars.ContextVar('current_request', default=None)
+
+_RESERVED = {'exc_info', 'stack_info', 'stacklevel', 'extra'}
+
+
+def parse_sample_rates(text: str) -> Dict[str, float]:
+    """``"/api/a=0.1,/api/b=0"`` -> {'/api/a': 0.1, '/api/b': 0.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        prefix, _, rate = item.rpartition('=')
+        if not prefix:
+            raise ValueError(f"Invalid sample rate entry: {item!r}")
+        rates[prefix] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, request and the record's fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        request = getattr(record, 'request', None)
+        if request:
+            entry['method'], entry['path'] = request
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+class RouteSampler:
+    """Keeps records below WARNING with the rate of the longest matching path prefix"""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default: float = 1.0):
+        self.default = default
+        self.set_rates(rates or {})
+        self.sampled_out = 0
+
+    def set_rates(self, rates: Dict[str, float]):
+        # Longest prefix first so the first match is the most specific one
+        self.rates = dict(sorted(rates.items(), key=lambda item: -len(item[0])))
+
+    def rate_for(self, path: str) -> float:
+        for prefix, rate in self.rates.items():
+            if path.startswith(prefix):
+                return rate
+        return self.default
+
+    def keep(self, level: int, request: Optional[Tuple[str, str]]) -> bool:
+        if level >= logging.WARNING or request is None:
+            return True
+        rate = self.rate_for(request[1])
+        if rate >= 1.0 or (rate > 0.0 and random.random() < rate):
+            return True
+        self.sampled_out += 1
+        return False
+
+
+# Shared by every ``StructuredLogger``; ``LogPipeline.configure`` sets its rates
+sampler = RouteSampler()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks or formats on the caller's thread"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the writer thread; messages and fields are plain values
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Samples per route, then moves keyword arguments into the record's ``fields``"""
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        request = current_request.get()
+        if not sampler.keep(level, request):
+            return
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _RESERVED}
+        exc_info = kwargs.get('exc_info')
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        # Made here rather than by Logger.log: the JSON lines carry no caller
+        # file or line, so the stack walk that finds them is skipped
+        record = self.logger.makeRecord(self.logger.name, level, '(unknown file)', 0, msg, args, exc_info or None,
+                                        extra={**kwargs.get('extra', {}), 'fields': fields, 'request': request})
+        self.logger.handle(record)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger below the app's root logger, which ``LogPipeline`` routes through the queue"""
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), {})
+
+
+class LogPipeline:
+    """Root of the app's loggers: level, sampler, queue handler and writer thread"""
+
+    def __init__(self, root: str = ROOT_LOGGER, level: str = 'INFO', sample_rates: Optional[Dict[str, float]] = None,
+                 queue_size: int = 10000, stream=None):
+        self.root = logging.getLogger(root)
+        self.root.propagate = False
+        self.sampler = sampler
+        self.sampler.set_rates(sample_rates or {})
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.root.handlers[:] = [self.handler]
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        self.listener = logging.handlers.QueueListener(self.handler.queue, writer)
+        self.running = False
+        self.configure(level=level)
+
+    def start(self):
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out whatever is queued and stop the writer thread"""
+        if self.running:
+            self.running = False
+            self.listener.stop()
+
+    def configure(self, level: Optional[str] = None, sample_rates: Optional[Dict[str, float]] = None):
+        if level is not None:
+            self.root.setLevel(level.upper())
+        if sample_rates is not None:
+            self.sampler.set_rates(sample_rates)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'level': logging.getLevelName(self.root.level),
+            'sample_rates': self.sampler.rates,
+            'enqueued': self.handler.enqueued,
+            'dropped': self.handler.dropped,
+            'sampled_out': self.sampler.sampled_out,
+            'queued': self.handler.queue.qsize(),
+        }
+
+
+class RequestContext:
+    """ASGI middleware exposing the request's method and path to the log sampler"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set((scope['method'], scope['path']))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
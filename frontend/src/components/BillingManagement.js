@@ -365,6 +365,53 @@ const BillingManagement = ({ AuthContext }) => {
     }
   };
 
+  // Live progress of the bill cycles with unfinished runs, over Server-Sent Events.
+  // fetch() instead of EventSource, which cannot send the Authorization header.
+  const activeCycleIds = [...new Set(billRuns
+    .filter(run => run.status === 'pending' || run.status === 'processing')
+    .map(run => run.bill_cycle_id))].sort().join(',');
+
+  useEffect(() => {
+    if (!activeCycleIds) return undefined;
+    const controller = new AbortController();
+    const applyProgress = (delta) => {
+      const changes = {};
+      ['status', 'bills_generated', 'bills_approved', 'error', 'shards_failed', 'accounts_per_second', 'eta_seconds']
+        .forEach(key => { if (key in delta) changes[key] = delta[key]; });
+      setBillRuns(runs => runs.some(run => run.id === delta.id)
+        ? runs.map(run => (run.id === delta.id ? { ...run, ...changes } : run))
+        : runs);
+    };
+    const streamCycle = async (cycleId) => {
+      const response = await fetch(`${API}/billing/cycles/${cycleId}/events`, {
+        headers: { Authorization: axios.defaults.headers.common['Authorization'] },
+        signal: controller.signal
+      });
+      if (!response.ok) return;
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) return;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        events.forEach(event => {
+          const lines = event.split('\n');
+          const data = lines.find(line => line.startsWith('data: '));
+          if (data && lines.includes('event: progress')) applyProgress(JSON.parse(data.slice(6)));
+        });
+      }
+    };
+    activeCycleIds.split(',').forEach(cycleId => {
+      streamCycle(cycleId).catch(error => {
+        if (error.name !== 'AbortError') console.error('Error streaming bill run progress:', error);
+      });
+    });
+    return () => controller.abort();
+  }, [activeCycleIds]);
+
   const fetchBilledAccounts = async () => {
     try {
       const response = await axios.get(`${API}/billing/accounts`, {
@@ -1173,6 +1220,8 @@ const BillingManagement = ({ AuthContext }) => {
                 <option value="pending">Pending</option>
                 <option value="processing">Processing</option>
                 <option value="completed">Completed</option>
+                <option value="partial">Partial</option>
+                <option value="failed">Failed</option>
               </select>
             </div>
             <div className="flex items-end">
@@ -1227,6 +1276,8 @@ const BillingManagement = ({ AuthContext }) => {
                       </div>
                       <div className="mt-2 text-sm text-slate-600">
                         Run Date: {new Date(run.run_date).toLocaleDateString()}
+                        {run.status === 'processing' && run.eta_seconds != null &&
+                          ` · ${run.accounts_per_second} accounts/s, about ${Math.ceil(run.eta_seconds)}s left`}
                       </div>
                     </div>
                   </div>
@@ -1235,6 +1286,8 @@ const BillingManagement = ({ AuthContext }) => {
                     <div className={`px-3 py-1 rounded-full text-xs font-medium ${
                       run.status === 'completed' ? 'bg-green-100 text-green-700 border border-green-200' :
                       run.status === 'processing' ? 'bg-blue-100 text-blue-700 border border-blue-200' :
+                      run.status === 'partial' ? 'bg-orange-100 text-orange-700 border border-orange-200' :
+                      run.status === 'failed' ? 'bg-red-100 text-red-700 border border-red-200' :
                       'bg-amber-100 text-amber-700 border border-amber-200'
                     }`}>
                       {run.status.charAt(0).toUpperCase() + run.status.slice(1)}
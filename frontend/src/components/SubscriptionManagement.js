@@ -10,6 +10,7 @@ const SubscriptionManagement = ({ AuthContext }) => {
   const [subscriptions, setSubscriptions] = useState([]);
   const [loading, setLoading] = useState(false);
   const [currentPage, setCurrentPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState(null);
   
   // Enhanced Filter State
   const [filters, setFilters] = useState({
@@ -84,13 +85,13 @@ const SubscriptionManagement = ({ AuthContext }) => {
   // Get unique service types for filter dropdown
   const uniqueServiceTypes = [...new Set(subscriptions.map(s => s.service_name.split(' ').pop()))];
 
-  // Fetch subscriptions based on active tab
-  const fetchSubscriptions = async () => {
+  // Fetch subscriptions based on active tab; `more` appends the page after the last one loaded
+  const fetchSubscriptions = async (more = false) => {
     setLoading(true);
     try {
       const endpoint = activeTab === 'self' ? 'subscriptions/self' : 'subscriptions/users';
       const params = {
-        page: 1,
+        cursor: more ? nextCursor : '',
         limit: 50, // Get more data for local filtering
         ...(appliedFilters.account_id && { account_id: appliedFilters.account_id }),
         ...(appliedFilters.plan_name && { plan_name: appliedFilters.plan_name })
@@ -98,6 +99,7 @@ const SubscriptionManagement = ({ AuthContext }) => {
 
       const response = await axios.get(`${API}/${endpoint}`, { params });
       let data = response.data;
+      setNextCursor(response.headers['x-next-cursor'] || null);
 
       // Apply local filtering
       if (appliedFilters.searchTerm) {
@@ -113,6 +115,10 @@ const SubscriptionManagement = ({ AuthContext }) => {
         data = data.filter(sub => sub.status === appliedFilters.status);
       }
 
+      if (more) {
+        data = [...subscriptions, ...data];
+      }
+
       // Apply sorting
       data.sort((a, b) => {
         const direction = sorting.direction === 'asc' ? 1 : -1;
@@ -783,6 +789,16 @@ const SubscriptionManagement = ({ AuthContext }) => {
                   >
                     Next
                   </button>
+
+                  {nextCursor && (
+                    <button
+                      onClick={() => fetchSubscriptions(true)}
+                      className="px-4 py-2 text-sm border border-slate-300 rounded-lg hover:bg-slate-50 transition-colors font-medium"
+                      data-testid="load-more"
+                    >
+                      Load more
+                    </button>
+                  )}
                 </div>
               </div>
             </>
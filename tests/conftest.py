@@ -0,0 +1,57 @@
+"""Fixtures shared by the backend tests: every repository backend opened empty, and an API client."""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from repository import InMemoryRepository  # noqa: E402
+
+BACKENDS = ('memory', 'sqlite', 'mongo')
+
+
+def make_repository(backend: str, directory: Path, seed=None):
+    """An unopened repository of ``backend``; sqlite keeps its file in ``directory``"""
+    if backend == 'memory':
+        return InMemoryRepository({}, seed=seed)
+    if backend == 'sqlite':
+        from sqlite_repository import SQLiteRepository
+        return SQLiteRepository(str(directory / 'test.db'), seed=seed)
+    pytest.importorskip('mongomock_motor')
+    from mongo_repository import MongoRepository
+    return MongoRepository('mongomock://', f'test_{uuid.uuid4().hex}', seed=seed)
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture(params=BACKENDS)
+async def repo(request, tmp_path):
+    repository = make_repository(request.param, tmp_path)
+    await repository.open()
+    yield repository
+    await repository.close()
+
+
+@pytest.fixture
+async def client():
+    """An API client logged in as the seeded super admin; the in-memory store is reseeded for every test"""
+    # Imported here so repository tests do not pay for the app
+    import server
+    async with server.lifespan(server.app):
+        for _ in range(1000):
+            if server.app.state.ready:
+                break
+            await asyncio.sleep(0.01)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.post('/api/auth/login',
+                                         json={'email': 'superadmin@example.com', 'password': 'password'})
+            client.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+            yield client
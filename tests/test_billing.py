@@ -0,0 +1,224 @@
+"""Bill-run engine on every backend: claims, resume, abort, stale release and incremental runs."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from billing import BillRunEngine, bill_id
+
+pytestmark = pytest.mark.anyio
+
+CREATED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ACCOUNTS = [f'acc-{n:02d}' for n in range(1, 8)]
+
+
+async def load(repo):
+    """Two plans and seven accounts whose services use every way a service is priced"""
+    await repo.plans.insert_many([
+        {'id': 'plan-1', 'name': 'Basic', 'charges': 10.0, 'created_at': CREATED},
+        {'id': 'plan-2', 'name': 'Plus', 'charges': 25.5, 'created_at': CREATED},
+    ])
+    await repo.accounts.insert_many([{'id': account_id, 'name': account_id.upper(), 'created_at': CREATED}
+                                     for account_id in ACCOUNTS])
+    services = []
+    for n, account_id in enumerate(ACCOUNTS):
+        services.append({'id': f'svc-{n}-a', 'account_id': account_id, 'plan_id': 'plan-1', 'is_active': True,
+                         'created_at': CREATED})
+        services.append({'id': f'svc-{n}-b', 'account_id': account_id, 'plan_id': 'plan-2', 'is_active': n % 3 != 0,
+                         'custom_price': 5.25 if n % 2 else None, 'monthly_charges': 7.0 if n % 4 == 1 else None,
+                         'created_at': CREATED})
+    await repo.services.insert_many(services)
+    await repo.bill_cycles.insert({'id': 'cycle-1', 'name': 'Monthly', 'created_at': CREATED})
+
+
+async def schedule(repo, name: str, incremental: bool = False, run_date=CREATED):
+    """A pending run as create_bill_schedule stores it"""
+    await repo.bill_schedules.insert({'id': f'schedule-{name}', 'bill_cycle_id': 'cycle-1', 'account_ids': [],
+                                      'status': 'pending', 'created_at': CREATED})
+    run = {'id': f'run-{name}', 'bill_schedule_id': f'schedule-{name}', 'bill_cycle_id': 'cycle-1',
+           'run_name': name, 'run_date': run_date, 'status': 'pending', 'bills_generated': 0,
+           'incremental': incremental, 'created_at': datetime.now(timezone.utc)}
+    await repo.bill_runs.insert(run)
+    return run
+
+
+async def expected_charges(repo):
+    plans = {plan['id']: plan['charges'] for plan in await repo.plans.list()}
+    charges = dict.fromkeys(ACCOUNTS, 0.0)
+    for service in await repo.services.find(is_active=True):
+        for field in ('custom_price', 'monthly_charges'):
+            if service.get(field) is not None:
+                charges[service['account_id']] += service[field]
+                break
+        else:
+            charges[service['account_id']] += plans[service['plan_id']]
+    return {account_id: round(total, 2) for account_id, total in charges.items()}
+
+
+async def billed(repo, run_id: str):
+    bills = await repo.billed_accounts.find(bill_run_id=run_id)
+    assert len(bills) == len({bill['account_id'] for bill in bills}), 'an account was billed twice'
+    return {bill['account_id']: bill['charges'] for bill in bills}
+
+
+async def settled(repo, run_id: str, statuses=('completed', 'failed', 'partial')):
+    for _ in range(500):
+        run = await repo.bill_runs.get(run_id)
+        if run['status'] in statuses:
+            return run
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"run {run_id} still {run['status']}")
+
+
+@pytest.fixture
+async def engine(repo):
+    await load(repo)
+    engine = BillRunEngine(repo, batch_size=2, poll_interval=0, shard_size=3)
+    yield engine
+    await engine.stop()
+
+
+async def claim(repo, run, checkpoint_at):
+    """Claim ``run`` the way run_due does, as a worker that then stopped checkpointing"""
+    return dict(await repo.bill_runs.increment(
+        run['id'], 'claims', expect={'status': 'pending'},
+        changes={'status': 'processing', 'started_at': checkpoint_at, 'checkpoint_at': checkpoint_at}))
+
+
+async def test_run_due_bills_every_account_once(repo, engine):
+    run = await schedule(repo, 'full')
+    await schedule(repo, 'later', run_date=datetime.now(timezone.utc) + timedelta(days=1))
+
+    assert await engine.run_due() == 1
+    stored = await repo.bill_runs.get(run['id'])
+    assert (stored['status'], stored['bills_generated'], stored['claims']) == ('completed', len(ACCOUNTS), 1)
+    assert [shard['status'] for shard in stored['shards']] == ['completed'] * 3
+    assert await billed(repo, run['id']) == await expected_charges(repo)
+    assert (await repo.bill_schedules.get(run['bill_schedule_id']))['status'] == 'completed'
+    assert (await repo.bill_runs.get('run-later'))['status'] == 'pending'
+
+
+async def test_concurrent_polls_execute_a_run_once(repo, engine):
+    run = await schedule(repo, 'shared')
+    other = BillRunEngine(repo, batch_size=2, poll_interval=0, shard_size=3)
+
+    assert sum(await asyncio.gather(engine.run_due(), other.run_due())) == 1
+    assert (await repo.bill_runs.get(run['id']))['claims'] == 1
+    assert await billed(repo, run['id']) == await expected_charges(repo)
+
+
+async def test_stale_run_is_released_then_resumed(repo, engine):
+    run = await schedule(repo, 'stale')
+    claimed = await claim(repo, run, datetime.now(timezone.utc) - timedelta(hours=1))
+    # Two bills made it to disk before the worker died
+    await repo.billed_accounts.insert_many([
+        {'id': bill_id(run['id'], account_id), 'bill_run_id': run['id'], 'account_id': account_id,
+         'charges': -1.0, 'created_at': CREATED} for account_id in ACCOUNTS[:2]])
+    await repo.bill_runs.update(run['id'], {'bills_generated': 2})
+
+    assert await engine.run_due() == 0
+    # A copy: the memory repository hands out its stored rows, which the resume changes
+    released = dict(await repo.bill_runs.get(run['id']))
+    assert released['status'] == 'partial'
+    assert released['error'] == 'Worker stopped before the run finished'
+
+    assert await engine.resume(released) is not None
+    # A second resume of the same run finds nothing to claim
+    assert await engine.resume(released) is None
+    stored = await settled(repo, run['id'])
+    assert (stored['status'], stored['bills_generated'], stored['bills_kept']) == ('completed', len(ACCOUNTS), 2)
+    expected = await expected_charges(repo)
+    expected.update(dict.fromkeys(ACCOUNTS[:2], -1.0))
+    assert await billed(repo, run['id']) == expected
+
+    # The worker that was released must not bill or complete the run again
+    await engine.execute(claimed)
+    assert (await repo.bill_runs.get(run['id']))['claims'] == stored['claims']
+    assert await billed(repo, run['id']) == expected
+
+
+async def test_stale_worker_does_not_bill_after_a_resume(repo, engine, monkeypatch):
+    run = await schedule(repo, 'overlap')
+    claimed = await claim(repo, run, datetime.now(timezone.utc))
+    insert_many = repo.billed_accounts.insert_many
+    calls = []
+
+    async def resumed_meanwhile(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            # The worker stalls past stale_after right before its first batch; another one resumes the run
+            await repo.bill_runs.update(run['id'], {'checkpoint_at': datetime.now(timezone.utc) - timedelta(hours=1)})
+            other = BillRunEngine(repo, batch_size=2, poll_interval=0, shard_size=3)
+            await other.run_due()
+            assert await other.resume(await repo.bill_runs.get(run['id'])) is not None
+            await settled(repo, run['id'], statuses=('completed',))
+        await insert_many(rows)
+
+    monkeypatch.setattr(repo.billed_accounts, 'insert_many', resumed_meanwhile)
+    await engine.execute(claimed)
+
+    stored = await repo.bill_runs.get(run['id'])
+    assert (stored['status'], stored['bills_generated']) == ('completed', len(ACCOUNTS))
+    assert await billed(repo, run['id']) == await expected_charges(repo)
+
+
+async def test_abort_stops_the_worker_at_its_next_checkpoint(repo, engine, monkeypatch):
+    run = await schedule(repo, 'abort')
+    insert_many = repo.billed_accounts.insert_many
+    batches = []
+
+    async def aborted_meanwhile(rows):
+        batches.append(len(rows))
+        await insert_many(rows)
+        current = await repo.bill_runs.get(run['id'])
+        if current['status'] == 'processing':
+            assert await engine.abort(current) is not None
+
+    monkeypatch.setattr(repo.billed_accounts, 'insert_many', aborted_meanwhile)
+    assert await engine.run_due() == 1
+
+    stored = await repo.bill_runs.get(run['id'])
+    assert (stored['status'], stored['error']) == ('failed', 'Aborted')
+    assert stored['aborted_at'] is not None
+    # Only the batch written before the abort
+    assert len(batches) == 1
+    assert len(await billed(repo, run['id'])) == batches[0]
+    assert (await repo.bill_schedules.get(run['bill_schedule_id']))['status'] == 'failed'
+
+
+async def test_incremental_run_rates_only_changed_accounts(repo, engine):
+    first = await schedule(repo, 'first')
+    await engine.run_due()
+    # One account changes directly, the other through its plan
+    await repo.services.update('svc-1-b', {'custom_price': 99.0})
+    await engine.record_changes(account_ids=['acc-02'])
+    await repo.plans.update('plan-2', {'charges': 30.0})
+    await engine.record_changes(plan_ids=['plan-2'])
+    # Changed but not logged: an incremental run keeps the prior charge
+    await repo.services.update('svc-3-a', {'custom_price': 1.0})
+
+    second = await schedule(repo, 'second', incremental=True)
+    await engine.run_due()
+
+    stored = await repo.bill_runs.get(second['id'])
+    assert stored['status'] == 'completed'
+    assert stored['prior_bill_run_id'] == first['id']
+    # Every account with an active plan-2 service, acc-02 among them
+    assert (stored['accounts_rated'], stored['accounts_reused']) == (4, len(ACCOUNTS) - 4)
+    expected = await expected_charges(repo)
+    expected['acc-04'] = (await billed(repo, first['id']))['acc-04']
+    assert await billed(repo, second['id']) == expected
+
+
+async def test_completed_run_prunes_the_changes_it_read(repo, engine):
+    await engine.record_changes(account_ids=['acc-01', 'acc-02'], plan_ids=['plan-1'])
+    run = await schedule(repo, 'prune')
+    await engine.run_due()
+    assert (await repo.bill_runs.get(run['id']))['status'] == 'completed'
+    assert await repo.billing_changes.count() == 0
+    assert engine.changes_pruned == 3
+
+    # Logged after the latest run was rated: the next incremental run needs it
+    await engine.record_changes(account_ids=['acc-03'])
+    assert await engine.prune_changes() == 0
+    assert await repo.billing_changes.count() == 1
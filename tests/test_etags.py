@@ -0,0 +1,39 @@
+"""Conditional GETs of list routes, through the ASGI app."""
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_unchanged_list_answers_304(client):
+    response = await client.get('/api/plans')
+    etag = response.headers['etag']
+
+    for if_none_match in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+        cached = await client.get('/api/plans', headers={'If-None-Match': if_none_match})
+        assert cached.status_code == 304
+        assert cached.content == b''
+        assert cached.headers['etag'] == etag
+    assert (await client.get('/api/plans', headers={'If-None-Match': '"stale"'})).status_code == 200
+
+
+async def test_write_changes_the_etag(client):
+    etag = (await client.get('/api/plans')).headers['etag']
+    plan = await server.repo.plans.get('plan_001')
+    await server.repo.plans.insert({**plan, 'id': 'plan-new', 'created_at': datetime.now(timezone.utc)})
+
+    response = await client.get('/api/plans', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert 'plan-new' in [row['id'] for row in response.json()]
+
+
+async def test_etag_depends_on_the_query(client):
+    whole = await client.get('/api/accounts')
+    page = await client.get('/api/accounts', params={'limit': 1})
+    assert whole.headers['etag'] != page.headers['etag']
+    response = await client.get('/api/accounts', params={'limit': 1}, headers={'If-None-Match': whole.headers['etag']})
+    assert response.status_code == 200
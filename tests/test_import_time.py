@@ -0,0 +1,13 @@
+"""Cold-start budget: importing ``server`` must stay under IMPORT_BUDGET_MS."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from check_import_time import DEFAULT_BUDGET_MS, measure_import_ms  # noqa: E402
+
+
+def test_server_import_within_budget():
+    # Best of three fresh interpreters, so one noisy run does not fail the test
+    best = min(measure_import_ms() for _ in range(3))
+    assert best < DEFAULT_BUDGET_MS, f"importing server took {best:.0f} ms (budget {DEFAULT_BUDGET_MS} ms)"
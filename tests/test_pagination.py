@@ -0,0 +1,91 @@
+"""Cursor pages of list routes and offset pages of subscriptions, through the ASGI app."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from pagination import PAGE_MAX_OFFSET
+
+pytestmark = pytest.mark.anyio
+
+CREATED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+async def add_accounts(count: int):
+    account = await server.repo.accounts.get('acc_001')
+    await server.repo.accounts.insert_many([
+        {**account, 'id': f'acc-{n:03d}', 'created_at': CREATED + timedelta(minutes=n // 2)} for n in range(count)])
+
+
+async def walk(client, path: str, limit: int):
+    """Ids of every row of ``path``, following X-Next-Cursor from the top"""
+    ids, params = [], {'limit': limit}
+    while True:
+        response = await client.get(path, params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= limit
+        ids += [row['id'] for row in response.json()]
+        cursor = response.headers.get('x-next-cursor')
+        if cursor is None:
+            return ids
+        assert f'cursor={cursor}' in response.headers['link']
+        params = {'limit': limit, 'cursor': cursor}
+
+
+async def test_cursor_pages_cover_the_list_once(client):
+    await add_accounts(10)
+    everything = [row['id'] for row in (await client.get('/api/accounts')).json()]
+
+    walked = await walk(client, '/api/accounts', 3)
+    assert sorted(walked) == sorted(everything)
+    assert len(walked) == len(set(walked)) == 11
+
+
+async def test_rows_written_between_pages_do_not_shift_them(client):
+    await add_accounts(6)
+    first = await client.get('/api/accounts', params={'limit': 3})
+    # Older than every account read so far, so it would shift an offset page
+    account = await server.repo.accounts.get('acc_001')
+    await server.repo.accounts.insert({**account, 'id': 'acc-early', 'created_at': CREATED - timedelta(days=1)})
+
+    second = await client.get('/api/accounts', params={'limit': 3, 'cursor': first.headers['x-next-cursor']})
+    first_ids = [row['id'] for row in first.json()]
+    second_ids = [row['id'] for row in second.json()]
+    assert not set(first_ids) & set(second_ids)
+    assert first_ids + second_ids == [f'acc-{n:03d}' for n in range(6)]
+
+
+async def test_malformed_cursor_is_rejected(client):
+    response = await client.get('/api/accounts', params={'limit': 3, 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+
+
+async def test_offset_subscription_pages_match_the_cursor_walk(client):
+    services = [{
+        'id': f'sub-{n:03d}', 'account_id': 'acc_001', 'plan_id': 'plan_001', 'service_name': f'Line {n}',
+        'service_category': 'user_service', 'is_active': True, 'status': 'active', 'managed_by': 'user_001',
+        'start_date': CREATED, 'created_at': CREATED + timedelta(minutes=n),
+    } for n in range(25)]
+    # Without a plan it is no subscription, and must not leave a hole in its page
+    services[4]['plan_id'] = 'plan-gone'
+    await server.repo.services.insert_many(services)
+
+    walked = await walk(client, '/api/subscriptions/users', 4)
+    pages, page = [], 1
+    while True:
+        response = await client.get('/api/subscriptions/users', params={'limit': 4, 'page': page})
+        assert response.status_code == 200
+        pages += [row['id'] for row in response.json()]
+        if len(response.json()) < 4:
+            break
+        page += 1
+    assert 'sub-004' not in walked
+    assert pages == walked
+
+    # An offset page hands over to the cursor for the rest
+    second = await client.get('/api/subscriptions/users', params={'limit': 4, 'page': 2})
+    third = await client.get('/api/subscriptions/users', params={'limit': 4, 'cursor': second.headers['x-next-cursor']})
+    assert [row['id'] for row in third.json()] == walked[8:12]
+
+    deep = await client.get('/api/subscriptions/users', params={'limit': 4, 'page': PAGE_MAX_OFFSET // 4 + 2})
+    assert deep.status_code == 400
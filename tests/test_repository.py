@@ -0,0 +1,111 @@
+"""Repository behaviour every backend must share: indexes, keyset pages, deletes and atomic increments."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from pagination import row_key
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def service(number: int, account_id: str, **fields):
+    row = {
+        'id': f'svc-{number:03d}',
+        'account_id': account_id,
+        'plan_id': 'plan-1',
+        'service_category': 'self_service',
+        'managed_by': 'user-1',
+        'is_active': True,
+        # Every third row shares its timestamp with the previous one, so ids break ties
+        'created_at': START + timedelta(minutes=number - number % 3),
+    }
+    row.update(fields)
+    return row
+
+
+def ids(rows):
+    return sorted(row['id'] for row in rows)
+
+
+async def test_find_follows_updates_of_indexed_fields(repo):
+    await repo.services.insert_many([service(n, f'acc-{n % 2}') for n in range(6)])
+    await repo.services.update('svc-000', {'account_id': 'acc-1', 'is_active': False})
+
+    assert ids(await repo.services.find(account_id='acc-0')) == ['svc-002', 'svc-004']
+    assert ids(await repo.services.find(account_id='acc-1', is_active=True)) == ['svc-001', 'svc-003', 'svc-005']
+    assert await repo.services.count(service_category='self_service', is_active=False) == 1
+    assert await repo.services.count(service_category='self_service', managed_by='user-1', is_active=True) == 5
+    assert await repo.services.find(account_id='acc-9') == []
+
+
+async def test_missing_field_matches_its_default(repo):
+    row = service(1, 'acc-1')
+    del row['is_active']
+    await repo.services.insert(row)
+
+    assert ids(await repo.services.find(is_active=True)) == ['svc-001']
+    assert await repo.services.count(is_active=False) == 0
+
+
+async def test_duplicate_id_is_rejected(repo):
+    await repo.services.insert(service(1, 'acc-1'))
+    with pytest.raises((ValueError, DuplicateKeyError)):
+        await repo.services.insert(service(1, 'acc-2'))
+    assert (await repo.services.get('svc-001'))['account_id'] == 'acc-1'
+
+
+async def test_page_walks_rows_in_page_order(repo):
+    rows = [service(n, f'acc-{n % 3}') for n in (7, 2, 9, 0, 5, 1, 8, 3, 6, 4)]
+    undated = service(99, 'acc-0')
+    del undated['created_at']
+    await repo.services.insert_many(rows + [undated])
+    expected = ['svc-099'] + [row['id'] for row in sorted(rows, key=row_key)]
+
+    walked, after = [], None
+    while True:
+        batch = await repo.services.page(3, after=after)
+        walked += [row['id'] for row in batch]
+        if len(batch) < 3:
+            break
+        after = row_key(batch[-1])
+    assert walked == expected
+
+    # Criteria and a position in the middle of equal timestamps
+    middle = await repo.services.get('svc-006')
+    after = row_key(middle)
+    assert [row['id'] for row in await repo.services.page(10, after=after, account_id='acc-1')] == ['svc-007']
+    assert [row['id'] for row in await repo.services.page(2, after=after)] == ['svc-007', 'svc-008']
+
+
+async def test_delete_many_drops_rows_from_every_read(repo):
+    await repo.services.insert_many([service(n, 'acc-1') for n in range(5)])
+    before = (await repo.versions(['services']))['services']
+
+    assert await repo.services.delete_many(['svc-001', 'svc-003', 'svc-unknown']) == 2
+    assert await repo.services.get('svc-001') is None
+    assert ids(await repo.services.find(account_id='acc-1')) == ['svc-000', 'svc-002', 'svc-004']
+    assert [row['id'] for row in await repo.services.page(10)] == ['svc-000', 'svc-002', 'svc-004']
+    assert await repo.services.count() == 3
+    assert (await repo.versions(['services']))['services'] > before
+    assert await repo.services.delete_many([]) == 0
+
+    # The id can be used again
+    await repo.services.insert(service(1, 'acc-2'))
+    assert ids(await repo.services.find(account_id='acc-2')) == ['svc-001']
+
+
+async def test_increment_with_expectation_is_conditional(repo):
+    await repo.bill_runs.insert({'id': 'run-1', 'status': 'pending', 'claims': 0, 'created_at': START})
+
+    claimed = await repo.bill_runs.increment('run-1', 'claims', expect={'status': 'pending'},
+                                             changes={'status': 'processing'})
+    assert (claimed['claims'], claimed['status']) == (1, 'processing')
+    assert await repo.bill_runs.increment('run-1', 'claims', expect={'status': 'pending'}) is None
+    assert await repo.bill_runs.increment('run-1', 'claims', 0, expect={'claims': 0}, changes={'x': 1}) is None
+
+    stored = await repo.bill_runs.get('run-1')
+    assert (stored['claims'], stored['status'], stored.get('x')) == (1, 'processing', None)
+    assert await repo.bill_runs.count(status='processing') == 1